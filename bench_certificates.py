@@ -0,0 +1,70 @@
+"""
+bench_certificates.py
+Benchmark: certificates per second, one by one vs the batch renderer
+
+"uncached" rebuilds the certificate template (logo decode and encode) for every
+certificate; "cached" stamps fields onto one template on one thread; "pool" renders the
+whole batch through CertificateRenderer's process pool (start-up included).
+
+    python bench_certificates.py [--count 24] [--workers 4]
+"""
+import argparse
+import os
+import tempfile
+import time
+from certificate import CertificateRenderer, generate_certificate, get_template, load_logo
+from drive_utils import DriveRecord
+from wipe_engine import WipeReport
+
+
+def make_batch(count, directory):
+    items = []
+    for i in range(count):
+        entry = DriveRecord(id=f"physical-{i}", kind="physical", device=f"\\\\.\\PhysicalDrive{i}",
+                            display=f"PhysicalDrive{i} - Bench Disk (500 GB)", index=i, size_gb=500)
+        report = WipeReport(entry.device, 500 * 1024**3, 3, 4 * 1024 * 1024,
+                            bad_ranges=[[512 * s, 512 * (s + 1)] for s in range(0, 2 * (i % 4), 2)])
+        items.append((entry, directory, report))
+    return items
+
+
+def run(label, count, render):
+    with tempfile.TemporaryDirectory() as tmp:
+        items = make_batch(count, tmp)
+        start = time.perf_counter()
+        results = render(items)
+        seconds = time.perf_counter() - start
+        failed = [r for r in results if r.startswith("ERROR")]
+        assert not failed, failed[0]
+        files = os.listdir(tmp)
+        assert len(set(files)) == count
+        size = sum(os.path.getsize(os.path.join(tmp, f)) for f in files) / count
+    print(f"{label:<9}: {count} certificates in {seconds:.3f}s, {count / seconds:.1f} certs/s, "
+          f"{size / 1024:.0f} KB each")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=24)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    def uncached(items):
+        results = []
+        for item in items:
+            load_logo.cache_clear()
+            get_template.cache_clear()
+            results.append(generate_certificate(*item))
+        return results
+
+    base = run("uncached", args.count, uncached)
+    cached = run("cached", args.count, lambda items: [generate_certificate(*item) for item in items])
+    renderer = CertificateRenderer(workers=args.workers)
+    pooled = run(f"pool x{renderer.workers}", args.count, renderer.render_batch)
+    renderer.shutdown()
+    print(f"speedup: cached {base / cached:.1f}x, pool {base / pooled:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+bench_drive_index.py
+Benchmark: nested WMI association walk vs one-shot disk/partition/volume index
+
+Uses a fake WMI provider where every query or association walk costs one
+simulated COM round-trip, so the numbers show how each approach scales with
+the number of disks on a station.
+
+    python bench_drive_index.py [--latency-ms 0.5] [--max-disks 64]
+"""
+import argparse
+import time
+from drive_utils import build_wmi_index, merge_entries
+
+
+class FakeWMI:
+    """Just enough of the wmi module's surface for drive detection"""
+
+    def __init__(self, disks, partitions_per_disk=2, latency=0.0005):
+        self.latency = latency
+        self.calls = 0
+        self.disks = [FakeDisk(self, i, partitions_per_disk) for i in range(disks)]
+
+    def round_trip(self):
+        self.calls += 1
+        time.sleep(self.latency)
+
+    def Win32_DiskDrive(self):
+        self.round_trip()
+        return list(self.disks)
+
+    def Win32_DiskPartition(self):
+        self.round_trip()
+        return [p for d in self.disks for p in d.partitions]
+
+    def Win32_LogicalDiskToPartition(self):
+        self.round_trip()
+        return [FakeLink(p, v) for d in self.disks for p in d.partitions for v in p.volumes]
+
+
+class FakeObject:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def associators(self, name):
+        self.conn.round_trip()
+        return list(self._assoc[name])
+
+
+class FakeDisk(FakeObject):
+    def __init__(self, conn, index, partitions):
+        super().__init__(conn)
+        self.Index = str(index)
+        self.DeviceID = f"\\\\.\\PHYSICALDRIVE{index}"
+        self.Caption = f"Fake Disk {index}"
+        self.Model = self.Caption
+        self.Size = str(500 * 1024**3)
+        self.partitions = [FakePartition(conn, index, n) for n in range(partitions)]
+        self._assoc = {"Win32_DiskDriveToDiskPartition": self.partitions}
+
+
+class FakePartition(FakeObject):
+    def __init__(self, conn, disk, number):
+        super().__init__(conn)
+        self.DeviceID = f"Disk #{disk}, Partition #{number}"
+        self.DiskIndex = str(disk)
+        # Only the second partition of each disk carries a drive letter
+        self.volumes = [FakeVolume(conn, letter_for(disk))] if number == 1 else []
+        self._assoc = {"Win32_LogicalDiskToPartition": self.volumes}
+
+
+class FakeVolume(FakeObject):
+    def __init__(self, conn, device_id):
+        super().__init__(conn)
+        self.DeviceID = device_id
+
+
+class FakeProperty:
+    def __init__(self, value):
+        self.value = value
+
+
+class FakeLink:
+    def __init__(self, partition, volume):
+        self.paths = {
+            "Antecedent": f'\\\\FAKE\\root\\cimv2:Win32_DiskPartition.DeviceID="{partition.DeviceID}"',
+            "Dependent": f'\\\\FAKE\\root\\cimv2:Win32_LogicalDisk.DeviceID="{volume.DeviceID}"',
+        }
+
+    def wmi_property(self, name):
+        return FakeProperty(self.paths[name])
+
+
+def letter_for(i):
+    # Past Z: use volume-GUID-like names so 64 disks still map uniquely
+    return f"{chr(ord('C') + i)}:" if i < 24 else f"VOL{i}:"
+
+
+def logical_for(conn):
+    return [{"kind": "logical", "device": f"{letter_for(int(d.Index))}\\"} for d in conn.disks]
+
+
+def legacy_merge(conn, logical):
+    """The previous merge_drive_list mapping: re-query and walk associations per logical drive"""
+    mapped = {}
+    for ld in logical:
+        drive = ld["device"]
+        found = False
+        for disk in conn.Win32_DiskDrive():
+            for part in disk.associators("Win32_DiskDriveToDiskPartition"):
+                for logical_disk in part.associators("Win32_LogicalDiskToPartition"):
+                    if logical_disk.DeviceID.upper() == drive.strip("\\").upper():
+                        mapped[drive] = int(disk.Index)
+                        found = True
+                        break
+                if found:
+                    break
+            if found:
+                break
+    return mapped
+
+
+def indexed_merge(conn, logical):
+    return merge_entries(logical, build_wmi_index(conn), [])
+
+
+def run(disks, latency):
+    results = []
+    outputs = []
+    for name, fn in (("nested", legacy_merge), ("indexed", indexed_merge)):
+        conn = FakeWMI(disks, latency=latency)
+        logical = logical_for(conn)
+        t0 = time.perf_counter()
+        outputs.append(fn(conn, logical))
+        results.append((name, conn.calls, time.perf_counter() - t0))
+    nested, indexed = outputs
+    # Both approaches must agree on which disk backs each drive letter
+    assert nested == {e.device: int(e.parent_physical[len("PhysicalDrive"):])
+                      for e in indexed if e.parent_physical}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, default=0.5, help="simulated cost of one COM round-trip")
+    parser.add_argument("--max-disks", type=int, default=64)
+    args = parser.parse_args()
+
+    print(f"{'disks':>5} {'nested calls':>13} {'nested s':>9} {'indexed calls':>14} {'indexed s':>10} {'speedup':>8}")
+    n = 1
+    while n <= args.max_disks:
+        (_, nc, nt), (_, ic, it) = run(n, args.latency_ms / 1000)
+        print(f"{n:>5} {nc:>13} {nt:>9.3f} {ic:>14} {it:>10.4f} {nt / it:>7.1f}x")
+        n *= 2
+
+
+if __name__ == "__main__":
+    main()
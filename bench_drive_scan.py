@@ -0,0 +1,71 @@
+"""
+bench_drive_scan.py
+Benchmark: serial vs concurrent drive enumeration with fake slow sources
+
+Each fake source sleeps like its real counterpart on a loaded station: the
+logical bitmask is quick, WMI is slow, and every raw PhysicalDriveN open that
+fails takes a while. Compares the old one-after-another scan with scan_drives.
+
+    python bench_drive_scan.py [--wmi-s 1.5] [--probe-s 0.1] [--disks 6]
+"""
+import argparse
+import time
+from drive_utils import detect_raw_physical, merge_entries, scan_drives
+
+
+def fake_sources(args, raw_workers):
+    def logical():
+        time.sleep(args.logical_s)
+        return [{"kind": "logical", "device": f"{chr(ord('C') + i)}:\\"} for i in range(args.disks)]
+
+    def wmi():
+        time.sleep(args.wmi_s)
+        disks = {i: {"index": i, "device": f"\\\\.\\PHYSICALDRIVE{i}", "caption": f"Fake Disk {i}",
+                     "model": f"Fake Disk {i}", "size_gb": 500, "size_bytes": 500 * 1024**3,
+                     "serial": f"SN{i:04d}"} for i in range(args.disks)}
+        return {"disks": disks, "partitions": {},
+                "volumes": {f"{chr(ord('C') + i)}:": i for i in range(args.disks)}}
+
+    def probe(i):
+        time.sleep(args.probe_s)
+        return {"kind": "raw", "device": f"\\\\.\\PhysicalDrive{i}", "index": i} if i < args.disks else None
+
+    def raw():
+        return detect_raw_physical(32, workers=raw_workers, probe=probe)
+
+    return {"logical": logical, "wmi": wmi, "raw": raw}
+
+
+def serial_scan(sources):
+    start = time.perf_counter()
+    logical = sources["logical"]()
+    index = sources["wmi"]()
+    raw = sources["raw"]()
+    merged = merge_entries(logical, index, raw)
+    return merged, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logical-s", type=float, default=0.02)
+    parser.add_argument("--wmi-s", type=float, default=1.5)
+    parser.add_argument("--probe-s", type=float, default=0.1, help="cost of one raw device open")
+    parser.add_argument("--disks", type=int, default=6)
+    parser.add_argument("--wmi-timeout", type=float, default=10.0)
+    args = parser.parse_args()
+
+    merged_serial, serial_s = serial_scan(fake_sources(args, raw_workers=1))
+    print(f"serial     : {len(merged_serial):>3} entries, first usable list {serial_s:.3f}s, complete {serial_s:.3f}s")
+
+    partials = []
+    merged, report = scan_drives(fake_sources(args, raw_workers=8), timeouts={"wmi": args.wmi_timeout},
+                                 on_partial=lambda entries, name: partials.append((name, len(entries))))
+    print(f"concurrent : {len(merged):>3} entries, first usable list {report['first_usable']:.3f}s, "
+          f"complete {report['total']:.3f}s ({serial_s / report['total']:.1f}x)")
+    print(f"  per source: {report['sources']}")
+    print(f"  partial lists: {partials}")
+    assert merged == merged_serial or report["sources"].get("wmi") == "timeout"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+bench_instrumentation.py
+Benchmark: overwrite engine throughput with instrumentation off and on
+
+Runs the engine over a scratch image file alternately without and with an
+Instruments registry (verify on, so write, read and flush are all timed) and
+reports the median time of each, the overhead, and the per-call latency
+percentiles the histograms collected.
+
+    python bench_instrumentation.py [--size-mb 256] [--block-kb 4096] [--rounds 5]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from instrumentation import Instruments
+from wipe_engine import FileTarget, OverwriteEngine, MB
+
+
+def run_once(path, block_size, instruments):
+    with FileTarget(path) as target:
+        start = time.perf_counter()
+        OverwriteEngine(target, passes=1, block_size=block_size, verify=True, instruments=instruments).run()
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[2])
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--block-kb", type=int, default=4096)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    size, block = args.size_mb * MB, args.block_kb * 1024
+    instruments = Instruments()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "disk.img")
+        with open(path, "wb") as f:
+            f.truncate(size)
+        run_once(path, block, None)      # warm the page cache
+        off, on = [], []
+        for _ in range(args.rounds):
+            off.append(run_once(path, block, None))
+            on.append(run_once(path, block, instruments))
+
+    t_off, t_on = statistics.median(off), statistics.median(on)
+    print(f"{args.size_mb} MB, {args.block_kb} KB blocks, write + read-back, {args.rounds} rounds")
+    print(f"  off: {t_off:.3f}s ({args.size_mb / t_off:.0f} MB/s)")
+    print(f"  on:  {t_on:.3f}s ({args.size_mb / t_on:.0f} MB/s), overhead {(t_on / t_off - 1) * 100:+.2f}%")
+    for op in ("write", "read", "flush"):
+        hist = instruments.histogram("codemonk_io_seconds", op=op)
+        print(f"  {op:<5} calls {hist.count:>6}  p50 <= {hist.quantile(0.5) * 1000:.2f} ms  "
+              f"p99 <= {hist.quantile(0.99) * 1000:.2f} ms")
+    fill = instruments.histogram("codemonk_fill_seconds")
+    print(f"  fill  calls {fill.count:>6}  p50 <= {fill.quantile(0.5) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+bench_job_log.py
+Benchmark: structured job log for a 24-bay station
+
+Publishes the events of `--bays` back-to-back wipe jobs (4 progress events
+per second each, as the EventStream sends them, plus phase, status, summary
+and state records) covering `--hours` of simulated time into a JobLog, and
+reports the publishing-thread cost per event, the records kept and the
+bytes on disk after compression.
+
+    python bench_job_log.py [--bays 24] [--hours 24] [--job-minutes 60]
+"""
+import argparse
+import gzip
+import os
+import statistics
+import tempfile
+import time
+from job_log import JobLog, log_files
+from progress_events import JobEvent, PhaseEvent, ProgressEvent, StateEvent, StatusEvent, SummaryEvent
+
+MB = 1024 * 1024
+
+
+def job_events(bay, n, start, seconds):
+    job_id = f"b{bay:02d}j{n:04d}"
+    total = 500 * 1024**3
+    yield JobEvent(job_id, f"PhysicalDrive{bay} - WDC WD5000AAKX (500 GB)", f"\\\\.\\PhysicalDrive{bay}",
+                   "WDC WD5000AAKX", f"WD-{bay:02d}{n:06d}", total, 1, time=start)
+    yield PhaseEvent(job_id, "wipe", time=start)
+    yield StatusEvent(job_id, "wipe", f"Overwriting \\\\.\\PhysicalDrive{bay} with random data (1 pass(es))...", time=start)
+    for i in range(int(seconds * 4)):
+        done = total * i // int(seconds * 4)
+        yield ProgressEvent(job_id, "wipe", done * 100 // total, done, total, 140.0 + (i % 7), seconds - i / 4,
+                            time=start + i / 4)
+    end = start + seconds
+    yield SummaryEvent(job_id, "1-pass random overwrite -> SHA-256 read-back verify", {"wipe": seconds},
+                       {"avg_mbps": 142.1, "min_mbps": 98.4, "bytes_written": total}, time=end)
+    yield StateEvent(job_id, "done", "WIPED - certificate queued", time=end)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[2])
+    parser.add_argument("--bays", type=int, default=24)
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--job-minutes", type=float, default=60)
+    args = parser.parse_args()
+
+    seconds = args.job_minutes * 60
+    jobs_per_bay = int(args.hours * 60 / args.job_minutes)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Simulated time runs ~1000x faster than live here, so the queue is
+        # unbounded; live, 24 bays send about 100 events a second
+        log = JobLog(tmp, station="bench", max_bytes=16 * MB, queue_size=0).start()
+        published, costs = 0, []
+        wall = time.perf_counter()
+        for n in range(jobs_per_bay):
+            streams = [job_events(bay, n, n * seconds, seconds) for bay in range(args.bays)]
+            for batch in zip(*streams):      # the bays interleave as they would live
+                start = time.perf_counter()
+                for event in batch:
+                    log(event)
+                costs.append((time.perf_counter() - start) / len(batch))
+                published += len(batch)
+        publish_wall = time.perf_counter() - wall
+        log.close()
+        total_wall = time.perf_counter() - wall
+
+        compressed = sum(os.path.getsize(p) for p in log_files(tmp, "bench", compressed_only=True))
+        with open(log.path, "rb") as f:
+            live = f.read()
+        live_gz = len(gzip.compress(live, 6))
+
+    costs.sort()
+    print(f"{args.bays} bays x {jobs_per_bay} jobs ({args.hours:g} h simulated): {published} events published, "
+          f"{log.written} records kept, {log.dropped} dropped")
+    print(f"  publish cost per event: median {statistics.median(costs) * 1e6:.2f} us, "
+          f"p99 {costs[int(len(costs) * 0.99)] * 1e6:.2f} us ({publish_wall:.1f}s to publish, "
+          f"{total_wall:.1f}s until written)")
+    print(f"  on disk: {(compressed + live_gz) / MB:.1f} MB compressed "
+          f"({compressed / MB:.1f} MB rotated + {live_gz / MB:.1f} MB live after gzip; "
+          f"{len(live) / MB:.1f} MB live as written)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+bench_job_table.py
+Benchmark: UI-thread cost per frame of the job dashboard with many active jobs
+
+`--jobs` producer threads each publish progress as fast as `--rate` per second
+into one EventStream (throttled per job, as the wipe workers do). Every frame
+the table takes the coalesced changes and repaints; the time spent on the UI
+thread per frame (model update + repaint) is reported as CPU time of the UI
+thread and as wall time; the wall time includes waiting for the GIL held by
+the producer threads, which real I/O-bound workers hold far less.
+
+    QT_QPA_PLATFORM=offscreen python bench_job_table.py [--jobs 24] [--rate 500] [--seconds 3]
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+from PyQt5 import QtCore, QtWidgets
+from job_table import JobTable
+from progress_events import EventStream, PhaseEvent, ProgressEvent, StateEvent
+
+
+def produce(stream, job_id, rate, seconds, counter):
+    total = 500 * 1024**3
+    stream.publish(StateEvent(job_id, "running"))
+    stream.publish(PhaseEvent(job_id, "wipe"))
+    start = time.perf_counter()
+    n = 0
+    while time.perf_counter() - start < seconds:
+        done = int(total * min(1.0, (time.perf_counter() - start) / seconds))
+        stream.publish(ProgressEvent(job_id, "wipe", done * 100 // total, done, total,
+                                     150 + 50 * ((n // 40) % 3), (total - done) / (150 * 1024**2)))
+        n += 1
+        time.sleep(1 / rate)
+    counter.append(n)
+    stream.publish(StateEvent(job_id, "done"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=24)
+    parser.add_argument("--rate", type=int, default=500, help="progress events per job per second")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+    app = QtWidgets.QApplication(sys.argv)
+
+    table = JobTable(frame_ms=10 ** 6)    # frames are driven below so they can be timed
+    table.resize(900, 24 * 22 + 30)
+    table.show()
+    stream = EventStream().start()
+    delivered = []
+    stream.subscribe(lambda e: delivered.append(1))
+    stream.subscribe(table.feed)
+    for j in range(args.jobs):
+        table.feed.add_job(f"job{j}", f"PhysicalDrive{j} - Bench Disk (500 GB)")
+
+    counter = []
+    producers = [threading.Thread(target=produce, args=(stream, f"job{j}", args.rate, args.seconds, counter))
+                 for j in range(args.jobs)]
+    for t in producers:
+        t.start()
+    frames, cpu = [], []
+    while any(t.is_alive() for t in producers):
+        start, start_cpu = time.perf_counter(), time.thread_time()
+        table.refresh()
+        table.viewport().repaint()
+        cpu.append((time.thread_time() - start_cpu) * 1000)
+        frames.append((time.perf_counter() - start) * 1000)
+        app.processEvents()
+        time.sleep(0.1)
+    stream.stop()
+
+    published = sum(counter)
+    print(f"{args.jobs} jobs: {published} progress events published, {len(delivered)} delivered after throttling")
+    print(f"UI thread per frame (100 ms frames, {len(frames)} frames): "
+          f"CPU median {statistics.median(cpu):.2f} ms, max {max(cpu):.2f} ms; "
+          f"wall median {statistics.median(frames):.2f} ms, max {max(frames):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
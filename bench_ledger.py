@@ -0,0 +1,76 @@
+"""
+bench_ledger.py
+Benchmark: certificate ledger lookups and chain verification at scale
+
+Fills a fresh ledger with synthetic certificate records (spread over a year,
+10k distinct serials), then times indexed lookups by serial, by model over a
+quarter, and one full hash-chain scan.
+
+    python bench_ledger.py [--entries 200000] [--db ledger_bench.db]
+"""
+import argparse
+import os
+import tempfile
+import time
+from certificate_ledger import CertificateLedger
+
+BATCH = 10000
+
+
+def make_items(start, count, serials):
+    for i in range(start, start + count):
+        day = 1 + i % 365
+        recorded = f"2026-{1 + (day - 1) // 31 % 12:02d}-{1 + (day - 1) % 28:02d}T12:00:00+00:00"
+        record = {"job_id": f"job-{i}", "certificate": f"cert-{i}.pdf", "passes": 3,
+                  "target": {"serial": f"SN{i % serials:06d}", "model": f"Model {i % 40}",
+                             "device": f"\\\\.\\PhysicalDrive{i % 24}", "size_bytes": 500 * 1024**3}}
+        yield record, "done" if i % 50 else "partial", None, recorded
+
+
+def timed(label, fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    seconds = (time.perf_counter() - start) / repeat
+    print(f"{label:<32}: {seconds * 1000:10.2f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=200000)
+    parser.add_argument("--serials", type=int, default=10000)
+    parser.add_argument("--db", default=None, help="keep the ledger at this path (default: temporary)")
+    args = parser.parse_args()
+
+    tmp = None
+    if args.db is None:
+        tmp = tempfile.TemporaryDirectory()
+        args.db = os.path.join(tmp.name, "ledger.db")
+    ledger = CertificateLedger(args.db, station="bench")
+
+    start = time.perf_counter()
+    for offset in range(0, args.entries, BATCH):
+        ledger.append_many(list(make_items(offset, min(BATCH, args.entries - offset), args.serials)))
+    seconds = time.perf_counter() - start
+    print(f"append {args.entries} entries        : {seconds:.1f}s ({args.entries / seconds:.0f}/s), "
+          f"{os.path.getsize(args.db) / 1024**2:.0f} MB")
+
+    rows = timed("find serial (all time)", lambda: ledger.find(serial="SN000042"), repeat=20)
+    print(f"  {len(rows)} entries")
+    rows = timed("find serial, one quarter", lambda: ledger.find(serial="SN000042", since="2026-07-01",
+                                                                 until="2026-10-01"), repeat=20)
+    print(f"  {len(rows)} entries")
+    rows = timed("find model, one month", lambda: ledger.find(model="Model 7", since="2026-03-01",
+                                                              until="2026-04-01"), repeat=5)
+    print(f"  {len(rows)} entries")
+    timed("single append", lambda: ledger.append(next(make_items(args.entries, 1, args.serials))[0]), repeat=20)
+    ok, checked, bad = timed("verify whole chain", ledger.verify_chain)
+    print(f"  ok={ok} checked={checked}")
+    ledger.close()
+    if tmp is not None:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+bench_log_view.py
+Benchmark: UI-thread responsiveness while status lines stream into the log
+
+A producer thread emits `--rate` lines per second for `--seconds`. "per-line"
+is the old path (one queued signal per line into QTextEdit.append plus
+ensureCursorVisible); "batched" feeds LogView, which appends once per frame.
+A 10 ms heartbeat timer on the UI thread measures how late events run.
+
+    QT_QPA_PLATFORM=offscreen python bench_log_view.py [--rate 10000] [--seconds 3]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from PyQt5 import QtCore, QtWidgets
+from log_view import LogView
+
+
+class Producer(QtCore.QObject):
+    line = QtCore.pyqtSignal(str)
+
+    def __init__(self, rate, seconds, sink=None):
+        super().__init__()
+        self.rate, self.seconds, self.sink = rate, seconds, sink
+        self.done_at = None
+
+    def run(self):
+        batch = max(1, self.rate // 100)
+        start = time.perf_counter()
+        n = 0
+        while n < self.rate * self.seconds:
+            for _ in range(batch):
+                text = f"⚙️  Diskpart: line {n} of streamed output"
+                if self.sink is not None:
+                    self.sink(text)
+                else:
+                    self.line.emit(text)
+                n += 1
+            delay = start + n / self.rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        self.done_at = time.perf_counter()
+
+
+def run(app, label, widget, producer, expected, shown):
+    gaps = []
+    last = [time.perf_counter()]
+
+    def beat():
+        now = time.perf_counter()
+        gaps.append((now - last[0]) * 1000)
+        last[0] = now
+
+    heartbeat = QtCore.QTimer()
+    heartbeat.setInterval(10)
+    heartbeat.timeout.connect(beat)
+    heartbeat.start()
+    widget.show()
+    thread = threading.Thread(target=producer.run, daemon=True)
+    start = time.perf_counter()
+    thread.start()
+    while thread.is_alive() or shown() < expected:
+        app.processEvents(QtCore.QEventLoop.AllEvents, 50)
+        if time.perf_counter() - start > producer.seconds * 20:
+            break
+    caught_up = time.perf_counter() - producer.done_at
+    heartbeat.stop()
+    gaps.sort()
+    print(f"{label:<9}: heartbeat median {statistics.median(gaps):6.1f} ms, p99 {gaps[int(len(gaps) * 0.99)]:7.1f} ms, "
+          f"max {gaps[-1]:7.1f} ms; view caught up {caught_up:5.2f}s after producer; "
+          f"{widget.document().blockCount()} blocks kept")
+    widget.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rate", type=int, default=10000, help="lines per second")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--capacity", type=int, default=2000)
+    args = parser.parse_args()
+    app = QtWidgets.QApplication(sys.argv)
+    expected = int(args.rate * args.seconds)
+
+    old = QtWidgets.QTextEdit()
+    old.setReadOnly(True)
+    received = [0]
+
+    def append_log(text):
+        old.append(text)
+        old.ensureCursorVisible()
+        received[0] += 1
+
+    producer = Producer(args.rate, args.seconds)
+    producer.line.connect(append_log)       # queued: emitted from the producer thread
+    run(app, "per-line", old, producer, expected, lambda: received[0])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        spill = os.path.join(tmp, "activity.log")
+        view = LogView(capacity=args.capacity, spill_path=spill)
+        taken = [0]
+        drain = view.buffer.drain
+
+        def counting_drain():
+            lines = drain()
+            taken[0] += len(lines)
+            return lines
+
+        view.buffer.drain = counting_drain
+        run(app, "batched", view, Producer(args.rate, args.seconds, sink=view.append), expected,
+            lambda: taken[0] + view.buffer.dropped)
+        view.stop()
+        with open(spill, encoding="utf-8") as f:
+            print(f"  history file: {sum(1 for _ in f)} lines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+bench_mmap.py
+Benchmark: memory-mapped vs pwrite overwrite of a large image file
+
+Overwrites a scratch image of `--size-mb` once per variant, each in a fresh
+process so its peak RSS is its own:
+
+    pwrite+urandom   OverwriteEngine as shipped
+    pwrite+numpy     OverwriteEngine with the NumPy fill (data cost only)
+    mmap+numpy       MmapOverwriteEngine, `--window-mb` mapped at a time
+
+and reports throughput, CPU time and peak RSS for each.
+
+    python bench_mmap.py [--size-mb 2048] [--block-kb 4096] [--window-mb 256] [--sync-mb 64] [--dir .]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from wipe_engine import FileTarget, MmapOverwriteEngine, OverwriteEngine, MB, numpy_random
+
+try:
+    import resource
+except ImportError:      # Windows: peak RSS is not reported
+    resource = None
+
+VARIANTS = ("pwrite+urandom", "pwrite+numpy", "mmap+numpy")
+
+
+def run_variant(args):
+    block, window, sync = args.block_kb * 1024, args.window_mb * MB, args.sync_mb * MB
+    with FileTarget(args.path) as target:
+        if args.variant == "mmap+numpy":
+            engine = MmapOverwriteEngine(target, block_size=block, window_size=window, sync_bytes=sync)
+        else:
+            fill = numpy_random() if args.variant == "pwrite+numpy" else None
+            engine = OverwriteEngine(target, block_size=block, fill=fill)
+        cpu, start = time.process_time(), time.perf_counter()
+        report = engine.run()
+        seconds, cpu = time.perf_counter() - start, time.process_time() - cpu
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 if resource else None
+    print(json.dumps({"seconds": seconds, "cpu": cpu, "bytes": report.bytes_written, "peak_rss": peak}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[2])
+    parser.add_argument("--size-mb", type=int, default=2048)
+    parser.add_argument("--block-kb", type=int, default=4096)
+    parser.add_argument("--window-mb", type=int, default=256)
+    parser.add_argument("--sync-mb", type=int, default=64)
+    parser.add_argument("--dir", default=None, help="where to put the scratch image (default: temp dir)")
+    parser.add_argument("--variant", choices=VARIANTS, help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.variant:
+        return run_variant(args)
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        path = os.path.join(tmp, "disk.img")
+        with open(path, "wb") as f:
+            f.truncate(args.size_mb * MB)
+        print(f"{args.size_mb} MB image, {args.block_kb} KB blocks, {args.window_mb} MB window, "
+              f"msync every {args.sync_mb} MB")
+        for variant in VARIANTS:
+            out = subprocess.run([sys.executable, __file__, "--variant", variant, "--path", path,
+                                  "--block-kb", str(args.block_kb), "--window-mb", str(args.window_mb),
+                                  "--sync-mb", str(args.sync_mb)],
+                                 capture_output=True, text=True, check=True).stdout
+            r = json.loads(out.strip().splitlines()[-1])
+            rss = f"{r['peak_rss'] / MB:6.0f} MB" if r["peak_rss"] else "     n/a"
+            print(f"  {variant:<15} {r['seconds']:7.2f}s  {r['bytes'] / MB / r['seconds']:7.0f} MB/s  "
+                  f"CPU {r['cpu']:6.2f}s  peak RSS {rss}")
+
+
+if __name__ == "__main__":
+    main()
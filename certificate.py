@@ -1,67 +1,417 @@
 """
 certificate.py
 Certificate generation logic for Code Monk — Secure Formatter
+
+The layout of the page (field positions, logo encoding) is prepared once per
+process as a CertificateTemplate. Each certificate draws the static part (logo,
+title, labels, signature line, legal text) into one form XObject through
+reportlab's public beginForm/endForm/doForm API, then stamps its own fields.
 """
+import io
 import os
 import datetime
+import functools
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image
+from reportlab import rl_config
 from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfgen import canvas
-from PIL import Image
-from utils import COMPANY_NAME, LOGO_FILE, CERT_DIR, resource_path
+from utils import COMPANY_NAME, LOGO_FILE, CERT_DIR, resource_path, station_dir
+from drive_utils import as_record
+from speed_probe import format_duration
+from certificate_record import build_record, sidecar_path, sign_record, station_signer, write_record
+from certificate_ledger import station_ledger
 
-def generate_certificate(entry, target_drive=None):
-    now = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    cert_filename = f"CodeMonk_SecureCertificate_{now}.pdf"
-    
-    # Determine where to save the certificate
-    if target_drive and os.path.exists(target_drive):
-        cert_path = os.path.join(target_drive, cert_filename)
-        save_location = f"saved to formatted drive ({target_drive})"
-    else:
-        cert_path = os.path.join(CERT_DIR, cert_filename)
-        save_location = "saved to application directory"
-    
+MAX_LISTED_RANGES = 12
+MAX_LISTED_PASSES = 8       # longer standards (Gutmann) list the rest as one line
+LOGO_WIDTH = 200
+LOGO_DPI = 200             # print resolution the logo is downscaled to
+LOGO_JPEG_QUALITY = 90
+CERT_FONTS = ("Helvetica", "Helvetica-Bold", "Courier")
+RENDER_WORKERS = 4
+PLACEMENT_ATTEMPTS = 15     # looks for the reformatted volume before falling back to the station directory
+PLACEMENT_INTERVAL = 2.0
+STATION_CERT_DIR = "certificates"
+QUEUE_WORKERS = 4
+TEMPLATE_FORM = "CertificateTemplate"
+DEFAULT_METHOD = "Not recorded"
+
+# Binary streams as-is: ASCII85 only inflates them by a quarter and costs time per image
+rl_config.useA85 = 0
+
+@functools.lru_cache(maxsize=None)
+def load_logo():
+    """Logo scaled to print size and JPEG-encoded once per process: (ImageReader, width, height), or None"""
+    logo_path = resource_path(LOGO_FILE)
+    if not os.path.exists(logo_path):
+        return None
     try:
-        c = canvas.Canvas(cert_path, pagesize=A4)
-        w, h = A4
-        logo_path = resource_path(LOGO_FILE)
-        if os.path.exists(logo_path):
+        im = Image.open(logo_path)
+        iw, ih = im.size
+        target_h = int(ih * (LOGO_WIDTH / iw))
+        px = int(LOGO_WIDTH * LOGO_DPI / 72)
+        im = im.convert("RGB")
+        if iw > px:
+            im = im.resize((px, int(ih * px / iw)), Image.LANCZOS)
+        buf = io.BytesIO()
+        im.save(buf, "JPEG", quality=LOGO_JPEG_QUALITY)
+        buf.seek(0)
+        # A JPEG reader is embedded byte for byte, with no per-certificate re-encoding
+        return ImageReader(buf), LOGO_WIDTH, target_h
+    except Exception:
+        return None
+
+class CertificateTemplate:
+    """Static certificate page with the positions of its variable fields"""
+
+    FIELDS = (
+        ("target", "Target    : "),
+        ("method", "Method    : "),
+        ("standard", "Standard  : "),
+        ("date", "Date      : "),
+        ("duration", "Duration  : "),
+        ("location", "Certificate: "),
+    )
+
+    def __init__(self, logo=None):
+        self.logo = logo
+        self.width, self.height = A4
+        y = self.height - 190
+        self.positions = {}
+        for name, label in self.FIELDS:
+            y -= 18
+            self.positions[name] = (80 + pdfmetrics.stringWidth(label, "Helvetica", 11), y)
+        self.digest_y = y - 18
+        self.signature_y = y - 48
+        self.extra_y = self.signature_y - 76    # below the legal paragraph
+
+    def draw_logo(self, c):
+        # The image is a resource of each PDF, so it is added per certificate (already JPEG-encoded)
+        if self.logo is not None:
+            reader, target_w, target_h = self.logo
             try:
-                im = Image.open(logo_path)
-                iw, ih = im.size
-                target_w = 200
-                target_h = int(ih * (target_w / iw))
-                c.drawImage(logo_path, w/2 - target_w/2, h - 120, width=target_w, height=target_h, preserveAspectRatio=True, mask='auto')
+                c.drawImage(reader, self.width/2 - target_w/2, self.height - 120, width=target_w, height=target_h,
+                            preserveAspectRatio=True, mask='auto')
             except Exception:
                 pass
-        y = h - 160
+
+    def draw_static(self, c):
+        w, h = self.width, self.height
         c.setFont("Helvetica-Bold", 18)
-        c.drawCentredString(w/2, y, "SECURE FORMAT CERTIFICATE")
-        y -= 30
+        c.drawCentredString(w/2, h - 160, "SECURE FORMAT CERTIFICATE")
         c.setFont("Helvetica", 11)
-        c.drawString(80, y, f"Issued by : {COMPANY_NAME}")
-        y -= 18
-        c.drawString(80, y, f"Target    : {entry.get('display') or entry.get('device')}")
-        y -= 18
-        c.drawString(80, y, f"Method    : Overwrite -> Delete -> Free Space Wipe -> Format")
-        y -= 18
-        c.drawString(80, y, f"Date      : {datetime.datetime.now().strftime('%d-%m-%Y %H:%M:%S')}")
-        y -= 18
-        c.drawString(80, y, f"Certificate: {save_location}")
-        y -= 30
+        c.drawString(80, h - 190, f"Issued by : {COMPANY_NAME}")
+        for name, label in self.FIELDS:
+            c.drawString(80, self.positions[name][1], label)
+        y = self.signature_y
         c.drawString(80, y, "Digital Signature:")
         c.line(80, y-6, 260, y-6)
-        
+
         # Add verification info
         y -= 40
         c.setFont("Helvetica", 9)
-        c.drawString(80, y, "This certificate confirms that the specified drive has been securely wiped")
+        c.drawString(80, y, "This certificate confirms that the specified drive has been wiped by the")
         y -= 12
-        c.drawString(80, y, "using industry-standard methods including file overwriting, free space")
+        c.drawString(80, y, "method stated above, following the named overwrite standard. Sectors the")
         y -= 12
-        c.drawString(80, y, "wiping, and complete reformatting. All data has been irreversibly destroyed.")
-        
+        c.drawString(80, y, "drive refused to write, if any, are listed below and were not overwritten.")
+
+    def stamp(self, cert_path, fields, report=None):
+        """Write one certificate: the static page as a form XObject plus this job's fields"""
+        c = canvas.Canvas(cert_path, pagesize=A4, pageCompression=1)
+        c.setTitle("Secure Format Certificate")
+        c.setAuthor(COMPANY_NAME)
+        # A form is a resource of one PDF, so the static layer is drawn once per certificate;
+        # it is a dozen text operators, the logo is already encoded
+        c.beginForm(TEMPLATE_FORM)
+        self.draw_logo(c)
+        self.draw_static(c)
+        c.endForm()
+        c.doForm(TEMPLATE_FORM)
+
+        for name, _ in self.FIELDS:
+            x, y = self.positions[name]
+            text = str(fields.get(name, ""))
+            # Shrink long values (a full method chain) to fit the line
+            size = 11
+            while size > 7 and pdfmetrics.stringWidth(text, "Helvetica", size) > self.width - 40 - x:
+                size -= 0.5
+            c.setFont("Helvetica", size)
+            c.drawString(x, y, text)
+        if fields.get("digest"):
+            c.setFont("Courier", 8)
+            c.drawString(80, self.digest_y, f"Digest: {fields['digest']}")
+
+        y = self.extra_y + 30
+        if fields.get("performance"):
+            y -= 30
+            c.setFont("Helvetica-Bold", 11)
+            c.drawString(80, y, "Performance")
+            c.setFont("Courier", 8)
+            for line in fields["performance"]:
+                y -= 11
+                c.drawString(90, y, line)
+
+        if report is not None and report.bad_ranges:
+            # Sectors the drive refused to write still hold old data - the certificate must say so
+            y -= 30
+            c.setFont("Helvetica-Bold", 11)
+            c.drawString(80, y, f"Unwritable sectors: {len(report.bad_ranges)} range(s), {report.unwritable_bytes} bytes")
+            c.setFont("Courier", 8)
+            for start, end in report.bad_ranges[:MAX_LISTED_RANGES]:
+                y -= 11
+                c.drawString(90, y, f"bytes {start:>15} - {end - 1:<15} (LBA {start // 512} - {(end - 1) // 512})")
+            if len(report.bad_ranges) > MAX_LISTED_RANGES:
+                y -= 11
+                c.drawString(90, y, f"... and {len(report.bad_ranges) - MAX_LISTED_RANGES} more range(s)")
+
         c.save()
+
+@functools.lru_cache(maxsize=None)
+def get_template():
+    return CertificateTemplate(load_logo())
+
+def warm_cache():
+    """Build the template and load font metrics up front (pool initializer)"""
+    for name in CERT_FONTS:
+        pdfmetrics.getFont(name)
+    get_template()
+
+def reserve_certificate_path(directory, now=None):
+    """Create an empty, uniquely named certificate file and return its path"""
+    stamp = (now or datetime.datetime.now()).strftime("%Y%m%d_%H%M%S")
+    while True:
+        path = os.path.join(directory, f"CodeMonk_SecureCertificate_{stamp}_{uuid.uuid4().hex[:8]}.pdf")
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return path
+        except FileExistsError:
+            continue
+
+def _gb(nbytes):
+    return f"{nbytes / 1024**3:.1f} GB"
+
+def _signature_summary(signatures):
+    """'gpt x2, ntfs, ext' from 'gpt @ 512' style entries"""
+    counts = {}
+    for s in signatures:
+        name = s.split(" @ ")[0]
+        counts[name] = counts.get(name, 0) + 1
+    return ", ".join(name if n == 1 else f"{name} x{n}" for name, n in counts.items()) or "none"
+
+def _quick_wipe_lines(metrics):
+    lines = [f"Metadata only - data blocks NOT overwritten: {metrics['regions']} region(s), "
+             f"{metrics['bytes_written'] // 1024} KB zeroed in {format_duration(metrics['seconds'])}",
+             f"Signatures found: {_signature_summary(metrics['signatures_found'])}"]
+    remaining = metrics["remaining_signatures"]
+    if remaining or metrics["failed_regions"]:
+        lines.append(f"Signature scan ({metrics['scan_probes']} probes): STILL RECOGNISABLE "
+                     f"{_signature_summary(remaining)}, {metrics['failed_regions']} failed region(s)")
+    else:
+        lines.append(f"Signature scan ({metrics['scan_probes']} probes): clean")
+    return lines
+
+def performance_lines(report=None, job=None):
+    """What the engine measured: per pass rates, verification, block size, retries and phase times"""
+    lines = []
+    metrics = (job or {}).get("metrics") or (report.metrics() if report is not None else None)
+    if metrics and metrics.get("mode") == "metadata":
+        lines += _quick_wipe_lines(metrics)
+    elif metrics:
+        lines.append(f"Block size {metrics['block_size'] // 1024} KB, concurrency {metrics['concurrency']}, "
+                     f"retries {metrics['retries']}, skipped ranges {metrics['skipped_ranges']}")
+        passes = metrics["passes"]
+        listed = passes if len(passes) <= MAX_LISTED_PASSES else passes[:MAX_LISTED_PASSES - 1]
+        for p in listed:
+            pattern = f" ({p['pattern']})" if p.get("pattern") else ""
+            lines.append(f"Pass {p['pass']}{pattern}: {_gb(p['bytes_written'])} in {format_duration(p['seconds'])}, "
+                         f"avg {p['avg_mbps']} MB/s, min {p['min_mbps']} MB/s")
+        rest = passes[len(listed):]
+        if rest:
+            lows = [p["min_mbps"] for p in rest if p["min_mbps"]]
+            lines.append(f"Passes {rest[0]['pass']}-{rest[-1]['pass']}: {_gb(sum(p['bytes_written'] for p in rest))} "
+                         f"in {format_duration(sum(p['seconds'] for p in rest))}, "
+                         f"min {min(lows) if lows else None} MB/s")
+        if metrics["verified"] is not None:
+            outcome = "digest match" if metrics["verified"] else "DIGEST MISMATCH"
+            lines.append(f"Verify: {_gb(metrics['bytes_verified'])} read back in "
+                         f"{format_duration(metrics['verify_seconds'])}, {outcome}")
+    phases = (job or {}).get("phases")
+    if phases:
+        parts = [f"{name} {format_duration(seconds)}" for name, seconds in phases.items()]
+        for i in range(0, len(parts), 5):
+            lines.append(("Phases: " if i == 0 else "        ") + ", ".join(parts[i:i + 5]))
+    return lines
+
+def certificate_fields(entry, save_location, report=None, digest=None, job=None):
+    """Values stamped onto the template for one certificate"""
+    job = job or {}
+    if job.get("method"):
+        method = job["method"]
+    elif report is not None:
+        method = f"Clean -> {report.passes}-pass overwrite -> Format"
+    else:
+        method = DEFAULT_METHOD
+    if job.get("started") and job.get("finished"):
+        duration = format_duration(job["finished"] - job["started"])
+    else:
+        duration = format_duration(report.seconds) if report is not None else "n/a"
+    return {
+        "target": entry.label,
+        "method": method,
+        "standard": job.get("standard") or "n/a",
+        "date": datetime.datetime.now().strftime('%d-%m-%Y %H:%M:%S'),
+        "duration": duration,
+        "location": save_location,
+        "digest": digest,
+        "performance": performance_lines(report, job),
+    }
+
+def station_certificate_dir():
+    """Where certificates go when the wiped volume cannot be identified"""
+    return os.path.join(station_dir(), STATION_CERT_DIR)
+
+def generate_certificate(entry, target_drive=None, report=None, digest=None, job=None, fallback_dir=None):
+    """Render the PDF certificate; `report` is the wipe_engine.WipeReport when the disk was overwritten.
+
+    With `job` (id, passes, started, finished) a signed JSON record is written next to the PDF
+    and indexed in the station's certificate ledger. Without a target drive it goes to
+    `fallback_dir`, or CERT_DIR.
+    """
+    entry = as_record(entry)
+
+    # Determine where to save the certificate
+    if target_drive and os.path.exists(target_drive):
+        directory = target_drive
+        save_location = f"saved to formatted drive ({target_drive})"
+    elif fallback_dir:
+        directory = fallback_dir
+        save_location = f"saved to station directory ({fallback_dir})"
+    else:
+        directory = CERT_DIR
+        save_location = "saved to application directory"
+
+    cert_path = None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        cert_path = reserve_certificate_path(directory)
+        if digest is None and report is not None:
+            digest = report.digest
+        fields = certificate_fields(entry, save_location, report, digest, job)
+        get_template().stamp(cert_path, fields, report)
+        if job is not None:
+            record = build_record(entry, report, job, digest, cert_path, fields["method"])
+            signed = sign_record(record, station_signer())
+            write_record(sidecar_path(cert_path), signed)
+            result = "partial" if report is not None and report.bad_ranges else "done"
+            try:
+                station_ledger().append(signed, result, os.path.abspath(cert_path))
+            except Exception as e:
+                # The PDF and its record exist, so name them: the job still failed
+                return f"ERROR_LEDGER: {cert_path} ({save_location}) was not indexed in the ledger: {e}"
         return f"{cert_path} ({save_location})"
     except Exception as e:
+        if cert_path and os.path.exists(cert_path) and os.path.getsize(cert_path) == 0:
+            os.remove(cert_path)
         return f"ERROR_GEN_CERT: {e}"
+
+class CertificateRenderer:
+    """Renders certificates in a process pool so a batch of finished jobs does not queue on one thread"""
+
+    def __init__(self, workers=RENDER_WORKERS):
+        self.workers = max(1, min(workers, os.cpu_count() or 1))
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_cache)
+            return self._pool
+
+    def submit(self, entry, target_drive=None, report=None, **kwargs):
+        """Future resolving to generate_certificate()'s result string"""
+        entry = as_record(entry)
+        try:
+            return self._executor().submit(generate_certificate, entry, target_drive, report, **kwargs)
+        except (BrokenProcessPool, OSError, RuntimeError):
+            # No worker processes available (e.g. pool died): render here instead
+            future = Future()
+            future.set_result(generate_certificate(entry, target_drive, report, **kwargs))
+            return future
+
+    def render_batch(self, items):
+        """Render (entry, target_drive, report) tuples; results come back in input order"""
+        futures = [self.submit(*item) for item in items]
+        return [f.result() for f in futures]
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+class CertificateQueue:
+    """Certificate placement and rendering in the background, off the wipe's critical path.
+
+    A request waits for its target volume (calling `locate` until it returns a
+    drive letter, or giving up after `attempts`), then renders through the
+    renderer's process pool - or inline without one - and hands the result
+    string to on_done.
+    """
+
+    def __init__(self, renderer=None, workers=QUEUE_WORKERS, attempts=PLACEMENT_ATTEMPTS,
+                 interval=PLACEMENT_INTERVAL, sleep=time.sleep):
+        self.renderer = renderer
+        self.attempts = attempts
+        self.interval = interval
+        self.sleep = sleep
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="certificate")
+        self._lock = threading.Lock()
+        self.pending = 0
+
+    def submit(self, entry, report=None, job=None, target_drive=None, locate=None,
+               on_done=None, on_status=None, fallback_dir=None):
+        """Queue one certificate; returns a Future of generate_certificate()'s result string"""
+        with self._lock:
+            self.pending += 1
+        return self.executor.submit(self._place, as_record(entry), report, job, target_drive,
+                                    locate, on_done, on_status, fallback_dir)
+
+    def _place(self, entry, report, job, target_drive, locate, on_done, on_status, fallback_dir=None):
+        status = on_status or (lambda message: None)
+        try:
+            if target_drive is None and locate is not None:
+                for attempt in range(self.attempts):
+                    target_drive = locate()
+                    if target_drive:
+                        status(f"Found formatted drive at: {target_drive}")
+                        break
+                    if attempt + 1 < self.attempts:
+                        self.sleep(self.interval)
+                else:
+                    fallback_dir = station_certificate_dir()
+                    status(f"Could not identify the formatted volume, saving certificate to {fallback_dir}")
+            if self.renderer is not None:
+                result = self.renderer.submit(entry, target_drive, report, job=job, fallback_dir=fallback_dir).result()
+            else:
+                result = generate_certificate(entry, target_drive, report, job=job, fallback_dir=fallback_dir)
+        except Exception as e:
+            result = f"ERROR_GEN_CERT: {e}"
+        finally:
+            with self._lock:
+                self.pending -= 1
+        if on_done is not None:
+            on_done(result)
+        return result
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+        if self.renderer is not None and wait:
+            self.renderer.shutdown()
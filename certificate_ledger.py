@@ -0,0 +1,293 @@
+"""
+certificate_ledger.py
+Append-only certificate ledger for Code Monk — Secure Formatter
+
+Every certificate is indexed in a local SQLite database (WAL mode) by serial,
+model, date, station and result, so audits are index lookups instead of
+opening PDFs one by one. Each entry stores the SHA-256 of the previous entry
+and of itself; editing, deleting or reordering rows breaks the chain, which
+verify_chain() finds in one linear scan. Triggers reject UPDATE and DELETE.
+Cutting rows off the end leaves a valid chain, so with a signer every append
+also rewrites a signed head record (`<db>.head`: last seq and hash) inside the
+same write transaction, and verification checks that the chain ends there.
+
+    python certificate_ledger.py find --serial SN0001 --since 2026-07-01
+    python certificate_ledger.py verify
+"""
+import argparse
+import datetime
+import functools
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+from certificate_record import canonical_json, load_key, sign_record, station_key_path, station_signer, verify_record
+from utils import station_dir
+
+LEDGER_FILE = "codemonk_ledger.db"
+GENESIS_HASH = "0" * 64
+VERIFY_BATCH = 10000
+BUSY_TIMEOUT_MS = 10000     # several processes (render pool, job server) may append at once
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ledger (
+    seq INTEGER PRIMARY KEY,
+    recorded TEXT NOT NULL,
+    station TEXT NOT NULL,
+    serial TEXT,
+    model TEXT,
+    device TEXT,
+    result TEXT NOT NULL,
+    certificate TEXT,
+    record TEXT NOT NULL,
+    prev_hash TEXT NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ledger_serial ON ledger(serial, recorded);
+CREATE INDEX IF NOT EXISTS ledger_model ON ledger(model, recorded);
+CREATE INDEX IF NOT EXISTS ledger_station ON ledger(station, recorded);
+CREATE INDEX IF NOT EXISTS ledger_result ON ledger(result, recorded);
+CREATE INDEX IF NOT EXISTS ledger_recorded ON ledger(recorded);
+CREATE TRIGGER IF NOT EXISTS ledger_no_update BEFORE UPDATE ON ledger
+BEGIN SELECT RAISE(ABORT, 'ledger is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS ledger_no_delete BEFORE DELETE ON ledger
+BEGIN SELECT RAISE(ABORT, 'ledger is append-only'); END;
+"""
+
+COLUMNS = ("seq", "recorded", "station", "serial", "model", "device", "result", "certificate", "record")
+FILTERS = ("serial", "model", "station", "result")
+
+
+def entry_hash(prev_hash, entry):
+    """Chain hash of one entry: SHA-256 over the previous hash and the entry's canonical JSON"""
+    body = canonical_json({k: entry[k] for k in COLUMNS})
+    return hashlib.sha256(prev_hash.encode("ascii") + body).hexdigest()
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+
+
+class CertificateLedger:
+    """Append-only, hash-chained SQLite index of issued certificates"""
+
+    def __init__(self, path=LEDGER_FILE, station=None, signer=None):
+        self.path = path
+        self.station = station or socket.gethostname()
+        self.signer = signer            # certificate_record signer for the head record; None = no head
+        self.head_path = path + ".head"
+        self.problem = None             # why the last verify_chain() failed
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+                                    isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def append(self, record, result="done", certificate=None, recorded=None):
+        """Add one certificate record (the signed sidecar dict); returns the new entry"""
+        return self.append_many([(record, result, certificate, recorded)])[-1]
+
+    def append_many(self, items):
+        """Append (record, result, certificate, recorded) tuples in one transaction"""
+        entries = []
+        with self._lock:
+            # IMMEDIATE takes the write lock before reading the chain head, so
+            # concurrent writers cannot both link to the same previous entry
+            self.conn.execute("BEGIN IMMEDIATE")
+            head_written = False
+            try:
+                row = self.conn.execute("SELECT seq, hash FROM ledger ORDER BY seq DESC LIMIT 1").fetchone()
+                seq, prev_hash = row if row else (0, GENESIS_HASH)
+                old_head = (seq, prev_hash)
+                for record, result, certificate, recorded in items:
+                    seq += 1
+                    target = record.get("target") or {}
+                    entry = {
+                        "seq": seq,
+                        "recorded": recorded or _now(),
+                        "station": self.station,
+                        "serial": target.get("serial"),
+                        "model": target.get("model"),
+                        "device": target.get("device"),
+                        "result": result,
+                        "certificate": certificate or record.get("certificate"),
+                        "record": canonical_json(record).decode("utf-8"),
+                    }
+                    entry["prev_hash"] = prev_hash
+                    entry["hash"] = prev_hash = entry_hash(prev_hash, entry)
+                    self.conn.execute(
+                        f"INSERT INTO ledger ({', '.join(entry)}) VALUES ({', '.join('?' * len(entry))})",
+                        tuple(entry.values()))
+                    entries.append(entry)
+                if self.signer is not None:
+                    # Still holding the write lock, so heads are written in commit order
+                    self._write_head(seq, prev_hash)
+                    head_written = True
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                if head_written:
+                    self._write_head(*old_head)
+                raise
+        return entries
+
+    def _write_head(self, seq, hash_):
+        tmp = self.head_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(canonical_json(sign_record({"seq": seq, "hash": hash_}, self.signer)) + b"\n")
+        os.replace(tmp, self.head_path)
+
+    def _check_head(self, last_seq, last_hash):
+        """(ok, first bad seq): does the chain end where the signed head says it does"""
+        try:
+            with open(self.head_path, "rb") as f:
+                head = json.loads(f.read())
+        except FileNotFoundError:
+            if last_seq == 0:
+                return True, None
+            self.problem = "no signed head record"
+            return False, last_seq + 1
+        except (OSError, ValueError):
+            self.problem = "unreadable head record"
+            return False, last_seq + 1
+        ok, reason = verify_record(head, self.signer)
+        if not ok:
+            self.problem = f"head record: {reason}"
+            return False, last_seq + 1
+        if head["seq"] > last_seq:
+            self.problem = f"entries {last_seq + 1}-{head['seq']} are missing from the end"
+            return False, last_seq + 1
+        if head["seq"] < last_seq:
+            self.problem = f"entries after {head['seq']} were added without updating the head"
+            return False, head["seq"] + 1
+        if head["hash"] != last_hash:
+            self.problem = "last entry does not match the head record"
+            return False, last_seq
+        return True, None
+
+    def find(self, since=None, until=None, limit=None, **filters):
+        """Entries matching serial/model/station/result and an ISO date range, oldest first"""
+        where, args = [], []
+        for name in FILTERS:
+            if filters.get(name) is not None:
+                where.append(f"{name} = ?")
+                args.append(filters[name])
+        unknown = set(filters) - set(FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown filter(s): {', '.join(sorted(unknown))}")
+        if since:
+            where.append("recorded >= ?")
+            args.append(since)
+        if until:
+            where.append("recorded < ?")
+            args.append(until)
+        sql = "SELECT * FROM ledger"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY seq"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            cur = self.conn.execute(sql, args)
+            names = [d[0] for d in cur.description]
+            return [dict(zip(names, row)) for row in cur.fetchall()]
+
+    def count(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM ledger").fetchone()[0]
+
+    def verify_chain(self, batch=VERIFY_BATCH):
+        """Walk the chain once: (ok, entries_checked, first_bad_seq or None)"""
+        prev_hash, expected_seq, checked = GENESIS_HASH, 1, 0
+        last = 0
+        self.problem = None
+        while True:
+            with self._lock:
+                cur = self.conn.execute("SELECT * FROM ledger WHERE seq > ? ORDER BY seq LIMIT ?", (last, batch))
+                names = [d[0] for d in cur.description]
+                rows = cur.fetchall()
+            if not rows:
+                if self.signer is not None:
+                    ok, bad = self._check_head(checked, prev_hash)
+                    if not ok:
+                        return False, checked, bad
+                return True, checked, None
+            for row in rows:
+                entry = dict(zip(names, row))
+                # A gap means a row was removed; a mismatch means it was edited or reordered
+                if (entry["seq"] != expected_seq or entry["prev_hash"] != prev_hash
+                        or entry["hash"] != entry_hash(prev_hash, entry)):
+                    self.problem = "entry removed, edited or reordered"
+                    return False, checked, entry["seq"]
+                prev_hash, expected_seq = entry["hash"], expected_seq + 1
+                checked += 1
+            last = rows[-1][names.index("seq")]
+
+
+def station_ledger_path():
+    return os.path.join(station_dir(), LEDGER_FILE)
+
+
+@functools.lru_cache(maxsize=None)
+def station_ledger(path=None):
+    """The ledger of this station, opened once per process, its head signed with the station key"""
+    path = path or station_ledger_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return CertificateLedger(path, signer=station_signer())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search and verify the certificate ledger")
+    parser.add_argument("--db", help="ledger file (default: this station's)")
+    parser.add_argument("--key", help="key that signed the head record (default: this station's)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    find = sub.add_parser("find", help="list entries matching the filters")
+    for name in FILTERS:
+        find.add_argument(f"--{name}")
+    find.add_argument("--since", help="ISO date, inclusive")
+    find.add_argument("--until", help="ISO date, exclusive")
+    find.add_argument("--limit", type=int)
+    find.add_argument("--json", action="store_true", help="print the full records")
+    sub.add_parser("verify", help="check the hash chain")
+    args = parser.parse_args(argv)
+
+    path = args.db or station_ledger_path()
+    if not os.path.exists(path):
+        print(f"❌ No ledger at {path}")
+        return 2
+    key = args.key or station_key_path()
+    # Reading never creates a key: without one only the chain itself is checked
+    signer = load_key(key) if args.command == "verify" and os.path.exists(key) else None
+    ledger = CertificateLedger(path, signer=signer)
+    if args.command == "verify":
+        ok, checked, bad = ledger.verify_chain()
+        if ok:
+            print(f"✅ Ledger intact: {checked} entries")
+            if signer is None:
+                print(f"⚠️ No signing key at {key} - entries cut off the end cannot be detected")
+            return 0
+        print(f"❌ Ledger broken at entry {bad}: {ledger.problem} ({checked} entries verified before it)")
+        return 1
+
+    rows = ledger.find(since=args.since, until=args.until, limit=args.limit,
+                       **{name: getattr(args, name) for name in FILTERS})
+    for row in rows:
+        if args.json:
+            print(json.dumps(json.loads(row["record"]), sort_keys=True))
+        else:
+            print(f"{row['seq']:>8}  {row['recorded']}  {row['station']:<15} {row['serial'] or '-':<20} "
+                  f"{row['model'] or '-':<25} {row['result']:<8} {row['certificate'] or '-'}")
+    print(f"{len(rows)} entries")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,349 @@
+"""
+certificate_record.py
+Signed machine-readable certificate records for Code Monk — Secure Formatter
+
+Every certificate gets a sidecar `.json` next to its PDF: a compact canonical
+JSON record of the job (target identity, passes, bytes, timings, verification
+digest, SHA-256 of the PDF) with a signature over its canonical bytes. Records are signed with
+HMAC-SHA256 using a station key, or with Ed25519 when the key file holds an
+Ed25519 private key and the `cryptography` package is installed. The key
+lives in the station directory (utils.station_dir); signing creates an HMAC
+key there on first use, verifying never creates one.
+
+    python certificate_record.py keygen station.key [--ed25519]
+    python certificate_record.py verify CERT_DIR --key station.key [--workers 4]
+"""
+import argparse
+import base64
+import datetime
+import functools
+import hashlib
+import hmac
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from utils import station_dir
+
+try:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+    from cryptography.exceptions import InvalidSignature
+except ImportError:
+    Ed25519PrivateKey = Ed25519PublicKey = None
+
+RECORD_VERSION = 2          # 2: adds certificate_sha256
+SIGNING_KEY_FILE = "codemonk_signing.key"
+MIN_HMAC_KEY_BYTES = 16     # shorter (or empty) key files are truncated or not keys at all
+VERIFY_CHUNK = 256          # records handed to a verification process at a time
+
+
+def canonical_json(obj):
+    """Deterministic UTF-8 JSON: sorted keys, no whitespace"""
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _iso(ts):
+    if ts is None:
+        return None
+    return datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).isoformat(timespec="seconds")
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+class HmacSigner:
+    alg = "HMAC-SHA256"
+
+    def __init__(self, key):
+        self.key = key
+        self.key_id = hashlib.sha256(key).hexdigest()[:16]
+
+    def sign(self, data):
+        return hmac.new(self.key, data, hashlib.sha256).digest()
+
+    def verify(self, data, signature):
+        return hmac.compare_digest(self.sign(data), signature)
+
+
+class Ed25519Signer:
+    alg = "Ed25519"
+
+    def __init__(self, private_key=None, public_key=None):
+        if Ed25519PrivateKey is None:
+            raise RuntimeError("Ed25519 signing needs the 'cryptography' package")
+        self.private_key = private_key
+        self.public_key = public_key or private_key.public_key()
+        raw = self.public_key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+        self.key_id = hashlib.sha256(raw).hexdigest()[:16]
+
+    def sign(self, data):
+        if self.private_key is None:
+            raise RuntimeError("Public key only - cannot sign")
+        return self.private_key.sign(data)
+
+    def verify(self, data, signature):
+        try:
+            self.public_key.verify(signature, data)
+            return True
+        except InvalidSignature:
+            return False
+
+
+def load_key(path):
+    """Signer/verifier from a key file: PEM Ed25519 (private or public) or a hex HMAC key"""
+    with open(path, "rb") as f:
+        data = f.read().strip()
+    if data.startswith(b"-----BEGIN"):
+        if Ed25519PrivateKey is None:
+            raise RuntimeError("Ed25519 key file needs the 'cryptography' package")
+        if b"PUBLIC KEY" in data:
+            return Ed25519Signer(public_key=serialization.load_pem_public_key(data))
+        return Ed25519Signer(serialization.load_pem_private_key(data, password=None))
+    key = bytes.fromhex(data.decode("ascii"))
+    if len(key) < MIN_HMAC_KEY_BYTES:
+        raise ValueError(f"{path}: HMAC key is {len(key)} bytes - empty or truncated key file")
+    return HmacSigner(key)
+
+
+def generate_key(path, ed25519=False):
+    """Write a new station key (mode 0600) and return its signer; never overwrites.
+
+    The key is written and fsynced under a temporary name, then linked into place,
+    so another process sees either no key file or the whole key.
+    """
+    if ed25519:
+        if Ed25519PrivateKey is None:
+            raise RuntimeError("Ed25519 keys need the 'cryptography' package")
+        key = Ed25519PrivateKey.generate()
+        data = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                 serialization.NoEncryption())
+    else:
+        data = os.urandom(32).hex().encode("ascii") + b"\n"
+    fd, tmp = tempfile.mkstemp(prefix=".key-", dir=os.path.dirname(path) or ".")    # mode 0600
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.link(tmp, path)          # fails with FileExistsError, never replaces
+        except FileExistsError:
+            raise
+        except OSError:
+            if os.name != "nt":
+                raise
+            os.rename(tmp, path)        # no hard links on this volume; rename does not replace on Windows
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return load_key(path)
+
+
+def station_key_path():
+    return os.path.join(station_dir(), SIGNING_KEY_FILE)
+
+
+@functools.lru_cache(maxsize=None)
+def station_signer(path=None):
+    """The signer for this station, creating an HMAC key on first use (signing only).
+
+    A key file that does not load raises, so no broken signer is ever cached.
+    """
+    path = path or station_key_path()
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        try:
+            return generate_key(path)
+        except FileExistsError:
+            pass  # another process created it first
+    return load_key(path)
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def build_record(entry, report=None, job=None, digest=None, certificate=None, method=None):
+    """Plain dict describing one finished job; `job` holds id, passes, started, finished"""
+    job = job or {}
+    started, finished = job.get("started"), job.get("finished")
+    record = {
+        "v": RECORD_VERSION,
+        "job_id": job.get("id"),
+        "certificate": os.path.basename(certificate) if certificate else None,
+        # Binds the record to the PDF it describes: a swapped PDF no longer matches
+        "certificate_sha256": file_sha256(certificate) if certificate and os.path.isfile(certificate) else None,
+        "target": {
+            "kind": entry.kind,
+            "device": entry.device,
+            "model": entry.model,
+            "serial": entry.serial,
+            "size_bytes": entry.size_bytes,
+            "label": entry.label,
+        },
+        "method": method,
+        "standard": job.get("standard"),
+        "passes": job.get("passes", report.passes if report is not None else None),
+        "bytes_written": report.bytes_written if report is not None else None,
+        "unwritable_ranges": report.bad_ranges if report is not None else [],
+        "started": _iso(started),
+        "finished": _iso(finished),
+        "seconds": round(finished - started, 3) if started and finished else None,
+        "phases": job.get("phases"),
+        "metrics": job.get("metrics") or (report.metrics() if report is not None else None),
+        "verification": {"digest": digest,
+                         "verified": report.verified if report is not None else None,
+                         "bytes_verified": report.bytes_verified if report is not None else None},
+    }
+    if job.get("profile"):
+        record["profile"] = job["profile"]    # report bundle of a profiled job
+    return record
+
+
+def sign_record(record, signer):
+    signed = dict(record)
+    signed["signature"] = {"alg": signer.alg, "key_id": signer.key_id,
+                           "value": _b64(signer.sign(canonical_json(record)))}
+    return signed
+
+
+def verify_record(signed, verifier):
+    """(ok, reason) for one parsed record"""
+    sig = signed.get("signature") if isinstance(signed, dict) else None
+    if not sig:
+        return False, "unsigned"
+    if sig.get("alg") != verifier.alg:
+        return False, f"algorithm {sig.get('alg')} does not match key"
+    if sig.get("key_id") != verifier.key_id:
+        return False, f"signed with another key ({sig.get('key_id')})"
+    record = {k: v for k, v in signed.items() if k != "signature"}
+    try:
+        value = base64.b64decode(sig["value"], validate=True)
+    except (KeyError, ValueError):
+        return False, "malformed signature"
+    if not verifier.verify(canonical_json(record), value):
+        return False, "bad signature"
+    return True, "ok"
+
+
+def check_certificate_file(signed, record_path):
+    """(ok, reason) for the PDF next to a record, when the record carries its hash"""
+    expected = signed.get("certificate_sha256")
+    if not expected or not signed.get("certificate"):
+        return True, "ok"
+    pdf = os.path.join(os.path.dirname(record_path), signed["certificate"])
+    try:
+        actual = file_sha256(pdf)
+    except OSError:
+        return False, "certificate PDF missing"
+    if not hmac.compare_digest(actual, expected):
+        return False, "certificate PDF does not match its record"
+    return True, "ok"
+
+
+def sidecar_path(cert_path):
+    return os.path.splitext(cert_path)[0] + ".json"
+
+
+def write_record(path, signed):
+    with open(path, "wb") as f:
+        f.write(canonical_json(signed) + b"\n")
+    return path
+
+
+# --- bulk verification ---
+
+_verifier = None
+
+
+def _init_verifier(key_path):
+    global _verifier
+    _verifier = load_key(key_path)
+
+
+def _verify_files(paths):
+    failures = []
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                signed = json.loads(f.read())
+            ok, reason = verify_record(signed, _verifier)
+            if ok:
+                ok, reason = check_certificate_file(signed, path)
+        except (OSError, ValueError) as e:
+            ok, reason = False, f"unreadable: {e}"
+        if not ok:
+            failures.append((path, reason))
+    return len(paths), failures
+
+
+def find_records(directory):
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith(".json"):
+                yield os.path.join(root, name)
+
+
+def verify_directory(directory, key_path, workers=None, chunk=VERIFY_CHUNK):
+    """Verify every .json record under directory in parallel: (checked, failures)"""
+    paths = sorted(find_records(directory))
+    chunks = [paths[i:i + chunk] for i in range(0, len(paths), chunk)]
+    if workers == 1 or len(chunks) <= 1:
+        _init_verifier(key_path)
+        results = list(map(_verify_files, chunks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_verifier, initargs=(key_path,)) as pool:
+            results = list(pool.map(_verify_files, chunks))
+    failures = [f for _, failed in results for f in failed]
+    return sum(n for n, _ in results), failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create keys for and verify signed certificate records")
+    sub = parser.add_subparsers(dest="command", required=True)
+    keygen = sub.add_parser("keygen", help="create a station signing key")
+    keygen.add_argument("path")
+    keygen.add_argument("--ed25519", action="store_true", help="Ed25519 key pair instead of an HMAC key")
+    verify = sub.add_parser("verify", help="verify every .json record under a directory")
+    verify.add_argument("directory")
+    verify.add_argument("--key", default=None, help="HMAC key, or Ed25519 public/private key "
+                                                    "(default: this station's key)")
+    verify.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == "keygen":
+        signer = generate_key(args.path, ed25519=args.ed25519)
+        if isinstance(signer, Ed25519Signer):
+            pub = signer.public_key.public_bytes(serialization.Encoding.PEM,
+                                                 serialization.PublicFormat.SubjectPublicKeyInfo)
+            with open(args.path + ".pub", "wb") as f:
+                f.write(pub)
+            print(f"Public key written to {args.path}.pub")
+        print(f"{signer.alg} key {signer.key_id} written to {args.path}")
+        return 0
+
+    key = args.key or station_key_path()
+    if not os.path.exists(key):
+        # Never create a key here: a fresh key would only make every record fail
+        print(f"No signing key at {key} - pass --key with the key that signed the records")
+        return 2
+    start = time.perf_counter()
+    checked, failures = verify_directory(args.directory, key, workers=args.workers)
+    seconds = time.perf_counter() - start
+    for path, reason in failures:
+        print(f"❌ {path}: {reason}")
+    rate = checked / seconds if seconds > 0 else 0
+    print(f"{checked - len(failures)}/{checked} records verified in {seconds:.2f}s ({rate:.0f}/s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,9 +3,85 @@ drive_utils.py
 Drive detection and merging logic for Code Monk — Secure Formatter
 """
 import os
+import re
 import string
 import ctypes
-import wmi
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from dataclasses import dataclass, fields, replace
+
+try:
+    import wmi
+except ImportError:  # non-Windows tooling (benchmarks, tests) can still import this module
+    wmi = None
+
+_DEVICE_ID_RE = re.compile(r'DeviceID="((?:[^"\\]|\\.)*)"')
+_DISK_NUMBER_RE = re.compile(r"Disk #(\d+)")
+_PHYSICAL_RE = re.compile(r"PHYSICALDRIVE(\d+)")
+
+RAW_PROBE_WORKERS = 8
+# Seconds each detection source may take before the scan goes on without it
+SOURCE_TIMEOUTS = {"logical": 2.0, "wmi": 10.0, "raw": 5.0}
+
+@dataclass(frozen=True, slots=True)
+class DriveRecord:
+    """One drive-list entry. Plain values only, immutable, so it can be shared
+    between the cache, the UI and worker threads without copying."""
+    id: str
+    kind: str                    # "physical", "logical" or "raw"
+    device: str
+    display: str
+    index: int = None
+    model: str = None
+    size_gb: int = None
+    size_bytes: int = None
+    serial: str = None
+    parent_physical: str = None
+    serial_shared: bool = None   # another disk reports the same serial and size (see mark_shared_serials)
+
+    @property
+    def label(self):
+        return self.display or self.device
+
+    @property
+    def key(self):
+        """Stable identity across rescans: serial + size when known, else the id.
+        Volumes, and disks whose serial and size repeat, also carry their device path."""
+        if self.serial:
+            key = f"{self.serial}:{self.size_bytes}"
+            return f"{key}:{self.device}" if self.kind == "logical" or self.serial_shared else key
+        return self.id or self.device
+
+    def to_dict(self):
+        """Compact dict for JSON (cache, manifest, job journal); unset fields are left out"""
+        return {f: v for f in _RECORD_FIELDS if (v := getattr(self, f)) is not None}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(**{f: d.get(f) for f in _RECORD_FIELDS})
+
+_RECORD_FIELDS = tuple(f.name for f in fields(DriveRecord))
+
+def as_record(entry):
+    """Accept a DriveRecord or a plain dict (older callers, JSON input)"""
+    return entry if isinstance(entry, DriveRecord) else DriveRecord.from_dict(entry)
+
+def mark_shared_serials(entries):
+    """Flag disks whose serial and size repeat in `entries`, so their keys stay apart.
+
+    Cheap USB bridges and cloned disks report the same serial; without the
+    flag two such disks would share one key and the cache would keep only one.
+    """
+    entries = [as_record(e) for e in entries]
+    counts = Counter((e.serial, e.size_bytes) for e in entries if e.serial and e.kind != "logical")
+    marked = []
+    for e in entries:
+        shared = True if e.serial and e.kind != "logical" and counts[(e.serial, e.size_bytes)] > 1 else None
+        marked.append(e if e.serial_shared == shared else replace(e, serial_shared=shared))
+    return marked
 
 def detect_logical_drives():
     drives = []
@@ -22,112 +98,560 @@ def detect_logical_drives():
             })
     return drives
 
-def detect_wmi_drives():
-    drives = []
+def detect_wmi_drives(conn=None):
+    """Physical disks from WMI as DriveRecords (no live COM objects are kept)"""
+    index = build_wmi_index(conn)
+    return merge_entries([], index, []) if index else []
+
+def probe_physical(i):
+    path = f"\\\\.\\PhysicalDrive{i}"
+    try:
+        handle = os.open(path, os.O_RDONLY | os.O_BINARY)
+        os.close(handle)
+        return {"kind":"raw", "device": path, "index": i}
+    except Exception:
+        return None
+
+def detect_raw_physical(max_drives=32, workers=RAW_PROBE_WORKERS, probe=probe_physical):
+    """Probe PhysicalDrive0..N in a bounded pool; failed opens can be slow, so never one by one"""
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="raw-probe") as pool:
+        return [r for r in pool.map(probe, range(max_drives)) if r]
+
+def _reference_device_id(obj, prop):
+    """DeviceID from an association reference, without resolving it (which costs a COM round-trip)"""
     try:
-        c = wmi.WMI()
+        path = obj.wmi_property(prop).value
+    except Exception:
+        path = getattr(obj, prop).path().Path
+    m = _DEVICE_ID_RE.search(str(path))
+    return m.group(1).replace("\\\\", "\\") if m else None
+
+def build_wmi_index(conn=None):
+    """Disk -> partition -> volume index built from three bulk WMI queries.
+
+    Returns {"disks": {index: disk info}, "partitions": {partition id: disk index},
+    "volumes": {"C:": disk index}} holding plain values only, or None when WMI
+    is unavailable.
+    """
+    try:
+        c = conn if conn is not None else wmi.WMI()
+        disks = {}
         for disk in c.Win32_DiskDrive():
-            size_gb = int(disk.Size) // (1024**3) if disk.Size else None
-            model = disk.Caption or disk.Model or "Physical Disk"
-            dev = disk.DeviceID
-            drives.append({
-                "kind": "physical",
-                "device": dev,
-                "index": int(disk.Index),
-                "model": model,
-                "size_gb": size_gb,
-                "wmi_obj": disk
-            })
+            disks[int(disk.Index)] = _disk_info(disk)
+        partitions = {}
+        for part in c.Win32_DiskPartition():
+            partitions[part.DeviceID] = int(part.DiskIndex)
+        volumes = {}
+        for link in c.Win32_LogicalDiskToPartition():
+            part_id = _reference_device_id(link, "Antecedent")
+            volume_id = _reference_device_id(link, "Dependent")
+            if not part_id or not volume_id:
+                continue
+            disk_index = partitions.get(part_id)
+            if disk_index is None:
+                m = _DISK_NUMBER_RE.search(part_id)
+                disk_index = int(m.group(1)) if m else None
+            if disk_index is not None:
+                volumes[volume_id.upper()] = disk_index
+        return {"disks": disks, "partitions": partitions, "volumes": volumes}
     except Exception:
-        pass
-    return drives
+        return None
 
-def detect_raw_physical(max_drives=32):
-    found = []
-    for i in range(max_drives):
-        path = f"\\\\.\\PhysicalDrive{i}"
-        try:
-            handle = os.open(path, os.O_RDONLY | os.O_BINARY)
-            os.close(handle)
-            found.append({"kind":"raw", "device": path, "index": i})
-        except Exception:
-            pass
-    return found
+def _disk_info(disk):
+    size = int(disk.Size) if disk.Size else None
+    return {
+        "index": int(disk.Index),
+        "device": disk.DeviceID,
+        "caption": disk.Caption,
+        "model": disk.Caption or disk.Model or "Physical Disk",
+        "size_gb": size // (1024**3) if size else None,
+        "size_bytes": size,
+        "serial": (getattr(disk, "SerialNumber", None) or "").strip() or None,
+    }
+
+def _volume_disk_index(c, volume):
+    """Disk index under volume 'E:', from its partition (one associator query)"""
+    query = f"ASSOCIATORS OF {{Win32_LogicalDisk.DeviceID='{volume}'}} WHERE AssocClass=Win32_LogicalDiskToPartition"
+    for part in c.query(query):
+        return int(part.DiskIndex)
+    return None
+
+def build_disk_index(disk_index, conn=None):
+    """build_wmi_index narrowed to one disk: same shape, only that disk's partitions and volumes"""
+    c = conn if conn is not None else wmi.WMI()
+    disks = {int(d.Index): _disk_info(d) for d in c.Win32_DiskDrive(Index=disk_index)}
+    partitions, volumes = {}, {}
+    for part in c.Win32_DiskPartition(DiskIndex=disk_index):
+        partitions[part.DeviceID] = disk_index
+        query = (f"ASSOCIATORS OF {{Win32_DiskPartition.DeviceID='{part.DeviceID}'}} "
+                 "WHERE AssocClass=Win32_LogicalDiskToPartition")
+        for volume in c.query(query):
+            volumes[volume.DeviceID.upper()] = disk_index
+    return {"disks": disks, "partitions": partitions, "volumes": volumes}
 
-def merge_drive_list():
-    logical = detect_logical_drives()
-    wmi_list = detect_wmi_drives()
-    raw = detect_raw_physical()
+def merge_entries(logical, index, raw):
+    """Merge the detection sources into DriveRecords; logical->disk mapping is a dict lookup"""
     merged = []
-    phys_map = {}
-    for p in wmi_list:
-        key = p.get("index")
-        phys_map[key] = p
+    disks = index["disks"] if index else {}
+    for p in disks.values():
         label = f"PhysicalDrive{p['index']} - {p['model']} ({p['size_gb']} GB)" if p.get("size_gb") else f"PhysicalDrive{p['index']} - {p['model']}"
-        merged.append({
-            "id": f"physical-{p['index']}",
-            "display": label,
-            "device": p["device"],
-            "kind": "physical",
-            "index": p["index"],
-            "model": p["model"],
-            "size_gb": p["size_gb"]
-        })
+        merged.append(DriveRecord(
+            id=f"physical-{p['index']}",
+            kind="physical",
+            device=p["device"],
+            display=label,
+            index=p["index"],
+            model=p["model"],
+            size_gb=p["size_gb"],
+            size_bytes=p.get("size_bytes"),
+            serial=p.get("serial")
+        ))
+    for ld in logical:
+        drive = ld["device"]
+        disk = disks.get(index["volumes"].get(drive.strip("\\").upper())) if index else None
+        if disk is not None:
+            size_gb = disk["size_gb"]
+            display = f"{drive} - {disk['caption']} ({size_gb} GB)" if size_gb else f"{drive} - {disk['caption']}"
+            merged.append(DriveRecord(
+                id=f"logical-{drive}",
+                kind="logical",
+                device=drive,
+                display=display,
+                parent_physical=f"PhysicalDrive{disk['index']}",
+                model=disk["caption"],
+                size_gb=size_gb,
+                size_bytes=disk.get("size_bytes"),
+                serial=disk.get("serial")
+            ))
+        else:
+            merged.append(DriveRecord(
+                id=f"logical-{drive}",
+                kind="logical",
+                device=drive,
+                display=f"{drive} - Logical Drive"
+            ))
+    known = {item.index for item in merged if item.index is not None}
+    for r in raw:
+        idx = r["index"]
+        if idx not in known:
+            merged.append(DriveRecord(
+                id=f"raw-{idx}",
+                kind="raw",
+                device=r["device"],
+                display=f"PhysicalDrive{idx} - (raw/unpartitioned)",
+                index=idx
+            ))
+    return mark_shared_serials(merged)
+
+def _threaded_wmi_index(conn=None):
+    """build_wmi_index for a worker thread: COM has to be initialised per thread"""
     try:
-        c = wmi.WMI()
-        for ld in logical:
-            drive = ld["device"]
-            display = f"{drive} - Logical Drive"
-            mapped = False
+        import pythoncom
+        pythoncom.CoInitialize()
+    except ImportError:
+        pythoncom = None
+    try:
+        return build_wmi_index(conn)
+    finally:
+        if pythoncom is not None:
+            pythoncom.CoUninitialize()
+
+def scan_device(device, conn=None, probe=probe_physical):
+    """Entries for one device that just arrived ('E:\\' or '\\\\.\\PhysicalDrive3').
+
+    The same records a full scan_drives() gives for it - the disk and the
+    volumes on it - from WMI queries narrowed to that disk, and one raw probe
+    when WMI does not know the disk (blank or just wiped). Shared serials are
+    only marked within the result; the cache marks them across the inventory.
+    """
+    name = _device_name(device)
+    physical = _PHYSICAL_RE.fullmatch(name)
+    try:
+        import pythoncom
+        pythoncom.CoInitialize()
+    except ImportError:
+        pythoncom = None
+    try:
+        try:
+            c = conn if conn is not None else wmi.WMI()
+            disk_index = int(physical.group(1)) if physical else _volume_disk_index(c, name)
+            index = build_disk_index(disk_index, c) if disk_index is not None else None
+        except Exception:
+            index = None
+        letters = set(index["volumes"]) if index else set()
+        if not physical:
+            letters.add(name)
+        logical = [d for d in detect_logical_drives() if _device_name(d["device"]) in letters] if letters else []
+        raw = []
+        if physical and not (index and index["disks"]):
+            found = probe(int(physical.group(1)))
+            raw = [found] if found else []
+        return merge_entries(logical, index, raw)
+    finally:
+        if pythoncom is not None:
+            pythoncom.CoUninitialize()
+
+def find_disk_volume(entry, index=None):
+    """Drive letter ("E:\\") of the one volume on `entry`'s disk, or None when absent or ambiguous.
+
+    The disk is matched by serial when the entry has one (it survives renumbering),
+    otherwise by disk index; labels are not trusted, every wiped volume has the same one.
+    """
+    entry = as_record(entry)
+    if index is None:
+        index = _threaded_wmi_index()
+    if not index:
+        return None
+    if entry.serial:
+        disks = [d["index"] for d in index["disks"].values() if d.get("serial") == entry.serial]
+    elif entry.index is not None:
+        disks = [d["index"] for d in index["disks"].values() if d["index"] == entry.index]
+    else:
+        disks = []
+    if len(disks) != 1:
+        return None
+    volumes = sorted(v for v, disk in index["volumes"].items() if disk == disks[0])
+    return volumes[0] + "\\" if len(volumes) == 1 else None
+
+def scan_drives(sources=None, timeouts=None, on_partial=None):
+    """Run the detection sources concurrently and merge whatever finishes in time.
+
+    `sources` maps "logical"/"wmi"/"raw" to callables (defaults to the real
+    detectors); each source gets its own timeout from `timeouts`. on_partial,
+    if given, is called with (merged entries, source name) every time a source
+    completes, so callers can show a usable list before the slowest one ends.
+    Returns (merged entries, report) where report holds per-source seconds,
+    the time to the first usable list and the total time.
+    """
+    if sources is None:
+        sources = {"logical": detect_logical_drives, "wmi": _threaded_wmi_index, "raw": detect_raw_physical}
+    timeouts = dict(SOURCE_TIMEOUTS, **(timeouts or {}))
+    done = queue.Queue()
+    start = time.perf_counter()
+
+    def run(name, fn):
+        try:
+            done.put((name, fn(), None))
+        except Exception as e:
+            done.put((name, None, e))
+
+    for name, fn in sources.items():
+        # Daemon threads: a hung WMI call must not keep the process alive
+        threading.Thread(target=run, args=(name, fn), name=f"scan-{name}", daemon=True).start()
+
+    results = {"logical": [], "wmi": None, "raw": []}
+    report = {"sources": {}, "first_usable": None, "total": None}
+    pending = set(sources)
+    while pending:
+        now = time.perf_counter()
+        expired = [n for n in pending if now - start >= timeouts.get(n, 10.0)]
+        for name in expired:
+            pending.discard(name)
+            report["sources"][name] = "timeout"
+        if not pending:
+            break
+        wait = min(timeouts.get(n, 10.0) for n in pending) - (now - start)
+        try:
+            name, value, error = done.get(timeout=max(wait, 0.001))
+        except queue.Empty:
+            continue
+        if name not in pending:
+            continue  # finished after its timeout; too late to use
+        pending.discard(name)
+        elapsed = time.perf_counter() - start
+        if error is not None:
+            report["sources"][name] = f"error: {error}"
+            continue
+        report["sources"][name] = round(elapsed, 4)
+        if value is not None:
+            results[name] = value
+        if report["first_usable"] is None:
+            report["first_usable"] = round(elapsed, 4)
+        if on_partial is not None and pending:
+            on_partial(merge_entries(results["logical"], results["wmi"], results["raw"]), name)
+    report["total"] = round(time.perf_counter() - start, 4)
+    return merge_entries(results["logical"], results["wmi"], results["raw"]), report
+
+def merge_drive_list(conn=None):
+    sources = None
+    if conn is not None:
+        sources = {"logical": detect_logical_drives, "wmi": lambda: build_wmi_index(conn), "raw": detect_raw_physical}
+    merged, _ = scan_drives(sources)
+    return merged
+
+def _device_name(device):
+    """'E:\\' -> 'E:', '\\\\.\\PhysicalDrive3' -> 'PHYSICALDRIVE3'"""
+    return device.rstrip("\\").split("\\")[-1].upper() if device else None
+
+def drive_key(entry):
+    """Stable identity for a drive across rescans (see DriveRecord.key)"""
+    return as_record(entry).key
+
+class DriveInventoryCache:
+    """In-memory drive inventory with a TTL and per-device invalidation.
+
+    get() answers from memory while the snapshot is younger than `ttl` and no
+    full rescan is pending. Entries are keyed by drive_key(), so a drive that
+    comes back under a different PhysicalDriveN keeps its cached record.
+    `scanner` returns (entries, report) like scan_drives; the report of the
+    last real scan is kept in last_report. on_partial is handed to the scanner
+    when a real scan runs, so a caller can show entries as each source ends.
+    A device that arrives is queued instead: the next get() runs
+    `device_scanner` (scan_device) for it alone and merges the result in.
+    """
+
+    def __init__(self, ttl=30.0, scanner=scan_drives, clock=time.monotonic, device_scanner=scan_device):
+        self.ttl = ttl
+        self.scanner = scanner
+        self.device_scanner = device_scanner
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = {}       # drive_key -> entry
+        self._snapshot = None    # list handed out by get(), rebuilt on change
+        self._scanned_at = None
+        self._pending = False
+        self._arrived = []       # devices to rescan one by one at the next get()
+        self.scans = 0
+        self.device_scans = 0
+        self.last_report = None
+
+    def get(self, force=False, on_partial=None):
+        with self._lock:
+            fresh = not force and self._snapshot is not None and not self._pending \
+                and self.clock() - self._scanned_at < self.ttl
+            if fresh and not self._arrived:
+                return self._snapshot
+            devices, self._arrived = self._arrived, []
+            if not fresh:
+                self._pending = False    # set again by anything that happens during the scan
+        if fresh:
             try:
-                for disk in c.Win32_DiskDrive():
-                    for part in disk.associators("Win32_DiskDriveToDiskPartition"):
-                        for logical_disk in part.associators("Win32_LogicalDiskToPartition"):
-                            if getattr(logical_disk, "DeviceID", "").upper() == drive.strip("\\").upper():
-                                size_gb = int(disk.Size) // (1024**3) if disk.Size else None
-                                display = f"{drive} - {disk.Caption} ({size_gb} GB)" if size_gb else f"{drive} - {disk.Caption}"
-                                merged.append({
-                                    "id": f"logical-{drive}",
-                                    "display": display,
-                                    "device": drive,
-                                    "kind": "logical",
-                                    "parent_physical": f"PhysicalDrive{int(disk.Index)}",
-                                    "model": disk.Caption,
-                                    "size_gb": size_gb
-                                })
-                                mapped = True
-                                break
-                        if mapped:
-                            break
-                    if mapped:
-                        break
+                found = [e for device in devices for e in self.device_scanner(device)]
+            except Exception:
+                pass                     # fall back to a full scan
+            else:
+                with self._lock:
+                    self._merge_in(found, devices)
+                    self.device_scans += len(devices)
+                    return self._snapshot
+        try:
+            fresh_entries, report = self.scanner(on_partial=on_partial) if on_partial else self.scanner()
+        except BaseException:
+            with self._lock:
+                self._pending = True
+            raise
+        with self._lock:
+            self.last_report = report
+            self._merge(fresh_entries)
+            self._scanned_at = self.clock()
+            self.scans += 1
+            return self._snapshot
+
+    def lookup(self, key):
+        with self._lock:
+            return self._entries.get(key)
+
+    def invalidate(self, device=None):
+        """Drop the entries for one device (and volumes on it) and rescan just that device,
+        or rescan everything when device is None"""
+        with self._lock:
+            if device is None:
+                self._pending = True
+            else:
+                self._drop(device)
+                self._queue(device)
+
+    def on_hotplug(self, device, arrived):
+        """Hook for WM_DEVICECHANGE: a removed device vanishes at once without a rescan,
+        an arrival is scanned on its own by the next get()"""
+        with self._lock:
+            self._drop(device)
+            if arrived:
+                self._queue(device)
+
+    def _queue(self, device):
+        if self.device_scanner is None:
+            self._pending = True
+        elif device not in self._arrived:
+            self._arrived.append(device)
+
+    def _drop(self, device):
+        target = _device_name(device)
+        dropped = [k for k, e in self._entries.items() if self._matches(e, target)]
+        for k in dropped:
+            del self._entries[k]
+        if dropped:
+            self._merge(self._entries.values())
+
+    @staticmethod
+    def _matches(entry, target):
+        return target in (_device_name(entry.device), _device_name(entry.parent_physical))
+
+    def _merge_in(self, found, devices):
+        """Replace what is cached for the scanned devices with what was found for them"""
+        by_name = {}
+        for e in map(as_record, found):
+            # A disk that arrived as a letter and as a PhysicalDriveN is found twice
+            name = _device_name(e.device)
+            if name not in by_name or by_name[name].kind == "raw":
+                by_name[name] = e
+        found = list(by_name.values())
+        names = {_device_name(d) for d in devices} | {_device_name(e.device) for e in found}
+        keep = [e for e in self._entries.values() if _device_name(e.device) not in names]
+        self._merge(keep + found)
+
+    def _merge(self, fresh):
+        entries = {}
+        # Shared serials are marked over the whole inventory: a twin that arrives
+        # on its own changes the key of the disk already cached
+        for e in mark_shared_serials(fresh):
+            old = self._entries.get(e.key)
+            # Unchanged drives keep the very same record object, so repeated
+            # polling allocates nothing for them downstream
+            entries[e.key] = old if old == e else e
+        self._entries = entries
+        self._snapshot = list(entries.values())
+
+def diff_inventory(old, new):
+    """Added, removed and changed entries between two inventory snapshots (matched by drive_key)"""
+    old_map = {e.key: e for e in mark_shared_serials(old)}
+    new_map = {e.key: e for e in mark_shared_serials(new)}
+    return {
+        "added": [e for k, e in new_map.items() if k not in old_map],
+        "removed": [e for k, e in old_map.items() if k not in new_map],
+        "changed": [e for k, e in new_map.items() if k in old_map and old_map[k] != e],
+    }
+
+def quick_fingerprint():
+    """Cheap change detector: the drive letters from one bitmask call (no device is opened)"""
+    bitmask = ctypes.windll.kernel32.GetLogicalDrives()
+    return frozenset(f"{letter}:\\" for i, letter in enumerate(string.ascii_uppercase) if bitmask & (1 << i))
+
+def raw_fingerprint():
+    """Which PhysicalDriveN open - up to 32 handle opens, so only polled at a low rate"""
+    return frozenset(r["device"] for r in detect_raw_physical())
+
+class DriveWatcher:
+    """Background hotplug watcher that turns inventory snapshots into deltas.
+
+    Every `interval` seconds it compares a cheap fingerprint (the set of
+    drive letters); the raw disks, which have to be opened to be seen, are
+    only probed every `raw_interval` seconds, or at once on refresh() (e.g.
+    from WM_DEVICECHANGE). Each device that appears or goes away is handed
+    to cache.on_hotplug(), so only that device is rescanned; a full rescan
+    runs on refresh(full=True), when there is nothing to compare against,
+    and when the cache TTL runs out. Subscribers get {"added", "removed",
+    "changed"} lists on the watcher thread and must hand them to their own
+    thread themselves.
+    """
+
+    def __init__(self, cache, interval=1.0, fingerprint=quick_fingerprint, raw_fingerprint=raw_fingerprint,
+                 raw_interval=30.0, clock=time.monotonic):
+        self.cache = cache
+        self.interval = interval
+        self.fingerprint = fingerprint
+        self.raw_fingerprint = raw_fingerprint
+        self.raw_interval = raw_interval
+        self.clock = clock
+        self._last_raw = None
+        self._raw_due = 0.0
+        self._subscribers = []
+        self._snapshot = []
+        self._last_fp = None
+        self._full = False
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def snapshot(self):
+        return list(self._snapshot)
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+        return callback
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="drive-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def refresh(self, full=False):
+        """Check for changed devices now instead of at the next tick; full=True rescans everything"""
+        self._full = self._full or full
+        self._wake.set()
+
+    def seed(self, entries):
+        """Start from an inventory the caller already shows, so the first tick sends no delta"""
+        self._snapshot = list(entries)
+        self._last_fp = self._safe(self.fingerprint)
+        self._last_raw = self._safe(self.raw_fingerprint)
+        self._raw_due = self.clock() + self.raw_interval
+
+    @staticmethod
+    def _safe(fingerprint):
+        try:
+            return fingerprint() if fingerprint is not None else None
+        except Exception:
+            return None
+
+    @staticmethod
+    def _changes(old, new):
+        """(arrived, removed) devices between two fingerprints, or None when they cannot be compared"""
+        if new is None:
+            return [], []           # probe failed this tick; compare again at the next one
+        if old is None:
+            return None
+        return sorted(new - old), sorted(old - new)
+
+    def poll(self, force=False, full=False):
+        """One watcher tick; returns the delta (also sent to subscribers when non-empty).
+        force probes the raw disks now, full rescans every device."""
+        changes = []
+        fp = self._safe(self.fingerprint)
+        changes.append(self._changes(self._last_fp, fp))
+        self._last_fp = fp if fp is not None else self._last_fp
+        if self.raw_fingerprint is not None and (force or any(changes[0] or ()) or self.clock() >= self._raw_due):
+            raw = self._safe(self.raw_fingerprint)
+            changes.append(self._changes(self._last_raw, raw))
+            self._last_raw = raw if raw is not None else self._last_raw
+            self._raw_due = self.clock() + self.raw_interval
+        if full or None in changes:
+            self.cache.invalidate()
+        else:
+            for arrived, removed in changes:
+                for device in removed:
+                    self.cache.on_hotplug(device, arrived=False)
+                for device in arrived:
+                    self.cache.on_hotplug(device, arrived=True)
+        entries = self.cache.get()
+        delta = diff_inventory(self._snapshot, entries)
+        self._snapshot = list(entries)
+        if any(delta.values()):
+            for callback in list(self._subscribers):
+                try:
+                    callback(delta)
+                except Exception:
+                    pass
+        return delta
+
+    def _loop(self):
+        force = full = not self._snapshot
+        while not self._stop.is_set():
+            try:
+                self.poll(force, full)
             except Exception:
                 pass
-            if not mapped:
-                merged.append({
-                    "id": f"logical-{drive}",
-                    "display": display,
-                    "device": drive,
-                    "kind": "logical",
-                    "model": None,
-                    "size_gb": None
-                })
-    except Exception:
-        for ld in logical:
-            merged.append({
-                "id": f"logical-{ld['device']}",
-                "display": f"{ld['device']} - Logical Drive",
-                "device": ld['device'],
-                "kind": "logical"
-            })
-    for r in raw:
-        idx = r["index"]
-        if not any(item.get("index") == idx for item in merged):
-            merged.append({
-                "id": f"raw-{idx}",
-                "display": f"PhysicalDrive{idx} - (raw/unpartitioned)",
-                "device": r["device"],
-                "kind": "raw",
-                "index": idx
-            })
-    return merged
+            self._wake.wait(self.interval)
+            force = self._wake.is_set()
+            full, self._full = self._full, False
+            self._wake.clear()
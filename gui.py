@@ -3,15 +3,55 @@ gui.py
 GUI components for Code Monk — Secure Formatter
 """
 import os
+import ctypes
 import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from ctypes import wintypes
 from PyQt5 import QtWidgets, QtGui, QtCore
-from drive_utils import merge_drive_list
+from certificate import CertificateQueue
+from instrumentation import Instruments, MetricsExporter
+from job_log import JobLog
+from job_table import JobTable
+from log_view import LogView
+from progress_events import EventStream
+from drive_utils import DriveInventoryCache, DriveWatcher, diff_inventory, drive_key
 from secure_wipe import WipeWorker
-from utils import APP_TITLE, COMPANY_NAME, LOGO_FILE, is_admin, resource_path
+from speed_probe import estimate_duration, flag_slow, format_duration, probe_allows_write, probe_path, probe_target
+from wipe_patterns import DEFAULT_STANDARD, STANDARDS, get_standard
+from utils import (APP_TITLE, COMPANY_NAME, LOGO_FILE, DRIVE_CACHE_TTL, DRIVE_RAW_WATCH_INTERVAL, DRIVE_WATCH_INTERVAL, LOG_FRAME_MS,
+                   JOB_LOG_DIR, LOG_SPILL_FILE, LOG_VIEW_LINES, METRICS_FILE, WIPE_EXTENT_MB, is_admin,
+                   resource_path)
+
+# WM_DEVICECHANGE / DBT_* constants from dbt.h
+WM_DEVICECHANGE = 0x0219
+DBT_DEVICEARRIVAL = 0x8000
+DBT_DEVICEREMOVECOMPLETE = 0x8004
+DBT_DEVNODES_CHANGED = 0x0007   # broadcast to top-level windows when any device is added or removed
+DBT_DEVTYP_VOLUME = 0x00000002
+
+class DEV_BROADCAST_VOLUME(ctypes.Structure):
+    _fields_ = [
+        ("dbcv_size", wintypes.DWORD),
+        ("dbcv_devicetype", wintypes.DWORD),
+        ("dbcv_reserved", wintypes.DWORD),
+        ("dbcv_unitmask", wintypes.DWORD),
+        ("dbcv_flags", wintypes.WORD),
+    ]
+
+class DriveDeltaBridge(QtCore.QObject):
+    """Carries DriveWatcher deltas, startup scan results and speed probe results from worker threads to the UI thread"""
+    delta = QtCore.pyqtSignal(object)
+    probed = QtCore.pyqtSignal(object, object)     # drive key, ProbeResult
+    partial = QtCore.pyqtSignal(object, str)       # merged entries so far, source that just finished
+    scanned = QtCore.pyqtSignal(object, bool, object)   # entries, fresh scan (not cached), error
 
 class MainWindow(QtWidgets.QWidget):
     def __init__(self):
         super().__init__()
+        self.created_at = time.perf_counter()
+        self.first_paint = None
         self.setWindowTitle(APP_TITLE)
         self.resize(1100, 700)
         
@@ -190,7 +230,7 @@ class MainWindow(QtWidgets.QWidget):
             }
             
             /* Modern text area */
-            QTextEdit {
+            QTextEdit, QPlainTextEdit {
                 background: rgba(255, 255, 255, 0.9);
                 color: #2c3e50;
                 border: 1px solid rgba(255, 255, 255, 0.3);
@@ -387,6 +427,9 @@ class MainWindow(QtWidgets.QWidget):
             margin-bottom: 5px;
         """)
         
+        drive_row = QtWidgets.QHBoxLayout()
+        drive_row.setSpacing(10)
+
         drive_label = QtWidgets.QLabel("Select Target:")
         drive_label.setStyleSheet("font-weight: bold; color: #ffffff; font-size: 11pt;")
         drive_label.setMinimumWidth(100)
@@ -407,7 +450,7 @@ class MainWindow(QtWidgets.QWidget):
                 background-color: #45a049;
             }
         """)
-        self.refresh_btn.clicked.connect(self.populate_drives)
+        self.refresh_btn.clicked.connect(self.on_refresh)
         
         drive_row.addWidget(drive_label)
         drive_row.addWidget(self.drive_combo)
@@ -434,22 +477,23 @@ class MainWindow(QtWidgets.QWidget):
         security_layout = QtWidgets.QVBoxLayout(security_group)
         security_layout.setSpacing(15)
 
-        # Wipe level selection
+        # Wipe standard selection
         wipe_row = QtWidgets.QHBoxLayout()
         wipe_row.setSpacing(10)
         
-        wipe_label = QtWidgets.QLabel("Wipe Level:")
+        wipe_label = QtWidgets.QLabel("Standard:")
         wipe_label.setStyleSheet("font-weight: bold; color: #ffffff; font-size: 11pt;")
         wipe_label.setMinimumWidth(100)
         
         self.level_combo = QtWidgets.QComboBox()
         self.level_combo.setMinimumHeight(35)
-        self.level_combo.addItems([
-            "🚀 Quick (1 pass) - Fast but less secure",
-            "🛡️ Secure (3 passes) - Recommended balance",
-            "🔒 Ultra (7 passes) - Maximum security, slower"
-        ])
-        self.level_combo.setCurrentIndex(1)
+        for icon, standard in zip(("🚀", "🛡️", "🔒", "🧨"), STANDARDS):
+            self.level_combo.addItem(f"{icon} {standard.name} ({standard.pass_count} pass"
+                                     f"{'es' if standard.pass_count > 1 else ''}) - {standard.summary}", standard)
+        # No standard: metadata-only quick wipe (quick_wipe.py) for reprovisioning, not sanitization
+        self.level_combo.addItem("⚡ Quick wipe (partition tables and signatures only) - Data NOT overwritten", None)
+        self.level_combo.setCurrentIndex(STANDARDS.index(get_standard(DEFAULT_STANDARD)))
+        self.level_combo.currentIndexChanged.connect(self.refresh_drive_texts)
         
         wipe_row.addWidget(wipe_label)
         wipe_row.addWidget(self.level_combo)
@@ -542,13 +586,26 @@ class MainWindow(QtWidgets.QWidget):
         progress_container.addWidget(self.progress)
         progress_layout.addLayout(progress_container)
 
+        # One row per job with live throughput; fed from the job event stream
+        jobs_label = QtWidgets.QLabel("Jobs:")
+        jobs_label.setStyleSheet("font-weight: bold; color: #ffffff; font-size: 10pt;")
+        progress_layout.addWidget(jobs_label)
+        self.job_table = JobTable()
+        self.job_table.setMinimumHeight(90)
+        self.job_table.setMaximumHeight(200)
+        progress_layout.addWidget(self.job_table)
+        self.job_events = EventStream().start()
+        self.job_log = JobLog(JOB_LOG_DIR).start()
+        self.job_events.subscribe(self.job_log)
+        self.job_events.subscribe(self.job_table.feed)
+
         # Log area
         log_label = QtWidgets.QLabel("Activity Log:")
         log_label.setStyleSheet("font-weight: bold; color: #ffffff; font-size: 10pt;")
         progress_layout.addWidget(log_label)
         
-        self.log = QtWidgets.QTextEdit()
-        self.log.setReadOnly(True)
+        # Capped, frame-batched view; older lines go to LOG_SPILL_FILE
+        self.log = LogView(LOG_VIEW_LINES, LOG_FRAME_MS, LOG_SPILL_FILE)
         self.log.setMinimumHeight(140)
         self.log.setMaximumHeight(180)
         progress_layout.addWidget(self.log)
@@ -644,9 +701,31 @@ class MainWindow(QtWidgets.QWidget):
         # internal
         self.worker_thread = None
         self.worker = None
+        self.inventory = DriveInventoryCache(ttl=DRIVE_CACHE_TTL)
+        self.watcher = DriveWatcher(self.inventory, interval=DRIVE_WATCH_INTERVAL,
+                                    raw_interval=DRIVE_RAW_WATCH_INTERVAL)
+        self.drive_events = DriveDeltaBridge()
+        self.drive_events.delta.connect(self.apply_drive_delta)
+        self.drive_events.probed.connect(self.on_probed)
+        self.drive_events.partial.connect(self.on_drives_partial)
+        self.drive_events.scanned.connect(self.on_drives_scanned)
+        self.watcher.subscribe(self.drive_events.delta.emit)
+        self.probes = {}        # drive key -> ProbeResult
+        self.probe_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="speed-probe")
+        self.certificates = CertificateQueue()
+        self.pending_certificates = set()   # finished workers whose certificate is still being made
+        self.closing = False
+        self.instruments = self.metrics_exporter = None
+        if METRICS_FILE:
+            self.instruments = Instruments()
+            self.instruments.gauge("codemonk_event_backlog", lambda: self.job_events.backlog)
+            self.instruments.gauge("codemonk_events_dropped_total", lambda: self.job_events.dropped)
+            self.instruments.gauge("codemonk_certificate_queue_pending", lambda: self.certificates.pending)
+            self.metrics_exporter = MetricsExporter(self.instruments, METRICS_FILE).start()
 
-        # populate drives now
-        self.populate_drives()
+        # scan drives in the background so the window shows at once; the
+        # watcher keeps the list current once the first full scan is in
+        self.start_drive_scan()
 
         # admin hint
         if not is_admin():
@@ -658,24 +737,185 @@ class MainWindow(QtWidgets.QWidget):
         self.log.append("🔧  Application initialized successfully.")
         self.log.append("📝  Select a target drive and configure security settings to begin.")
 
-    def populate_drives(self):
-        self.drive_combo.clear()
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.first_paint is None:
+            self.first_paint = time.perf_counter() - self.created_at
+            self.log.append(f"🖥️  Window shown after {self.first_paint:.2f}s")
+
+    def set_scanning(self, scanning):
+        """Visible scanning state: the refresh button is busy and the empty list says why"""
+        self.refresh_btn.setEnabled(not scanning)
+        self.refresh_btn.setText("⏳ Scanning" if scanning else "🔄 Refresh")
+        self.drive_combo.setPlaceholderText("Scanning for drives..." if scanning else "No drives detected")
+
+    def start_drive_scan(self):
+        """Initial drive scan on a worker thread; entries arrive as each detection source finishes"""
         self.log.append("🔍  Scanning for available drives...")
-        try:
-            merged = merge_drive_list()
-            for e in merged:
-                disp = e.get("display") or e.get("device")
-                self.drive_combo.addItem(disp, e)
-            self.log.append(f"✅  Detected {len(merged)} drive entries successfully.")
+        self.set_scanning(True)
+        self.scan_started = time.perf_counter()
+        self.first_drives = None
+
+        def run():
+            try:
+                scans = self.inventory.scans
+                entries = self.inventory.get(on_partial=self.drive_events.partial.emit)
+                self.drive_events.scanned.emit(entries, self.inventory.scans != scans, None)
+            except Exception as ex:
+                self.drive_events.scanned.emit([], False, ex)
+
+        threading.Thread(target=run, name="drive-scan", daemon=True).start()
+
+    def on_drives_partial(self, entries, source):
+        self.apply_drive_delta(diff_inventory(self.current_drive_entries(), entries), quiet=True)
+        if self.first_drives is None and entries:
+            self.first_drives = time.perf_counter() - self.scan_started
+            self.log.append(f"⏱️  First drives listed after {self.first_drives:.2f}s ({source} detection)")
+
+    def on_drives_scanned(self, merged, fresh, error):
+        if self.closing:
+            return
+        self.set_scanning(False)
+        if error is not None:
+            self.log.append(f"❌  Error detecting drives: {error}")
+            self.log.append("💡  Try refreshing or running as Administrator.")
+        else:
+            self.apply_drive_delta(diff_inventory(self.current_drive_entries(), merged), quiet=True)
+            complete = time.perf_counter() - self.scan_started
+            if fresh:
+                report = self.inventory.last_report or {}
+                self.log.append(f"✅  Detected {len(merged)} drive entries successfully.")
+                self.log.append(f"⏱️  Drive list complete after {complete:.2f}s")
+                slow = [name for name, t in report.get("sources", {}).items() if not isinstance(t, float)]
+                if slow:
+                    self.log.append(f"⚠️   Partial drive list - source(s) {', '.join(slow)} timed out or failed.")
+            else:
+                self.log.append(f"✅  Detected {len(merged)} drive entries (cached inventory).")
             if len(merged) == 0:
                 self.log.append("⚠️   No drives detected. Try running as Administrator or check connections.")
-        except Exception as ex:
-            self.log.append(f"❌  Error detecting drives: {ex}")
-            self.log.append("💡  Try refreshing or running as Administrator.")
+        self.watcher.seed(self.current_drive_entries())
+        self.watcher.start()
+
+    def current_drive_entries(self):
+        return [self.drive_combo.itemData(i) for i in range(self.drive_combo.count())]
+
+    def _drive_combo_index(self, key):
+        for i in range(self.drive_combo.count()):
+            if drive_key(self.drive_combo.itemData(i)) == key:
+                return i
+        return -1
+
+    def apply_drive_delta(self, delta, quiet=False):
+        """Update the drive list in place, keeping the current selection"""
+        busy = self.worker.entry if self.worker else None
+        for e in delta["removed"]:
+            i = self._drive_combo_index(drive_key(e))
+            if i >= 0:
+                self.drive_combo.removeItem(i)
+            if not quiet:
+                self.log.append(f"➖  Drive removed: {e.label}")
+            if busy is not None and drive_key(busy) == drive_key(e):
+                self.log.append("⚠️   The drive being wiped has disappeared!")
+        for e in delta["changed"]:
+            i = self._drive_combo_index(drive_key(e))
+            if i >= 0:
+                self.drive_combo.setItemText(i, self.drive_text(e))
+                self.drive_combo.setItemData(i, e)
+        for e in delta["added"]:
+            i = self._drive_combo_index(drive_key(e))
+            if i >= 0:
+                self.drive_combo.setItemData(i, e)
+                continue
+            self.drive_combo.addItem(self.drive_text(e), e)
+            self.schedule_probe(e)
+            if not quiet:
+                self.log.append(f"➕  Drive connected: {e.label}")
+
+    def selected_standard(self):
+        """The WipeStandard picked, or None for a metadata-only quick wipe"""
+        return self.level_combo.currentData()
+
+    def drive_text(self, e):
+        """Combo text: the drive label plus its estimated wipe time at the selected level"""
+        probe = self.probes.get(drive_key(e))
+        if probe is None or probe.read_mbps is None or self.selected_standard() is None:
+            return e.label
+        estimate = estimate_duration(e.size_bytes, self.selected_standard().pass_count, probe)
+        text = f"{e.label}  ⏱ ~{format_duration(estimate)} @ {probe.effective_write_mbps:.0f} MB/s"
+        if probe.write_basis != "measured":
+            text += " (from reads)"
+        if probe.slow:
+            text += "  ⚠️ slow"
+        return text
+
+    def refresh_drive_texts(self):
+        for i in range(self.drive_combo.count()):
+            self.drive_combo.setItemText(i, self.drive_text(self.drive_combo.itemData(i)))
+
+    def schedule_probe(self, e):
+        """Speed probe in the background (write-back only on disks with no volume); the result updates the drive list"""
+        if not e.size_bytes or drive_key(e) in self.probes:
+            return
+        key = drive_key(e)
+        self.probe_pool.submit(lambda: self.drive_events.probed.emit(
+            key, probe_target(probe_path(e), e.size_bytes, allow_write=probe_allows_write(e))))
+
+    def on_probed(self, key, probe):
+        self.probes[key] = probe
+        by_model = {}
+        for i in range(self.drive_combo.count()):
+            e = self.drive_combo.itemData(i)
+            p = self.probes.get(drive_key(e))
+            if p is not None and e.kind != "logical":
+                by_model.setdefault(e.model, []).append(p)
+        slow = set(flag_slow(by_model))
+        for p in self.probes.values():
+            p.slow = p.path in slow
+        if slow and probe.path in slow:
+            self.log.append(f"⚠️   {probe.path} is much slower than other drives of the same model.")
+        self.refresh_drive_texts()
+
+    def on_refresh(self):
+        self.log.append("🔍  Rescanning drives in the background...")
+        self.watcher.refresh(full=True)
+
+    def closeEvent(self, event):
+        self.closing = True
+        self.watcher.stop()
+        self.probe_pool.shutdown(wait=False)
+        # Let queued certificates finish: the wipes they prove have already happened
+        self.certificates.shutdown(wait=True)
+        self.job_table.stop()
+        self.job_events.stop()
+        self.job_log.close()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.stop()
+        self.log.stop()
+        super().closeEvent(event)
+
+    def nativeEvent(self, eventType, message):
+        """Invalidate cached inventory entries for volumes that arrive or go away"""
+        try:
+            if eventType == "windows_generic_MSG":
+                msg = wintypes.MSG.from_address(int(message))
+                if msg.message == WM_DEVICECHANGE and msg.wParam == DBT_DEVNODES_CHANGED:
+                    # Disks without a volume (blank or just wiped) only show up this way
+                    self.watcher.refresh()
+                if msg.message == WM_DEVICECHANGE and msg.wParam in (DBT_DEVICEARRIVAL, DBT_DEVICEREMOVECOMPLETE) and msg.lParam:
+                    hdr = DEV_BROADCAST_VOLUME.from_address(msg.lParam)
+                    if hdr.dbcv_devicetype == DBT_DEVTYP_VOLUME:
+                        arrived = msg.wParam == DBT_DEVICEARRIVAL
+                        for i in range(26):
+                            if hdr.dbcv_unitmask & (1 << i):
+                                self.inventory.on_hotplug(f"{chr(ord('A') + i)}:\\", arrived)
+                        self.watcher.refresh()
+        except Exception:
+            pass
+        return super().nativeEvent(eventType, message)
 
     def append_log(self, txt):
+        """Safe from any thread: the log view picks lines up on its next frame"""
         self.log.append(txt)
-        self.log.ensureCursorVisible()
 
     def on_start(self):
         # validations
@@ -694,7 +934,7 @@ class MainWindow(QtWidgets.QWidget):
             return
 
         # Final confirmation with enhanced dialog
-        target_info = data.get('display') or data.get('device')
+        target_info = data.label
         msg_box = QtWidgets.QMessageBox()
         msg_box.setIcon(QtWidgets.QMessageBox.Critical)
         msg_box.setWindowTitle("🚨 FINAL WARNING - POINT OF NO RETURN")
@@ -727,25 +967,46 @@ class MainWindow(QtWidgets.QWidget):
             return
 
         # prepare worker
-        passes = 1 if self.level_combo.currentIndex() == 0 else 3 if self.level_combo.currentIndex() == 1 else 7
+        standard = self.selected_standard()
         do_real = True
         self.start_btn.setEnabled(False)
         self.start_btn.setText("🔄 OPERATION IN PROGRESS...")
         
         self.log.append("🚀  Starting secure wipe operation...")
         self.log.append(f"📋  Target: {target_info}")
-        self.log.append(f"🔒  Security Level: {passes} passes")
+        if standard is None:
+            self.log.append("⚡  Quick wipe: partition tables and filesystem signatures only - data blocks are NOT overwritten")
+        else:
+            self.log.append(f"🔒  Standard: {standard.name} ({standard.pass_count} passes)")
         
-        self.worker = WipeWorker(data, level_passes=passes, do_real=do_real)
+        job_id = uuid.uuid4().hex[:8]
+        self.job_table.feed.add_job(job_id, target_info)
+        self.worker = WipeWorker(data, standard=standard.key if standard else None, quick=standard is None,
+                                 do_real=do_real, job_id=job_id,
+                                 extent_size=WIPE_EXTENT_MB * 1024 * 1024 or None,
+                                 events=self.job_events, certificates=self.certificates,
+                                 instruments=self.instruments)
         self.worker.progress.connect(self.progress.setValue)
-        self.worker.status.connect(lambda s: self.append_log(f"⚙️  {s}"))
+        # Direct: status lines go straight into the thread-safe log buffer, not one queued UI event each
+        self.worker.status.connect(lambda s: self.append_log(f"⚙️  {s}"), QtCore.Qt.DirectConnection)
         self.worker.finished.connect(self.on_finished)
+        self.worker.certificate.connect(self.on_certificate)
 
         self.worker_thread = QtCore.QThread()
         self.worker.moveToThread(self.worker_thread)
         self.worker_thread.started.connect(self.worker.run)
         self.worker_thread.start()
 
+    def on_certificate(self, result):
+        """A certificate from the background queue is placed (or failed)"""
+        self.pending_certificates.discard(self.sender())
+        if str(result).startswith("ERROR"):
+            self.log.append(f"❌  Certificate generation failed: {result}")
+            QtWidgets.QMessageBox.warning(self, "❌ Certificate Failed",
+                f"The wipe completed, but the certificate could not be generated:\n\n{result}")
+        else:
+            self.log.append(f"✅  Certificate generated: {result}")
+
     def on_cancel(self):
         if self.worker:
             self.worker.stop()
@@ -763,11 +1024,16 @@ class MainWindow(QtWidgets.QWidget):
         
         if result and not str(result).startswith("ERROR"):
             # Success
+            if str(result).startswith("WIPED"):
+                self.pending_certificates.add(self.worker)
+                detail = "The certificate is being generated in the background;\nits location will appear in the log."
+            else:
+                detail = f"Certificate generated:\n{result}"
             success_msg = QtWidgets.QMessageBox()
             success_msg.setIcon(QtWidgets.QMessageBox.Information)
             success_msg.setWindowTitle("✅ Operation Successful")
             success_msg.setText("Secure Format Complete!")
-            success_msg.setInformativeText(f"The drive has been securely wiped and formatted.\n\nCertificate generated:\n{result}")
+            success_msg.setInformativeText(f"The drive has been securely wiped and formatted.\n\n{detail}")
             success_msg.setStyleSheet("""
                 QMessageBox {
                     background-color: #2a2a2a;
@@ -786,7 +1052,8 @@ class MainWindow(QtWidgets.QWidget):
                 }
             """)
             success_msg.exec_()
-            self.log.append("✅  Certificate generated successfully.")
+            if not str(result).startswith("WIPED"):
+                self.log.append("✅  Certificate generated successfully.")
         else:
             # Error
             error_msg = QtWidgets.QMessageBox()
@@ -0,0 +1,308 @@
+"""
+instrumentation.py
+Hot-path instrumentation for Code Monk — Secure Formatter
+
+Per-phase timers, latency histograms for write/flush/read calls, byte
+counters and queue occupancy gauges, exported as a Prometheus textfile (for
+the node_exporter textfile collector) or a JSON snapshot.
+
+Instrumentation is off unless an Instruments object is handed to the engine
+or worker. Off means the code path is exactly the uninstrumented one: the
+target is not wrapped and no timer is read. On, each I/O call costs two
+perf_counter() reads, a bisect and an uncontended lock.
+"""
+import bisect
+import contextlib
+import json
+import os
+import threading
+import time
+
+# Upper bounds in seconds: 50 us .. 10 s, roughly x2.5 per step
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+EXPORT_INTERVAL = 15.0      # seconds between textfile writes
+# Engine phases (write_pass, readback_verify) run inside the worker's "wipe" phase, so they
+# get their own metrics: one sum over either never counts the same second twice
+PHASE_METRICS = {"job": ("codemonk_phase_seconds_total", "codemonk_phases_total"),
+                 "engine": ("codemonk_engine_phase_seconds_total", "codemonk_engine_phases_total")}
+
+HELP = {
+    "codemonk_io_seconds": ("histogram", "Latency of write, read and flush calls on wipe targets"),
+    "codemonk_io_bytes_total": ("counter", "Bytes moved by write and read calls on wipe targets"),
+    "codemonk_io_errors_total": ("counter", "Failed write, read and flush calls"),
+    "codemonk_fill_seconds": ("histogram", "Time to generate one block of overwrite data"),
+    "codemonk_phase_seconds_total": ("counter", "Wall time spent in each job phase"),
+    "codemonk_phases_total": ("counter", "Completed job phases"),
+    "codemonk_engine_phase_seconds_total": ("counter", "Wall time spent in engine phases (within the job's wipe phase)"),
+    "codemonk_engine_phases_total": ("counter", "Completed engine phases"),
+    "codemonk_event_backlog": ("gauge", "Job events (coalesced progress and queued deliveries) not delivered yet"),
+    "codemonk_events_dropped_total": ("counter", "Progress, phase and status events dropped because delivery fell behind"),
+    "codemonk_certificate_queue_pending": ("gauge", "Certificates waiting to be placed or rendered"),
+    "codemonk_jobs": ("gauge", "Jobs by state"),
+}
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (cumulative on export, like Prometheus)"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)    # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts, total, n = list(self.counts), self.sum, self.count
+        cumulative, running = [], 0
+        for bound, c in zip(self.buckets + (float("inf"),), counts):
+            running += c
+            cumulative.append([bound, running])
+        return {"count": n, "sum": round(total, 6), "buckets": cumulative}
+
+    def quantile(self, q):
+        """Upper bucket bound below which a fraction q of observations fall"""
+        with self._lock:
+            counts, n = list(self.counts), self.count
+        if not n:
+            return None
+        running = 0
+        for bound, c in zip(self.buckets + (float("inf"),), counts):
+            running += c
+            if running >= q * n:
+                return bound
+        return float("inf")
+
+
+class Instruments:
+    """Registry of counters, gauges and histograms shared by every job of a process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}      # (name, labels) -> number
+        self._histograms = {}    # (name, labels) -> Histogram
+        self._gauges = {}        # (name, labels) -> value or callable sampled at export
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def histogram(self, name, **labels):
+        """The histogram for name/labels; hot paths keep the object instead of looking it up per call"""
+        key = _key(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram()
+            return hist
+
+    def observe(self, name, value, **labels):
+        self.histogram(name, **labels).observe(value)
+
+    def gauge(self, name, value, **labels):
+        """Set a gauge; a callable is sampled at export time, so queues cost nothing to watch"""
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    @contextlib.contextmanager
+    def phase(self, name, level="job"):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start, level)
+
+    def add_phase(self, name, seconds, level="job"):
+        seconds_total, count_total = PHASE_METRICS[level]
+        self.inc(seconds_total, seconds, phase=name)
+        self.inc(count_total, phase=name)
+
+    def timed(self, fn, name, **labels):
+        """fn wrapped to record its latency in histogram name"""
+        hist = self.histogram(name, **labels)
+        clock = time.perf_counter
+
+        def wrapper(*args):
+            start = clock()
+            try:
+                return fn(*args)
+            finally:
+                hist.observe(clock() - start)
+        return wrapper
+
+    def snapshot(self):
+        """Plain dict of every metric: {"counters": [...], "gauges": [...], "histograms": [...]}"""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = dict(self._histograms)
+        out = {"time": time.time(), "counters": [], "gauges": [], "histograms": []}
+        for (name, labels), value in sorted(counters.items()):
+            out["counters"].append({"name": name, "labels": dict(labels), "value": round(value, 6)})
+        for (name, labels), value in sorted(gauges.items(), key=lambda kv: kv[0]):
+            if callable(value):
+                try:
+                    value = value()
+                except Exception:
+                    continue
+            out["gauges"].append({"name": name, "labels": dict(labels), "value": value})
+        for (name, labels), hist in sorted(histograms.items(), key=lambda kv: kv[0]):
+            out["histograms"].append(dict(hist.snapshot(), name=name, labels=dict(labels)))
+        return out
+
+    def prometheus(self, snapshot=None):
+        return prometheus_text(snapshot or self.snapshot())
+
+    def write(self, path):
+        """Write a snapshot atomically: Prometheus text, or JSON when path ends in .json"""
+        snap = self.snapshot()
+        if path.endswith(".json"):
+            data = json.dumps(snap, sort_keys=True)
+        else:
+            data = prometheus_text(snap)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        # The textfile collector must never see a half-written file
+        os.replace(tmp, path)
+        return path
+
+
+def prometheus_text(snapshot):
+    """Prometheus text exposition format for a snapshot()"""
+    lines, described = [], set()
+
+    def describe(name):
+        if name not in described:
+            described.add(name)
+            kind, text = HELP.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for item in snapshot["counters"] + snapshot["gauges"]:
+        describe(item["name"])
+        lines.append(f"{item['name']}{_label_text(sorted(item['labels'].items()))} {_number(item['value'])}")
+    for item in snapshot["histograms"]:
+        name, labels = item["name"], sorted(item["labels"].items())
+        describe(name)
+        for bound, count in item["buckets"]:
+            lines.append(f"{name}_bucket{_label_text(labels, [('le', _number(bound))])} {count}")
+        lines.append(f"{name}_sum{_label_text(labels)} {_number(item['sum'])}")
+        lines.append(f"{name}_count{_label_text(labels)} {item['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class InstrumentedTarget:
+    """Wraps a wipe target so every write_at/read_at/flush is timed and counted"""
+
+    def __init__(self, target, instruments):
+        self.target = target
+        self.instruments = instruments
+        self._write_hist = instruments.histogram("codemonk_io_seconds", op="write")
+        self._read_hist = instruments.histogram("codemonk_io_seconds", op="read")
+        self._flush_hist = instruments.histogram("codemonk_io_seconds", op="flush")
+
+    def __getattr__(self, name):
+        return getattr(self.target, name)
+
+    def write_at(self, offset, data):
+        start = time.perf_counter()
+        try:
+            written = self.target.write_at(offset, data)
+        except OSError:
+            self.instruments.inc("codemonk_io_errors_total", op="write")
+            raise
+        finally:
+            self._write_hist.observe(time.perf_counter() - start)
+        self.instruments.inc("codemonk_io_bytes_total", len(data), op="write")
+        return written
+
+    def read_at(self, offset, length):
+        start = time.perf_counter()
+        try:
+            data = self.target.read_at(offset, length)
+        except OSError:
+            self.instruments.inc("codemonk_io_errors_total", op="read")
+            raise
+        finally:
+            self._read_hist.observe(time.perf_counter() - start)
+        self.instruments.inc("codemonk_io_bytes_total", len(data), op="read")
+        return data
+
+    def flush(self):
+        start = time.perf_counter()
+        try:
+            return self.target.flush()
+        except OSError:
+            self.instruments.inc("codemonk_io_errors_total", op="flush")
+            raise
+        finally:
+            self._flush_hist.observe(time.perf_counter() - start)
+
+
+def instrument_target(target, instruments):
+    """target itself when instruments is None, otherwise a timing wrapper"""
+    return target if instruments is None else InstrumentedTarget(target, instruments)
+
+
+class MetricsExporter:
+    """Rewrites a metrics file every `interval` seconds from a background thread"""
+
+    def __init__(self, instruments, path, interval=EXPORT_INTERVAL):
+        self.instruments = instruments
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="metrics-export", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._write()   # final numbers
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self._write()
+
+    def _write(self):
+        try:
+            self.instruments.write(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,223 @@
+"""
+job_log.py
+Structured, rotating job logs for Code Monk — Secure Formatter
+
+JobLog subscribes to an EventStream and appends every job event as one JSON
+record per line (job id, target, phase, and the measured metrics in the
+final summary) to a per-station log. Publishing only puts the event object
+on a bounded queue; a background thread formats, writes and rotates, so a
+wipe never waits on log I/O. If the writer ever falls that far behind, new
+records are counted as dropped rather than blocking.
+
+The live file is plain JSON lines; on rotation (size or new day) it is
+gzip-compressed. Progress is logged at most every `progress_interval`
+seconds per job, which keeps a 24-bay station's day to a few megabytes.
+
+    python job_log.py query --job 3f2a9c1e
+    python job_log.py query --type error --since 2026-10-01 --target "PhysicalDrive3"
+"""
+import argparse
+import datetime
+import glob
+import gzip
+import json
+import os
+import queue
+import shutil
+import socket
+import sys
+import threading
+import time
+from progress_events import JobEvent, ProgressEvent, StateEvent, TERMINAL_STATES, event_to_dict
+
+LOG_DIR = "logs"
+MAX_BYTES = 64 * 1024 * 1024     # rotate the live file beyond this size
+KEEP_FILES = 60                  # compressed files kept per station
+QUEUE_SIZE = 100000              # events buffered before new ones are dropped
+PROGRESS_INTERVAL = 5.0          # seconds between logged progress records of one job
+WRITE_BATCH = 1000
+
+
+def _stamp(ts):
+    return datetime.datetime.fromtimestamp(ts).strftime("%Y%m%d_%H%M%S")
+
+
+class JobLog:
+    """EventStream subscriber writing rotating, compressed JSON-lines job logs"""
+
+    def __init__(self, directory=LOG_DIR, station=None, max_bytes=MAX_BYTES, keep=KEEP_FILES,
+                 progress_interval=PROGRESS_INTERVAL, queue_size=QUEUE_SIZE):
+        self.directory = directory
+        self.station = station or socket.gethostname()
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.progress_interval = progress_interval
+        self.path = os.path.join(directory, f"codemonk_jobs_{self.station}.jsonl")
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._targets = {}        # job_id -> target label (writer thread only)
+        self._last_progress = {}  # job_id -> time of the last logged progress record
+        self._fp = None
+        self._day = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._thread = threading.Thread(target=self._run, name="job-log", daemon=True)
+            self._thread.start()
+        return self
+
+    def __call__(self, event):
+        """Called on the publishing thread: never blocks"""
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    # --- writer thread ---
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < WRITE_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            lines = [self._format(e) for e in batch if e is not None]
+            lines = [line for line in lines if line is not None]
+            if lines:
+                try:
+                    self._write(lines)
+                except OSError:
+                    self.dropped += len(lines)
+            if stop:
+                if self._fp is not None:
+                    self._fp.close()
+                    self._fp = None
+                return
+
+    def _format(self, event):
+        job_id = event.job_id
+        if isinstance(event, ProgressEvent):
+            last = self._last_progress.get(job_id)
+            if last is not None and event.time - last < self.progress_interval and event.percent < 100:
+                return None
+            self._last_progress[job_id] = event.time
+        elif isinstance(event, JobEvent):
+            self._targets[job_id] = event.target
+        record = event_to_dict(event)
+        record["time"] = round(record["time"], 3)
+        if isinstance(record.get("mbps"), float):
+            record["mbps"] = round(record["mbps"], 1)
+        if isinstance(record.get("eta_s"), float):
+            record["eta_s"] = round(record["eta_s"], 1)
+        record["station"] = self.station
+        record.setdefault("target", self._targets.get(job_id))
+        if isinstance(event, StateEvent) and event.state in TERMINAL_STATES:
+            self._targets.pop(job_id, None)
+            self._last_progress.pop(job_id, None)
+        return json.dumps(record, separators=(",", ":"), ensure_ascii=False)
+
+    def _write(self, lines):
+        day = time.strftime("%Y%m%d")
+        if self._fp is None:
+            self._fp = open(self.path, "a", encoding="utf-8")
+            if self._day is None:
+                self._day = time.strftime("%Y%m%d", time.localtime(os.path.getmtime(self.path)))
+        if day != self._day or self._fp.tell() >= self.max_bytes:
+            self._rotate()
+            self._day = day
+        self._fp.write("\n".join(lines) + "\n")
+        self._fp.flush()
+        self.written += len(lines)
+
+    def _rotate(self):
+        self._fp.close()
+        self._fp = None
+        if os.path.getsize(self.path):
+            base = os.path.join(self.directory, f"codemonk_jobs_{self.station}_{_stamp(time.time())}")
+            rotated, n = base + ".jsonl", 1
+            while os.path.exists(rotated + ".gz"):
+                rotated, n = f"{base}_{n}.jsonl", n + 1
+            os.replace(self.path, rotated)
+            with open(rotated, "rb") as src, gzip.open(rotated + ".gz", "wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(rotated)
+            for old in log_files(self.directory, self.station, compressed_only=True)[:-self.keep or None]:
+                os.remove(old)
+        self._fp = open(self.path, "a", encoding="utf-8")
+
+
+def log_files(directory=LOG_DIR, station="*", compressed_only=False):
+    """Log files oldest first: the rotated .gz files by name, then the live file"""
+    files = sorted(glob.glob(os.path.join(directory, f"codemonk_jobs_{station}_*.jsonl.gz")))
+    if not compressed_only:
+        files += sorted(glob.glob(os.path.join(directory, f"codemonk_jobs_{station}.jsonl")))
+    return files
+
+
+def iter_records(directory=LOG_DIR, station="*", job=None, types=None, target=None, since=None, until=None):
+    """Records from every log file matching the filters; since/until are epoch seconds"""
+    for path in log_files(directory, station):
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                # Cheap substring test first: most lines are skipped without parsing
+                if job is not None and job not in line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue   # a line cut short by a crash
+                if job is not None and record.get("job_id") != job:
+                    continue
+                if types and record.get("type") not in types:
+                    continue
+                if target is not None and target not in (record.get("target") or ""):
+                    continue
+                if since is not None and record["time"] < since:
+                    continue
+                if until is not None and record["time"] >= until:
+                    continue
+                yield record
+
+
+def _epoch(text):
+    return datetime.datetime.fromisoformat(text).timestamp() if text else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the structured job logs")
+    parser.add_argument("--dir", default=LOG_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    q = sub.add_parser("query", help="print matching records as JSON lines")
+    q.add_argument("--station", default="*")
+    q.add_argument("--job")
+    q.add_argument("--type", action="append", help="record type (job, progress, phase, status, error, "
+                                                   "verification, summary, state, certificate); repeatable")
+    q.add_argument("--target", help="substring of the target label")
+    q.add_argument("--since", help="ISO date or time, inclusive")
+    q.add_argument("--until", help="ISO date or time, exclusive")
+    args = parser.parse_args(argv)
+
+    count = 0
+    for record in iter_records(args.dir, args.station, args.job, args.type, args.target,
+                               _epoch(args.since), _epoch(args.until)):
+        print(json.dumps(record, ensure_ascii=False))
+        count += 1
+    print(f"{count} records", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,342 @@
+"""
+job_profiler.py
+Per-job profiling for Code Monk — Secure Formatter
+
+Runs one wipe job under cProfile, with optional tracemalloc snapshots and
+periodic stack sampling, and writes a report bundle directory:
+
+    profile.pstats     raw cProfile data (snakeviz, pstats)
+    profile.txt        top functions by own time and by cumulative time
+    summary.json       wall vs CPU time of the job thread, and where the time
+                       went: device I/O, data generation, hashing, external
+                       tools, sleeping, other Python
+    stacks.folded      sampled stacks of the job thread (flamegraph.pl input)
+    tracemalloc.txt    top allocation sites and growth over the job
+
+The sampler only looks at the thread that runs the job, so one job of a
+batch can be profiled while the others run at full speed. cProfile is one per
+process: one job at a time gets it, an overlapping profiled job (or one that
+finds a debugger or coverage tool profiling) gets stack samples only. Up to
+Python 3.11 cProfile sees only the job's thread; from 3.12 it is built on
+sys.monitoring and also records the other threads' calls while it is on.
+tracemalloc is process-wide: while it is on, every job pays for it and its
+snapshots include their allocations too. Overlapping profiled jobs share it;
+it stops when the last of them finishes. A profiler that fails only loses its
+report, never the job.
+
+    python job_profiler.py disk.img --passes 1 --sample-ms 5 --tracemalloc 10 --confirm ERASE
+    python job_profiler.py disk.img --mmap --window-mb 256 --confirm ERASE
+"""
+import argparse
+import collections
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+PROFILE_PREFIX = "CodeMonk_Profile_"
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+FALLBACK_SAMPLE_INTERVAL = 0.005    # stack samples instead, when cProfile is taken
+
+# Where own time goes, by the name cProfile gives the function
+CATEGORIES = (
+    ("device_io", ("pwrite", "pread", "posix.write", "posix.read", "nt.write", "nt.read", "fsync", "lseek",
+                   "mmap.mmap")),
+    ("data_generation", ("urandom", "random_raw", "fill (wipe_engine.py")),
+    ("hashing", ("_hashlib.HASH",)),
+    ("external_tools", ("waitpid", "WaitForSingleObject", "_communicate", "select.poll", "communicate")),
+    ("sleeping", ("time.sleep",)),
+)
+
+# Held by the one job whose profiler has cProfile enabled
+_cprofile_lock = threading.Lock()
+
+# Profilers currently using tracemalloc, and whether they were the ones to start it
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_started = False
+
+
+def _acquire_tracing(frames):
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            _tracing_started = True
+        _tracing_users += 1
+
+
+def _release_tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+
+
+@dataclass
+class ProfileSettings:
+    directory: str = "."
+    tracemalloc_frames: int = 0      # 0 = tracemalloc off
+    sample_interval: float = None    # seconds between stack samples; None = no sampling
+
+    @classmethod
+    def from_request(cls, value, directory="."):
+        """Settings from a job request: true, or {"tracemalloc": frames, "sample_ms": ms}"""
+        if not value:
+            return None
+        options = value if isinstance(value, dict) else {}
+        sample_ms = options.get("sample_ms")
+        return cls(directory, int(options.get("tracemalloc", 0)), sample_ms / 1000 if sample_ms else None)
+
+
+def bundle_path(directory, job_id):
+    return os.path.join(directory, f"{PROFILE_PREFIX}{job_id}")
+
+
+def categorize(name):
+    for category, needles in CATEGORIES:
+        if any(n in name for n in needles):
+            return category
+    return "python"
+
+
+class StackSampler:
+    """Samples one thread's stack every `interval` seconds into folded-stack counts"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+
+class JobProfiler:
+    """Context manager that profiles the calling thread and writes a report bundle on exit"""
+
+    def __init__(self, directory, settings=None):
+        self.directory = directory
+        self.settings = settings or ProfileSettings()
+        self.profile = None              # cProfile.Profile while this job holds cProfile
+        self.sampler = None
+        self.summary = None
+        self.error = None                # why the report is missing or incomplete
+        self._tracing = False
+        self._started = False
+        self._first_snapshot = None
+        self._traced = None              # (current, peak) bytes when tracemalloc stopped
+
+    def __enter__(self):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            frames = self.settings.tracemalloc_frames
+            if frames:
+                _acquire_tracing(frames)
+                self._tracing = True
+                self._first_snapshot = self._snapshot()
+            interval = self.settings.sample_interval
+            if not self._enable_cprofile() and not interval:
+                interval = FALLBACK_SAMPLE_INTERVAL
+            if interval:
+                self.sampler = StackSampler(threading.get_ident(), interval).start()
+        except Exception as e:
+            # Run the job unprofiled rather than not at all
+            self.error = f"profiler could not start: {e}"
+            self._undo()
+            return self
+        self._started = True
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        return self
+
+    def _enable_cprofile(self):
+        if not _cprofile_lock.acquire(blocking=False):
+            self.error = "another job holds cProfile - stack samples only"
+            return False
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:         # 3.12+: another profiling tool is active
+            _cprofile_lock.release()
+            self.error = f"cProfile unavailable ({e}) - stack samples only"
+            return False
+        self.profile = profile
+        return True
+
+    def _undo(self):
+        """Give back whatever __enter__ took: cProfile, the sampler thread, tracemalloc"""
+        if self.profile is not None:
+            self.profile.disable()
+            _cprofile_lock.release()
+        if self.sampler is not None:
+            self.sampler.stop()
+        if self._tracing:
+            self._tracing = False
+            _release_tracing()
+
+    def __exit__(self, *exc):
+        if not self._started:
+            return False
+        if self.profile is not None:
+            try:
+                self.profile.disable()
+            finally:
+                _cprofile_lock.release()
+        wall = time.perf_counter() - self._wall
+        cpu = time.thread_time() - self._cpu
+        try:
+            if self.sampler is not None:
+                self.sampler.stop()
+            last_snapshot = None
+            if self._tracing:
+                try:
+                    if self._first_snapshot is not None:
+                        last_snapshot = self._snapshot()
+                    if last_snapshot is not None:
+                        self._traced = tracemalloc.get_traced_memory()
+                finally:
+                    _release_tracing()
+            self.write(wall, cpu, last_snapshot)
+        except Exception as e:
+            # The job itself is finished: a broken report must not fail it
+            self.error = f"profile report failed: {e}"
+        return False
+
+    def _snapshot(self):
+        try:
+            return tracemalloc.take_snapshot()
+        except RuntimeError as e:
+            self.error = f"tracemalloc snapshot failed: {e}"
+            return None
+
+    def write(self, wall, cpu, last_snapshot=None):
+        categories = collections.Counter()
+        top = []
+        stats = {}
+        if self.profile is not None:
+            self.profile.dump_stats(os.path.join(self.directory, "profile.pstats"))
+            pstat = pstats.Stats(self.profile)
+            text = io.StringIO()
+            pstat.stream = text
+            text.write(f"Job thread: {wall:.3f}s wall, {cpu:.3f}s CPU\n\n")
+            pstat.sort_stats("tottime").print_stats(TOP_FUNCTIONS)
+            pstat.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+            with open(os.path.join(self.directory, "profile.txt"), "w", encoding="utf-8") as f:
+                f.write(text.getvalue())
+            stats = pstat.stats
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.items():
+            label = name if filename == "~" else f"{name} ({os.path.basename(filename)}:{line})"
+            categories[categorize(label)] += tottime
+            top.append((tottime, calls, cumtime, label))
+        top.sort(reverse=True)
+        profiled = sum(categories.values()) or 1.0
+        self.summary = {
+            "wall_seconds": round(wall, 3),
+            "cpu_seconds": round(cpu, 3),
+            "cpu_share": round(cpu / wall, 3) if wall else None,
+            "time_by_category": {k: {"seconds": round(v, 3), "share": round(v / profiled, 3)}
+                                 for k, v in categories.most_common()},
+            "top_functions": [{"function": label, "calls": calls, "own_seconds": round(tottime, 4),
+                               "cumulative_seconds": round(cumtime, 4)}
+                              for tottime, calls, cumtime, label in top[:15]],
+            "cprofile": self.profile is not None,
+            "stack_samples": self.sampler.samples if self.sampler is not None else 0,
+            "tracemalloc": last_snapshot is not None,
+            "error": self.error,
+        }
+        with open(os.path.join(self.directory, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump(self.summary, f, indent=2)
+
+        if self.sampler is not None:
+            with open(os.path.join(self.directory, "stacks.folded"), "w", encoding="utf-8") as f:
+                for stack, count in self.sampler.counts.most_common():
+                    f.write(f"{stack} {count}\n")
+
+        if last_snapshot is not None:
+            with open(os.path.join(self.directory, "tracemalloc.txt"), "w", encoding="utf-8") as f:
+                f.write("Top allocation sites at the end of the job:\n")
+                for stat in last_snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+                    f.write(f"  {stat}\n")
+                f.write("\nGrowth since the start of the job:\n")
+                for stat in last_snapshot.compare_to(self._first_snapshot, "lineno")[:TOP_ALLOCATIONS]:
+                    f.write(f"  {stat}\n")
+                if self._traced is not None:
+                    f.write(f"\nTraced memory at the end {self._traced[0]} bytes, peak {self._traced[1]} bytes "
+                            f"(whole process)\n")
+        return self.directory
+
+
+def main(argv=None):
+    from wipe_engine import DEFAULT_BLOCK_SIZE, MB, MMAP_WINDOW, FileTarget, MmapOverwriteEngine, OverwriteEngine
+    from wipe_patterns import STANDARDS, get_standard
+
+    parser = argparse.ArgumentParser(description="Profile the overwrite engine on one image file or device")
+    parser.add_argument("target", help="image file or raw device to overwrite (destroyed!)")
+    parser.add_argument("--passes", type=int, default=1, help="random passes, unless --standard is given")
+    parser.add_argument("--standard", choices=[s.key for s in STANDARDS], help="write the passes of this standard")
+    parser.add_argument("--block-mb", type=int, default=DEFAULT_BLOCK_SIZE // MB)
+    parser.add_argument("--no-verify", action="store_true", help="skip the read-back verification")
+    parser.add_argument("--mmap", action="store_true", help="write through a memory map (image files only)")
+    parser.add_argument("--window-mb", type=int, default=MMAP_WINDOW // MB, help="mapped window with --mmap")
+    parser.add_argument("--tracemalloc", type=int, default=0, metavar="FRAMES", help="trace allocations, keeping FRAMES frames")
+    parser.add_argument("--sample-ms", type=float, help="sample the engine's stack every N milliseconds")
+    parser.add_argument("--out", help="report bundle directory (default: next to the target)")
+    parser.add_argument("--confirm", default="", help="must be ERASE")
+    args = parser.parse_args(argv)
+    if args.confirm.upper() != "ERASE":
+        parser.error("this overwrites the target - pass --confirm ERASE")
+
+    out = args.out or bundle_path(os.path.dirname(os.path.abspath(args.target)), time.strftime("%Y%m%d_%H%M%S"))
+    settings = ProfileSettings(out, args.tracemalloc, args.sample_ms / 1000 if args.sample_ms else None)
+    patterns = get_standard(args.standard).resolve() if args.standard else [None] * args.passes
+    with FileTarget(args.target) as target:
+        with JobProfiler(out, settings) as profiler:
+            if args.mmap:
+                engine = MmapOverwriteEngine(target, patterns=patterns, block_size=args.block_mb * MB,
+                                             window_size=args.window_mb * MB, verify=not args.no_verify)
+            else:
+                engine = OverwriteEngine(target, patterns=patterns, block_size=args.block_mb * MB,
+                                         verify=not args.no_verify)
+            report = engine.run()
+    summary = profiler.summary
+    print(f"{report.bytes_written // MB} MB written in {summary['wall_seconds']}s "
+          f"({summary['cpu_seconds']}s CPU in the engine thread)")
+    for category, value in summary["time_by_category"].items():
+        print(f"  {category:<16} {value['seconds']:>8.3f}s  {value['share'] * 100:5.1f}%")
+    print(f"Report bundle: {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,634 @@
+"""
+job_server.py
+Local asyncio job server for Code Monk — Secure Formatter
+
+Exposes drive inventory, job submit/cancel and a live progress stream over
+HTTP+JSON on localhost so that fleet wipe stations can be driven from an
+orchestration script instead of through MainWindow.
+
+    GET    /drives               drive inventory
+    GET    /jobs                 all jobs
+    GET    /jobs/<id>            one job
+    POST   /jobs                 {"drive": "<id>", "standard": "dod-5220.22-m", "confirm": "ERASE"}
+                                 or "passes": 1, 3, 7 or 35 for the matching standard;
+                                 optional "extent_mb": 256 for extent-major order, with
+                                 "resume_from": <checkpoint> to continue a stopped one;
+                                 optional "mmap": true to write image files through a
+                                 memory map;
+                                 or "quick": true to zero only partition tables and
+                                 filesystem signatures (quick_wipe.py, not a sanitization);
+                                 optional "profile": true or {"tracemalloc": 10, "sample_ms": 5}
+    DELETE /jobs/<id>            cancel a job
+    GET    /events               NDJSON event stream for every job
+    GET    /jobs/<id>/events     NDJSON event stream for one job
+    GET    /metrics              Prometheus metrics (with --metrics)
+    GET    /metrics.json         the same metrics as a JSON snapshot
+
+Events are the typed records from progress_events (job, progress, phase,
+status, error, verification, summary, state), throttled per job, plus
+"inventory" deltas when drives are plugged in or removed. They are also kept
+in the station's structured job log (job_log.py) unless --job-log "" is given.
+
+With --metrics the engine's I/O calls and phases are instrumented
+(instrumentation.py); --metrics-file also writes the numbers to a Prometheus
+textfile (or JSON when the name ends in .json) for node_exporter to pick up.
+"""
+import argparse
+import asyncio
+import heapq
+import itertools
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from drive_utils import DriveRecord, as_record, drive_key
+from instrumentation import EXPORT_INTERVAL, Instruments, MetricsExporter
+from job_log import LOG_DIR, JobLog
+from job_profiler import JobProfiler, ProfileSettings, bundle_path
+from progress_events import (CertificateEvent, DEFAULT_MIN_INTERVAL, ErrorEvent, EventStream, JobEvent, NDJSONWriter,
+                             PhaseEvent, ProgressEvent, ProgressTracker, StateEvent, StatusEvent,
+                             event_to_dict)
+from wipe_engine import extent_bytes
+from wipe_patterns import DEFAULT_STANDARD, get_standard, standard_for_passes
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY = 64 * 1024
+SUBSCRIBER_QUEUE_SIZE = 256
+CANCEL_POLL_INTERVAL = 0.2   # seconds between a running job's cancel checks
+
+TERMINAL_STATES = ("done", "failed", "cancelled")
+
+
+class Job:
+    def __init__(self, entry, standard, estimate_s=None, profile=None, extent_size=None, start_offset=0,
+                 quick=False, mmap=False):
+        self.id = uuid.uuid4().hex[:12]
+        self.entry = entry
+        self.standard = standard   # wipe_patterns.WipeStandard
+        self.passes = standard.pass_count
+        self.extent_size = extent_size   # bytes, for extent-major order
+        self.start_offset = start_offset
+        self.quick = quick         # metadata-only quick wipe instead of the standard's passes
+        self.mmap = mmap           # MmapOverwriteEngine instead of OverwriteEngine
+        self.estimate_s = estimate_s
+        self.estimate_basis = None # "measured" or "derived from reads": how the write speed was obtained
+        self.profile = profile     # job_profiler.ProfileSettings when this job runs under the profiler
+        self.profile_dir = bundle_path(profile.directory, self.id) if profile is not None else None
+        self.state = "queued"
+        self.progress = 0
+        self.status = ""
+        self.result = None
+        self.certificate = None    # path or error once the background certificate is done
+        self.method = None         # what actually ran, with the measured metrics and phase times
+        self.metrics = None
+        self.phases = None
+        self.created = time.time()
+        self.started = None
+        self.ended = None
+        self.cancel_event = threading.Event()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "drive": self.entry.id,
+            "target": self.entry.label,
+            "standard": self.standard.key,
+            "passes": self.passes,
+            "extent_size": self.extent_size,
+            "resume_from": self.start_offset,
+            "quick": self.quick,
+            "mmap": self.mmap,
+            "estimate_s": self.estimate_s,
+            "estimate_basis": self.estimate_basis,
+            "state": self.state,
+            "progress": self.progress,
+            "status": self.status,
+            "result": self.result,
+            "certificate": self.certificate,
+            "method": self.method,
+            "metrics": self.metrics,
+            "phases": self.phases,
+            "profile": self.profile_dir,
+            "created": self.created,
+            "started": self.started,
+            "ended": self.ended,
+        }
+
+
+class WorkerBackend:
+    """Runs jobs through WipeWorker against the real drives of this station"""
+
+    def __init__(self, do_real=True, instruments=None):
+        from drive_utils import DriveInventoryCache, DriveWatcher
+        from utils import DRIVE_CACHE_TTL, DRIVE_RAW_WATCH_INTERVAL, DRIVE_WATCH_INTERVAL
+        self.do_real = do_real
+        self.instruments = instruments
+        self.inventory = DriveInventoryCache(ttl=DRIVE_CACHE_TTL)
+        self.watcher = DriveWatcher(self.inventory, interval=DRIVE_WATCH_INTERVAL,
+                                    raw_interval=DRIVE_RAW_WATCH_INTERVAL)
+        self.probes = {}
+        self.certificates = None   # CertificateQueue, created with the first job
+        self._lock = threading.Lock()
+
+    def list_drives(self):
+        return self.inventory.get()
+
+    def estimate(self, entry, passes):
+        """Wipe duration from a speed probe (write-back only on disks with no volume), cached per drive"""
+        from speed_probe import estimate_duration, probe_allows_write, probe_path, probe_target
+        probe = self.probes.get(entry.key)
+        if probe is None and entry.size_bytes:
+            probe = self.probes[entry.key] = probe_target(probe_path(entry), entry.size_bytes,
+                                                          allow_write=probe_allows_write(entry))
+        return estimate_duration(entry.size_bytes, passes, probe)
+
+    def estimate_basis(self, entry):
+        """How the write speed behind estimate() was obtained (speed_probe.ProbeResult.write_basis)"""
+        probe = self.probes.get(entry.key)
+        return probe.write_basis if probe is not None else None
+
+    def run_job(self, job, events):
+        from PyQt5 import QtCore
+        from certificate import CertificateQueue, CertificateRenderer
+        from secure_wipe import WipeWorker
+
+        with self._lock:
+            if self.certificates is None:
+                # Certificates are placed and rendered in the background (in parallel
+                # processes) so a job frees its slot as soon as the wipe I/O is done
+                self.certificates = CertificateQueue(CertificateRenderer())
+        worker = WipeWorker(job.entry, standard=job.standard.key, extent_size=job.extent_size,
+                            start_offset=job.start_offset, quick=job.quick, mmap=job.mmap, do_real=self.do_real,
+                            job_id=job.id, events=events, certificates=self.certificates,
+                            instruments=self.instruments, profile=job.profile)
+        result = []
+        # Direct connection: the worker runs in a pool thread with no Qt event loop
+        worker.finished.connect(result.append, QtCore.Qt.DirectConnection)
+
+        # The watcher gets its own stop signal: setting job.cancel_event here would make
+        # every job that ended without reporting its state look cancelled
+        ended = threading.Event()
+        watcher = threading.Thread(target=self._watch_cancel, args=(job, worker, ended), daemon=True)
+        watcher.start()
+        try:
+            worker.run()
+        finally:
+            ended.set()
+            watcher.join()
+        record = worker.job_record()
+        job.method, job.metrics, job.phases = record["method"], record["metrics"], record["phases"]
+        return result[0] if result else "ERROR: Worker finished without a result"
+
+    def _watch_cancel(self, job, worker, ended):
+        while not ended.is_set():
+            if job.cancel_event.wait(CANCEL_POLL_INTERVAL):
+                worker.stop()
+                return
+
+    def close(self):
+        if self.certificates is not None:
+            self.certificates.shutdown()
+
+
+class FakeBackend:
+    """Simulated drives and jobs, for testing the server on a machine with no real drives"""
+
+    watcher = None
+
+    def __init__(self, drives=None, steps=20, step_delay=0.01, mbps=200.0):
+        self.drives = [as_record(d) for d in drives] if drives is not None else [
+            DriveRecord(
+                id=f"physical-{i}",
+                kind="physical",
+                device=f"\\\\.\\PhysicalDrive{i}",
+                display=f"PhysicalDrive{i} - Fake Disk (500 GB)",
+                index=i,
+                model="Fake Disk",
+                size_gb=500,
+                size_bytes=500 * 1024**3,
+                serial=f"FAKE{i:04d}",
+            )
+            for i in range(4)
+        ]
+        self.steps = steps
+        self.step_delay = step_delay
+        self.mbps = mbps
+
+    def list_drives(self):
+        return list(self.drives)
+
+    def estimate(self, entry, passes):
+        return passes * (entry.size_bytes or 0) / (self.mbps * 1024 * 1024)
+
+    def estimate_basis(self, entry):
+        return "simulated"
+
+    def run_job(self, job, events):
+        if job.profile is None:
+            return self._simulate(job, events)
+        with JobProfiler(job.profile_dir, job.profile):
+            return self._simulate(job, events)
+
+    def _simulate(self, job, events):
+        total = (job.entry.size_gb or 1) * 1024 ** 3
+        tracker = ProgressTracker(total)
+        e = job.entry
+        events.publish(JobEvent(job.id, e.label, e.device, e.model, e.serial, e.size_bytes, job.passes))
+        events.publish(PhaseEvent(job.id, "wipe"))
+        how = "a metadata-only quick wipe" if job.quick else f"{job.standard.name} ({job.passes} passes)"
+        events.publish(StatusEvent(job.id, "wipe", f"Simulation: wiping {job.entry.device} with {how}"))
+        for i in range(1, self.steps + 1):
+            if job.cancel_event.is_set():
+                return "ERROR: Operation cancelled"
+            time.sleep(self.step_delay)
+            done = total * i // self.steps
+            mbps, eta = tracker.update(done)
+            events.publish(ProgressEvent(job.id, "wipe", int(i / self.steps * 100), done, total, mbps, eta))
+        return f"fake-certificate-{job.id}.pdf"
+
+
+class JobManager:
+    """Owns the jobs and fans their events out to asyncio subscribers.
+
+    Jobs run on a thread pool so the event loop never waits on I/O workers.
+    Workers publish into a throttled EventStream; its subscriber updates the
+    job record and hands the event to the loop with call_soon_threadsafe.
+    When more jobs are queued than there are workers, the longest estimated
+    job starts first so a batch finishes as early as possible.
+    """
+
+    def __init__(self, backend, loop, max_workers=4, min_interval=DEFAULT_MIN_INTERVAL, instruments=None):
+        self.backend = backend
+        self.instruments = instruments
+        self.loop = loop
+        self.jobs = {}
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="wipe-job")
+        self._waiting = []       # heap of (-estimate, seq, job)
+        self._seq = itertools.count()
+        self._running = 0
+        self.subscribers = set()
+        self.events = EventStream(min_interval).start()
+        # Direct: job state must be current when _run checks how the backend ended the job
+        self.events.subscribe(self._on_event, direct=True)
+        if instruments is not None:
+            # Sampled only when metrics are read: nothing is counted on the way
+            instruments.gauge("codemonk_event_backlog", lambda: self.events.backlog)
+            instruments.gauge("codemonk_events_dropped_total", lambda: self.events.dropped)
+            instruments.gauge("codemonk_certificate_queue_pending",
+                              lambda: getattr(getattr(backend, "certificates", None), "pending", 0))
+            for state in ("queued", "running"):
+                instruments.gauge("codemonk_jobs", lambda s=state: sum(j.state == s for j in list(self.jobs.values())),
+                                  state=state)
+        self.watcher = getattr(backend, "watcher", None)
+        if self.watcher is not None:
+            self.watcher.subscribe(self._on_drive_delta)
+            self.watcher.start()
+
+    async def list_drives(self):
+        return await self.loop.run_in_executor(None, self.backend.list_drives)
+
+    async def submit(self, drive_id, standard, profile=None, extent_size=None, start_offset=0, quick=False,
+                     mmap=False):
+        drives = await self.list_drives()
+        entry = next((d for d in drives if d.id == drive_id), None)
+        if entry is None:
+            raise KeyError(f"Unknown drive: {drive_id}")
+        for other in self.jobs.values():
+            if other.entry.id == drive_id and other.state not in TERMINAL_STATES:
+                raise ValueError(f"Drive {drive_id} already has an active job ({other.id})")
+        estimate = basis = None
+        if hasattr(self.backend, "estimate") and not quick:
+            try:
+                estimate = await self.loop.run_in_executor(None, self.backend.estimate, entry,
+                                                           standard.pass_count)
+                if estimate is not None and hasattr(self.backend, "estimate_basis"):
+                    basis = self.backend.estimate_basis(entry)
+            except Exception:
+                estimate = None
+        job = Job(entry, standard, estimate, profile, extent_size, start_offset, quick, mmap)
+        job.estimate_basis = basis
+        self.jobs[job.id] = job
+        self.events.publish(StateEvent(job.id, "queued"))
+        heapq.heappush(self._waiting, (-(estimate or 0), next(self._seq), job))
+        self._dispatch()
+        return job
+
+    def cancel(self, job_id):
+        job = self.jobs[job_id]
+        if job.state in TERMINAL_STATES:
+            return job
+        job.cancel_event.set()
+        if job.state == "queued":
+            self.events.publish(StateEvent(job.id, "cancelled"))
+        return job
+
+    def subscribe(self, job_id=None):
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.add((job_id, queue))
+        return queue
+
+    def unsubscribe(self, job_id, queue):
+        self.subscribers.discard((job_id, queue))
+
+    def shutdown(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+        for job in self.jobs.values():
+            job.cancel_event.set()
+        self.executor.shutdown(wait=True)
+        close = getattr(self.backend, "close", None)
+        if close is not None:
+            close()
+        self.events.stop()
+
+    # --- worker thread side ---
+
+    def _run(self, job):
+        if job.cancel_event.is_set():
+            return
+        self.events.publish(StateEvent(job.id, "running"))
+        try:
+            result = self.backend.run_job(job, self.events)
+        except Exception as e:
+            result = f"ERROR: {e}"
+        if job.state in TERMINAL_STATES:
+            return  # the backend already reported how it ended
+        if not str(result).startswith("ERROR"):
+            state = "done"
+        else:
+            state = "cancelled" if job.cancel_event.is_set() else "failed"
+        self.events.publish(StateEvent(job.id, state, result))
+
+    def _on_event(self, event):
+        job = self.jobs.get(event.job_id)
+        if job is not None:
+            if isinstance(event, ProgressEvent):
+                job.progress = event.percent
+            elif isinstance(event, StatusEvent):
+                job.status = event.message
+            elif isinstance(event, CertificateEvent):
+                job.certificate = event.path or event.error
+            elif isinstance(event, StateEvent):
+                job.state = event.state
+                if event.state == "running":
+                    job.started = event.time
+                elif event.state in TERMINAL_STATES:
+                    job.result = event.result
+                    job.ended = event.time
+        try:
+            self.loop.call_soon_threadsafe(self._fanout, event_to_dict(event))
+        except RuntimeError:
+            pass  # loop already closed
+
+    def _on_drive_delta(self, delta):
+        """Watcher thread: stop jobs whose drive vanished and tell subscribers what changed"""
+        gone = {drive_key(e) for e in delta["removed"]}
+        for job in list(self.jobs.values()):
+            if job.state not in TERMINAL_STATES and drive_key(job.entry) in gone:
+                self.events.publish(ErrorEvent(job.id, "wipe", "Target drive disappeared", fatal=True))
+                job.cancel_event.set()
+        event = {"type": "inventory", "job_id": None, "time": time.time(),
+                 "added": [e.id for e in delta["added"]],
+                 "removed": [e.id for e in delta["removed"]],
+                 "changed": [e.id for e in delta["changed"]]}
+        try:
+            self.loop.call_soon_threadsafe(self._fanout, event)
+        except RuntimeError:
+            pass
+
+    # --- event loop side ---
+
+    def _dispatch(self):
+        while self._running < self.max_workers and self._waiting:
+            _, _, job = heapq.heappop(self._waiting)
+            if job.cancel_event.is_set():
+                continue
+            self._running += 1
+            self.loop.run_in_executor(self.executor, self._run, job).add_done_callback(self._job_done)
+
+    def _job_done(self, _future):
+        self._running -= 1
+        self._dispatch()
+
+    def _fanout(self, event):
+        for job_id, queue in list(self.subscribers):
+            if job_id is not None and job_id != event.get("job_id"):
+                continue
+            if queue.full():
+                # Slow consumer: drop the oldest event rather than block the loop
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+
+class JobServer:
+    def __init__(self, manager, host=DEFAULT_HOST, port=DEFAULT_PORT, profile_dir="."):
+        self.manager = manager
+        self.profile_dir = profile_dir     # where profiled jobs write their report bundles
+        self.host = host
+        self.port = port
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        try:
+            method, path, body = await self._read_request(reader)
+            await self._route(method, path, body, writer)
+        except ValueError as e:
+            await self._send_json(writer, 400, {"error": str(e)})
+        except KeyError as e:
+            await self._send_json(writer, 404, {"error": str(e).strip("'\"")})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            try:
+                await self._send_json(writer, 500, {"error": str(e)})
+            except Exception:
+                pass
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def _read_request(self, reader):
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        if not request_line:
+            raise ConnectionError("Empty request")
+        parts = request_line.split()
+        if len(parts) != 3:
+            raise ValueError("Malformed request line")
+        method, path = parts[0].upper(), parts[1].split("?", 1)[0]
+        length = 0
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value.strip())
+        if length > MAX_BODY:
+            raise ValueError("Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method, path, body
+
+    async def _route(self, method, path, body, writer):
+        parts = [p for p in path.split("/") if p]
+        if method == "GET" and parts == ["drives"]:
+            await self._send_json(writer, 200, [d.to_dict() for d in await self.manager.list_drives()])
+        elif method == "GET" and parts == ["jobs"]:
+            await self._send_json(writer, 200, [j.to_dict() for j in self.manager.jobs.values()])
+        elif method == "POST" and parts == ["jobs"]:
+            payload = json.loads(body or b"{}")
+            if str(payload.get("confirm", "")).upper() != "ERASE":
+                raise ValueError("Destructive job requires \"confirm\": \"ERASE\"")
+            if "passes" in payload and "standard" not in payload:
+                standard = standard_for_passes(int(payload["passes"]))
+            else:
+                standard = get_standard(payload.get("standard", DEFAULT_STANDARD))
+            extent_mb = int(payload.get("extent_mb") or 0)
+            start_offset = int(payload.get("resume_from") or 0)
+            if extent_mb < 0 or start_offset < 0:
+                raise ValueError("extent_mb and resume_from must be positive")
+            # The engine works in whole blocks, so its checkpoints are multiples of the rounded extent
+            extent_size = extent_bytes(extent_mb * 1024 * 1024) if extent_mb else 0
+            if start_offset and (not extent_size or start_offset % extent_size):
+                raise ValueError("resume_from must be a checkpoint of the same extent size")
+            quick = payload.get("quick", False)
+            if not isinstance(quick, bool) or (quick and extent_size):
+                raise ValueError("quick must be true or false, and a quick wipe has no extents")
+            mmap = payload.get("mmap", False)
+            if not isinstance(mmap, bool) or (mmap and quick):
+                raise ValueError("mmap must be true or false, and a quick wipe does not overwrite")
+            profile = ProfileSettings.from_request(payload.get("profile"), self.profile_dir)
+            job = await self.manager.submit(payload.get("drive"), standard, profile, extent_size or None, start_offset,
+                                           quick, mmap)
+            await self._send_json(writer, 201, job.to_dict())
+        elif method == "GET" and len(parts) == 2 and parts[0] == "jobs":
+            await self._send_json(writer, 200, self.manager.jobs[parts[1]].to_dict())
+        elif method == "DELETE" and len(parts) == 2 and parts[0] == "jobs":
+            await self._send_json(writer, 200, self.manager.cancel(parts[1]).to_dict())
+        elif method == "GET" and parts == ["events"]:
+            await self._stream(writer, None)
+        elif method == "GET" and len(parts) == 3 and parts[0] == "jobs" and parts[2] == "events":
+            if parts[1] not in self.manager.jobs:
+                raise KeyError(f"Unknown job: {parts[1]}")
+            await self._stream(writer, parts[1])
+        elif method == "GET" and parts in (["metrics"], ["metrics.json"]):
+            if self.manager.instruments is None:
+                raise KeyError("Metrics are off - start the server with --metrics")
+            if parts == ["metrics"]:
+                await self._send(writer, 200, self.manager.instruments.prometheus().encode("utf-8"),
+                                 "text/plain; version=0.0.4")
+            else:
+                await self._send_json(writer, 200, self.manager.instruments.snapshot())
+        else:
+            await self._send_json(writer, 404, {"error": f"No route for {method} {path}"})
+
+    async def _stream(self, writer, job_id):
+        """Write one JSON event per line until the job ends or the client goes away"""
+        queue = self.manager.subscribe(job_id)
+        try:
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                         b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+            if job_id is not None:
+                job = self.manager.jobs[job_id]
+                writer.write(self._line({"type": "snapshot", "job_id": job.id, "time": time.time(), "job": job.to_dict()}))
+                if job.state in TERMINAL_STATES:
+                    await writer.drain()
+                    return
+            await writer.drain()
+            while True:
+                event = await queue.get()
+                writer.write(self._line(event))
+                await writer.drain()
+                if job_id is not None and event["type"] == "state" and event["state"] in TERMINAL_STATES:
+                    return
+        finally:
+            self.manager.unsubscribe(job_id, queue)
+
+    @staticmethod
+    def _line(obj):
+        return (json.dumps(obj) + "\n").encode("utf-8")
+
+    @classmethod
+    async def _send_json(cls, writer, code, obj):
+        await cls._send(writer, code, json.dumps(obj).encode("utf-8"), "application/json")
+
+    @staticmethod
+    async def _send(writer, code, data, content_type):
+        reasons = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+        writer.write(f"HTTP/1.1 {code} {reasons.get(code, '')}\r\n"
+                     f"Content-Type: {content_type}\r\nContent-Length: {len(data)}\r\n"
+                     f"Connection: close\r\n\r\n".encode("latin-1") + data)
+        await writer.drain()
+
+
+async def serve(backend, host=DEFAULT_HOST, port=DEFAULT_PORT, max_jobs=4, events_path=None,
+                instruments=None, metrics_path=None, metrics_interval=None, profile_dir=".", job_log_dir=None):
+    loop = asyncio.get_running_loop()
+    manager = JobManager(backend, loop, max_workers=max_jobs, instruments=instruments)
+    if events_path:
+        manager.events.subscribe(NDJSONWriter(events_path))
+    job_log = None
+    if job_log_dir:
+        job_log = manager.events.subscribe(JobLog(job_log_dir).start())
+    exporter = None
+    if instruments is not None and metrics_path:
+        exporter = MetricsExporter(instruments, metrics_path, interval=metrics_interval or EXPORT_INTERVAL).start()
+    server = await JobServer(manager, host, port, profile_dir).start()
+    print(f"Job server listening on http://{server.host}:{server.port}")
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.stop()
+        manager.shutdown()
+        if job_log is not None:
+            job_log.close()
+        if exporter is not None:
+            exporter.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Code Monk — Secure Formatter job server")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-jobs", type=int, default=4, help="concurrent wipe jobs")
+    parser.add_argument("--fake", action="store_true", help="use simulated drives (no real I/O)")
+    parser.add_argument("--simulate", action="store_true", help="real drive list, simulated wipes")
+    parser.add_argument("--events", metavar="PATH", help="also write the event stream as NDJSON to a file or pipe ('-' for stdout)")
+    parser.add_argument("--metrics", action="store_true", help="instrument wipes and serve /metrics")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="also write metrics to a Prometheus textfile (JSON if PATH ends in .json); implies --metrics")
+    parser.add_argument("--metrics-interval", type=float, help="seconds between metrics file writes")
+    parser.add_argument("--job-log", default=LOG_DIR, metavar="DIR",
+                        help="directory of the structured job logs (empty string: off)")
+    parser.add_argument("--profile-dir", default=".", help="where jobs submitted with \"profile\" write their report bundle")
+    args = parser.parse_args(argv)
+    instruments = Instruments() if args.metrics or args.metrics_file else None
+    if args.fake:
+        backend = FakeBackend(step_delay=0.2)
+    else:
+        backend = WorkerBackend(do_real=not args.simulate, instruments=instruments)
+    try:
+        asyncio.run(serve(backend, args.host, args.port, args.max_jobs, args.events,
+                          instruments, args.metrics_file, args.metrics_interval, args.profile_dir,
+                          args.job_log))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
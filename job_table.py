@@ -0,0 +1,213 @@
+"""
+job_table.py
+Multi-job dashboard table for Code Monk — Secure Formatter
+
+JobFeed subscribes to a progress_events.EventStream and keeps only the latest
+state of each job (worker threads, any rate). Once per frame the UI thread
+takes the jobs that changed and JobTableModel updates them with one
+dataChanged per row, so the cost per frame depends on the number of jobs, not
+on the event rate. Each row keeps a short MB/s history drawn as a sparkline.
+"""
+import collections
+import threading
+import time
+from PyQt5 import QtCore, QtGui, QtWidgets
+from progress_events import ErrorEvent, PhaseEvent, ProgressEvent, StateEvent, StatusEvent
+from speed_probe import format_duration
+
+FRAME_MS = 100
+SPARK_SAMPLES = 60
+COLUMNS = ("Drive", "State", "Phase", "%", "MB/s", "ETA", "Errors", "Throughput")
+SPARK_COLUMN = COLUMNS.index("Throughput")
+
+
+class JobRow:
+    __slots__ = ("job_id", "target", "state", "phase", "percent", "mbps", "eta_s", "errors",
+                 "last_error", "spark")
+
+    def __init__(self, job_id, target=""):
+        self.job_id = job_id
+        self.target = target
+        self.state = "queued"
+        self.phase = ""
+        self.percent = 0
+        self.mbps = None
+        self.eta_s = None
+        self.errors = 0
+        self.last_error = ""
+        self.spark = collections.deque(maxlen=SPARK_SAMPLES)
+
+
+class JobFeed:
+    """EventStream subscriber that coalesces events into per-job rows"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rows = {}
+        self._dirty = set()
+
+    def add_job(self, job_id, target):
+        with self._lock:
+            self.rows.setdefault(job_id, JobRow(job_id, target)).target = target
+            self._dirty.add(job_id)
+
+    def __call__(self, event):
+        with self._lock:
+            row = self.rows.get(event.job_id)
+            if row is None:
+                row = self.rows[event.job_id] = JobRow(event.job_id, event.job_id)
+            if isinstance(event, ProgressEvent):
+                row.phase = event.phase
+                row.percent = event.percent
+                if event.mbps is not None:
+                    row.mbps = event.mbps
+                    row.eta_s = event.eta_s
+                    row.spark.append(event.mbps)
+            elif isinstance(event, PhaseEvent):
+                row.phase = event.phase
+                row.mbps = row.eta_s = None
+            elif isinstance(event, StatusEvent):
+                row.phase = event.phase or row.phase
+            elif isinstance(event, ErrorEvent):
+                row.errors += 1
+                row.last_error = event.message
+            elif isinstance(event, StateEvent):
+                row.state = event.state
+                if event.state == "done":
+                    row.percent = 100
+                    row.eta_s = None
+            else:
+                return
+            self._dirty.add(event.job_id)
+
+    def take_changes(self):
+        """Snapshots of rows changed since the last call (UI thread)"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            return [self._snapshot(self.rows[j]) for j in dirty if j in self.rows]
+
+    @staticmethod
+    def _snapshot(row):
+        copy = JobRow(row.job_id, row.target)
+        for name in JobRow.__slots__[2:-1]:
+            setattr(copy, name, getattr(row, name))
+        copy.spark = tuple(row.spark)
+        return copy
+
+
+class JobTableModel(QtCore.QAbstractTableModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._index = {}        # job_id -> row number
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
+            return COLUMNS[section]
+        return None
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        col = index.column()
+        if role == QtCore.Qt.DisplayRole:
+            if col == 0:
+                return row.target
+            if col == 1:
+                return row.state
+            if col == 2:
+                return row.phase
+            if col == 3:
+                return f"{row.percent}%"
+            if col == 4:
+                return f"{row.mbps:.1f}" if row.mbps is not None else "-"
+            if col == 5:
+                return format_duration(row.eta_s) if row.eta_s is not None else "-"
+            if col == 6:
+                return str(row.errors) if row.errors else ""
+            return None
+        if role == QtCore.Qt.UserRole and col == SPARK_COLUMN:
+            return row.spark
+        if role == QtCore.Qt.ToolTipRole and col == 6 and row.last_error:
+            return row.last_error
+        if role == QtCore.Qt.ForegroundRole and (row.errors or row.state == "failed"):
+            return QtGui.QBrush(QtGui.QColor("#ff6666"))
+        if role == QtCore.Qt.TextAlignmentRole and col in (3, 4, 5, 6):
+            return int(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
+        return None
+
+    def apply(self, changes):
+        """Merge row snapshots: new jobs are inserted, known ones repainted"""
+        new = [r for r in changes if r.job_id not in self._index]
+        if new:
+            first = len(self._rows)
+            self.beginInsertRows(QtCore.QModelIndex(), first, first + len(new) - 1)
+            for r in new:
+                self._index[r.job_id] = len(self._rows)
+                self._rows.append(r)
+            self.endInsertRows()
+        last_col = len(COLUMNS) - 1
+        for r in changes:
+            i = self._index[r.job_id]
+            if self._rows[i] is not r:
+                self._rows[i] = r
+                self.dataChanged.emit(self.index(i, 0), self.index(i, last_col))
+
+
+class SparklineDelegate(QtWidgets.QStyledItemDelegate):
+    """Draws a row's recent MB/s samples as a small line"""
+
+    def paint(self, painter, option, index):
+        samples = index.data(QtCore.Qt.UserRole)
+        if not samples or len(samples) < 2:
+            return super().paint(painter, option, index)
+        rect = option.rect.adjusted(3, 3, -3, -3)
+        top = max(samples) or 1.0
+        step = rect.width() / (SPARK_SAMPLES - 1)
+        x0 = rect.right() - step * (len(samples) - 1)
+        points = [QtCore.QPointF(x0 + i * step, rect.bottom() - rect.height() * (v / top))
+                  for i, v in enumerate(samples)]
+        painter.save()
+        painter.setPen(QtGui.QColor("#4CAF50"))   # cosmetic 1px pen, no antialiasing: cheapest to draw
+        painter.drawPolyline(QtGui.QPolygonF(points))
+        painter.restore()
+
+
+class JobTable(QtWidgets.QTableView):
+    """Table of all jobs fed by a JobFeed, refreshed at a fixed frame rate"""
+
+    def __init__(self, feed=None, frame_ms=FRAME_MS, parent=None):
+        super().__init__(parent)
+        self.feed = feed or JobFeed()
+        self.model_ = JobTableModel(self)
+        self.setModel(self.model_)
+        self.setItemDelegateForColumn(SPARK_COLUMN, SparklineDelegate(self))
+        self.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.verticalHeader().setVisible(False)
+        self.verticalHeader().setDefaultSectionSize(22)
+        header = self.horizontalHeader()
+        header.setSectionResizeMode(0, QtWidgets.QHeaderView.Stretch)
+        header.resizeSection(SPARK_COLUMN, 140)
+        self.frame_seconds = 0.0     # UI time spent in the last refresh
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(frame_ms)
+        self._timer.timeout.connect(self.refresh)
+        self._timer.start()
+
+    def refresh(self):
+        start = time.perf_counter()
+        changes = self.feed.take_changes()
+        if changes:
+            self.model_.apply(changes)
+        self.frame_seconds = time.perf_counter() - start
+
+    def stop(self):
+        self._timer.stop()
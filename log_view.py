@@ -0,0 +1,136 @@
+"""
+log_view.py
+Bounded, batched activity log for Code Monk — Secure Formatter
+
+Status lines can arrive from any thread at any rate (diskpart output, many
+jobs at once). LogBuffer collects them under a lock and keeps only the most
+recent lines in memory; lines that fall out of the ring are spilled to a
+history file by a background writer. LogView drains the buffer once per
+frame into a QPlainTextEdit capped with maximumBlockCount, so the UI thread
+does one append per frame no matter how many lines came in.
+"""
+import collections
+import queue
+import threading
+from PyQt5 import QtCore, QtWidgets
+
+DEFAULT_CAPACITY = 2000         # lines kept in memory and in the view
+DEFAULT_FRAME_MS = 50           # view refresh interval
+
+
+class SpillWriter:
+    """Appends lines to a history file from a background thread"""
+
+    def __init__(self, path):
+        self.path = path
+        self.queue = queue.Queue()
+        self.written = 0
+        self._thread = threading.Thread(target=self._run, name="log-spill", daemon=True)
+        self._thread.start()
+
+    def write(self, lines):
+        if lines:
+            self.queue.put(lines)
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                batch = self.queue.get()
+                stop = batch is None
+                lines = [] if stop else list(batch)
+                # Take whatever else is waiting so a burst becomes one write
+                while not stop:
+                    try:
+                        more = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if more is None:
+                        stop = True
+                    else:
+                        lines.extend(more)
+                if lines:
+                    f.write("\n".join(lines) + "\n")
+                    f.flush()
+                    self.written += len(lines)
+                if stop:
+                    return
+
+    def close(self):
+        self.queue.put(None)
+        self._thread.join()
+
+
+class LogBuffer:
+    """Thread-safe ring of recent log lines plus the lines not yet shown"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, spill=None):
+        self.capacity = capacity
+        self.spill = spill            # SpillWriter, or None to drop old lines
+        self._lock = threading.Lock()
+        self._ring = collections.deque()
+        self._pending = []
+        self.dropped = 0              # lines that never reached the view (burst larger than capacity)
+
+    def append(self, line):
+        with self._lock:
+            self._ring.append(line)
+            self._pending.append(line)
+            if len(self._ring) > self.capacity:
+                evicted = self._ring.popleft()
+                if self.spill is not None:
+                    self.spill.write((evicted,))
+
+    def drain(self):
+        """Lines since the last drain, at most `capacity` of them (the newest)"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if len(pending) > self.capacity:
+            self.dropped += len(pending) - self.capacity
+            pending = pending[-self.capacity:]
+        return pending
+
+    def lines(self):
+        with self._lock:
+            return list(self._ring)
+
+
+class LogView(QtWidgets.QPlainTextEdit):
+    """Read-only log widget fed from a LogBuffer at a fixed frame rate.
+
+    append() may be called from any thread; the widget itself is only touched
+    by the timer on the UI thread.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, frame_ms=DEFAULT_FRAME_MS, spill_path=None, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
+        self.setMaximumBlockCount(capacity)
+        self.buffer = LogBuffer(capacity, SpillWriter(spill_path) if spill_path else None)
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(frame_ms)
+        self._timer.timeout.connect(self.flush)
+        self._timer.start()
+
+    def append(self, text):
+        self.buffer.append(str(text))
+
+    def flush(self):
+        lines = self.buffer.drain()
+        if not lines:
+            return
+        bar = self.verticalScrollBar()
+        follow = bar.value() >= bar.maximum() - 4
+        self.appendPlainText("\n".join(lines))
+        if follow:
+            bar.setValue(bar.maximum())
+
+    def stop(self):
+        """Show what is left and close the history file"""
+        self._timer.stop()
+        self.flush()
+        if self.buffer.spill is not None:
+            # Lines still in the ring are history too
+            self.buffer.spill.write(self.buffer.lines())
+            self.buffer.spill.close()
+            self.buffer.spill = None
@@ -3,6 +3,7 @@ main.py
 Entry point for Code Monk — Secure Formatter
 """
 import sys
+import multiprocessing
 from PyQt5 import QtWidgets
 from gui import MainWindow
 
@@ -13,4 +14,5 @@ def main():
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # certificate render pool in the frozen executable
     main()
@@ -0,0 +1,303 @@
+"""
+progress_events.py
+Structured, throttled progress events for Code Monk — Secure Formatter
+
+Wipe jobs publish typed events (job, progress, phase, status, error,
+verification, summary, state) into an EventStream. Progress is coalesced per job and emitted at most
+once per `min_interval`, so the total event rate stays bounded by the number of
+jobs no matter how fast the disks are. Subscribers receive events as Python
+objects; NDJSONWriter turns them into one JSON object per line on a pipe or file.
+
+Once the stream is started, publishing only queues the event: subscribers are
+called from the stream's delivery thread, so a slow pipe or file never holds
+up a wipe. `direct` subscribers are the exception, for in-memory bookkeeping
+that must see events as they happen and never blocks. When delivery falls far
+behind, only the high-rate events (progress, phase, status) are dropped and
+counted; a job's start, errors, verification, summary and state always go out.
+"""
+import json
+import queue
+import sys
+import threading
+import time
+from dataclasses import dataclass, field, asdict
+
+DEFAULT_MIN_INTERVAL = 0.25      # seconds between progress events of one job
+TERMINAL_STATES = ("done", "failed", "cancelled")
+DELIVERY_QUEUE = 10000           # events waiting for the delivery thread before high-rate ones are dropped
+_STOP = object()
+
+
+@dataclass
+class JobEvent:
+    """A job starting: what it wipes and how"""
+    job_id: str
+    target: str
+    device: str = None
+    model: str = None
+    serial: str = None
+    size_bytes: int = None
+    passes: int = None
+    time: float = field(default_factory=time.time)
+    type = "job"
+
+
+@dataclass
+class ProgressEvent:
+    job_id: str
+    phase: str
+    percent: int
+    bytes_done: int = None
+    bytes_total: int = None
+    mbps: float = None
+    eta_s: float = None
+    time: float = field(default_factory=time.time)
+    type = "progress"
+
+
+@dataclass
+class PhaseEvent:
+    job_id: str
+    phase: str
+    time: float = field(default_factory=time.time)
+    type = "phase"
+
+
+@dataclass
+class StatusEvent:
+    job_id: str
+    phase: str
+    message: str
+    time: float = field(default_factory=time.time)
+    type = "status"
+
+
+@dataclass
+class ErrorEvent:
+    job_id: str
+    phase: str
+    message: str
+    fatal: bool = False
+    time: float = field(default_factory=time.time)
+    type = "error"
+
+
+@dataclass
+class VerificationEvent:
+    job_id: str
+    passed: bool
+    method: str
+    digest: str = None
+    detail: str = ""
+    time: float = field(default_factory=time.time)
+    type = "verification"
+
+
+@dataclass
+class CertificateEvent:
+    job_id: str
+    path: str = None
+    error: str = None
+    time: float = field(default_factory=time.time)
+    type = "certificate"
+
+
+@dataclass
+class SummaryEvent:
+    """What a job actually did, sent just before its final state"""
+    job_id: str
+    method: str = None
+    phases: dict = None
+    metrics: dict = None
+    time: float = field(default_factory=time.time)
+    type = "summary"
+
+
+@dataclass
+class StateEvent:
+    job_id: str
+    state: str
+    result: str = None
+    time: float = field(default_factory=time.time)
+    type = "state"
+
+
+# May be dropped when delivery falls behind: the next one supersedes them
+DROPPABLE = (ProgressEvent, PhaseEvent, StatusEvent)
+
+
+def event_to_dict(event):
+    d = asdict(event)
+    d["type"] = event.type
+    return d
+
+
+class ProgressTracker:
+    """Turns raw byte counts into MB/s (smoothed) and ETA for one job"""
+
+    def __init__(self, bytes_total=None, smoothing=0.3, clock=time.monotonic):
+        self.bytes_total = bytes_total
+        self.smoothing = smoothing
+        self.clock = clock
+        self._last_t = None
+        self._last_bytes = 0
+        self.mbps = None
+
+    def update(self, bytes_done):
+        now = self.clock()
+        if self._last_t is not None and now > self._last_t:
+            rate = (bytes_done - self._last_bytes) / (now - self._last_t) / (1024 * 1024)
+            self.mbps = rate if self.mbps is None else self.smoothing * rate + (1 - self.smoothing) * self.mbps
+        self._last_t = now
+        self._last_bytes = bytes_done
+        return self.mbps, self.eta(bytes_done)
+
+    def eta(self, bytes_done):
+        if not self.bytes_total or not self.mbps or self.mbps <= 0:
+            return None
+        return max(0.0, (self.bytes_total - bytes_done) / (self.mbps * 1024 * 1024))
+
+
+class EventStream:
+    """Thread-safe fan-out of job events with per-job progress coalescing"""
+
+    def __init__(self, min_interval=DEFAULT_MIN_INTERVAL, clock=time.monotonic, queue_size=DELIVERY_QUEUE):
+        self.min_interval = min_interval
+        self.clock = clock
+        self._lock = threading.RLock()
+        self._subscribers = []
+        self._direct = []        # called on the publishing thread
+        self._pending = {}       # job_id -> latest unsent ProgressEvent
+        self._last_emit = {}     # job_id -> clock() of last sent ProgressEvent
+        # Unbounded: the limit applies to DROPPABLE events only, so nothing else is ever lost
+        self._queue = queue.Queue()
+        self.queue_size = queue_size
+        self._flusher = None
+        self.dropped = 0         # DROPPABLE events discarded because the queue was full
+
+    @property
+    def backlog(self):
+        """Events not delivered yet: coalesced progress plus the delivery queue"""
+        return len(self._pending) + self._queue.qsize()
+
+    def subscribe(self, callback, direct=False):
+        """`direct` callbacks run on the publishing thread and must never block"""
+        with self._lock:
+            (self._direct if direct else self._subscribers).append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            for subscribers in (self._direct, self._subscribers):
+                if callback in subscribers:
+                    subscribers.remove(callback)
+
+    def publish(self, event):
+        with self._lock:
+            job_id = event.job_id
+            if isinstance(event, ProgressEvent):
+                last = self._last_emit.get(job_id)
+                if last is not None and self.clock() - last < self.min_interval:
+                    self._pending[job_id] = event
+                    return
+                self._pending.pop(job_id, None)
+                self._last_emit[job_id] = self.clock()
+                self._dispatch(event)
+                return
+            # Anything else goes out at once, after the progress it follows
+            pending = self._pending.pop(job_id, None)
+            if pending is not None:
+                self._dispatch(pending)
+            self._dispatch(event)
+            if isinstance(event, StateEvent) and event.state in TERMINAL_STATES:
+                self._last_emit.pop(job_id, None)
+
+    def flush(self, force=False):
+        """Send coalesced progress whose interval has elapsed (or all of it)"""
+        with self._lock:
+            now = self.clock()
+            for job_id in list(self._pending):
+                if force or now - self._last_emit.get(job_id, 0) >= self.min_interval:
+                    event = self._pending.pop(job_id)
+                    self._last_emit[job_id] = now
+                    self._dispatch(event)
+
+    def start(self):
+        """Deliver events and flush pending progress in the background"""
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="event-flusher", daemon=True)
+            self._flusher.start()
+        return self
+
+    def stop(self):
+        if self._flusher is not None:
+            self._queue.put(_STOP)
+            self._flusher.join()
+            self._flusher = None
+        self.flush(force=True)
+
+    def _flush_loop(self):
+        wait = max(self.min_interval / 2, 0.01)
+        deadline = time.monotonic() + wait
+        while True:
+            try:
+                event = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                event = None
+            if event is _STOP:
+                return
+            if event is not None:
+                self._deliver(event)
+            if time.monotonic() >= deadline:
+                self.flush()
+                deadline = time.monotonic() + wait
+
+    def _dispatch(self, event):
+        for callback in list(self._direct):
+            self._call(callback, event)
+        if self._flusher is None:
+            self._deliver(event)
+            return
+        if isinstance(event, DROPPABLE) and self._queue.qsize() >= self.queue_size:
+            self.dropped += 1
+            return
+        self._queue.put(event)
+
+    def _deliver(self, event):
+        for callback in list(self._subscribers):
+            self._call(callback, event)
+
+    @staticmethod
+    def _call(callback, event):
+        try:
+            callback(event)
+        except Exception:
+            pass  # a broken consumer must never break the wipe
+
+
+class NDJSONWriter:
+    """EventStream subscriber writing one JSON object per line"""
+
+    def __init__(self, target="-"):
+        if hasattr(target, "write"):
+            self.fp, self._owned = target, False
+        elif target == "-":
+            self.fp, self._owned = sys.stdout, False
+        else:
+            # Line buffered so a reader on the other end of a pipe sees events at once
+            self.fp, self._owned = open(target, "a", buffering=1, encoding="utf-8"), True
+        self.closed = False
+
+    def __call__(self, event):
+        if self.closed:
+            return
+        try:
+            self.fp.write(json.dumps(event_to_dict(event), separators=(",", ":")) + "\n")
+            self.fp.flush()
+        except (BrokenPipeError, ValueError, OSError):
+            self.closed = True
+
+    def close(self):
+        self.closed = True
+        if self._owned:
+            self.fp.close()
@@ -0,0 +1,417 @@
+"""
+quick_wipe.py
+Metadata-only quick wipe for Code Monk — Secure Formatter
+
+Finds the places where partition tables and filesystem or volume headers
+live and zeroes only those: the MBR (and extended boot records), primary
+and backup GPT, NTFS and exFAT boot sectors with their backups, FAT boot
+sectors and the FAT32 backup, every ext2/3/4 superblock copy, LUKS headers
+with their key slots, and BitLocker boot sectors with their metadata
+blocks. A signature scan then probes the disk start, every volume start
+found before the wipe and each MiB boundary near both ends of the disk, and
+lists anything still recognisable.
+
+It takes seconds whatever the disk size, but file data is left in place:
+it is for reprovisioning drives, not for sanitizing them (apart from LUKS
+and BitLocker volumes, whose data cannot be decrypted once the key slots
+and metadata are gone).
+
+    python quick_wipe.py disk.img --confirm ERASE
+    python quick_wipe.py disk.img --scan-only
+"""
+import argparse
+import json
+import struct
+import sys
+import time
+from dataclasses import dataclass, field
+
+SECTOR_SIZE = 512
+GPT_ENTRY_SECTORS = 32          # 128 entries of 128 bytes
+SCAN_SPAN = 64 * 1024 * 1024    # MiB boundaries probed at each end of the disk
+SCAN_STEP = 1024 * 1024
+PROBE_BYTES = 4096
+LUKS2_DEFAULT_DATA = 16 * 1024 * 1024
+BITLOCKER_METADATA = 64 * 1024
+EXTENDED_TYPES = (0x05, 0x0F, 0x85)
+
+
+@dataclass
+class Region:
+    offset: int
+    length: int
+    what: str
+
+
+@dataclass
+class QuickWipeReport:
+    target: str
+    size_bytes: int
+    found: list = field(default_factory=list)      # [offset, signature] before the wipe
+    regions: list = field(default_factory=list)    # Regions zeroed
+    failed: list = field(default_factory=list)     # [offset, length, error]
+    remaining: list = field(default_factory=list)  # [offset, signature] the scan still recognised
+    bytes_written: int = 0
+    seconds: float = 0.0
+    scan_seconds: float = 0.0
+    probes: int = 0
+
+    @property
+    def clean(self):
+        return not self.failed and not self.remaining
+
+    def metrics(self):
+        """Plain dict for certificates and job records"""
+        return {
+            "mode": "metadata",
+            "signatures_found": [f"{what} @ {offset}" for offset, what in self.found],
+            "regions": len(self.regions),
+            "bytes_written": self.bytes_written,
+            "failed_regions": len(self.failed),
+            "remaining_signatures": [f"{what} @ {offset}" for offset, what in self.remaining],
+            "scan_probes": self.probes,
+            "seconds": round(self.seconds, 3),
+            "scan_seconds": round(self.scan_seconds, 3),
+        }
+
+
+def _u16(b, o):
+    return struct.unpack_from("<H", b, o)[0]
+
+
+def _u32(b, o):
+    return struct.unpack_from("<I", b, o)[0]
+
+
+def _u64(b, o):
+    return struct.unpack_from("<Q", b, o)[0]
+
+
+class _Reader:
+    """Sector-aligned reads (raw devices refuse anything else) of arbitrary byte ranges"""
+
+    def __init__(self, target, sector_size):
+        self.target = target
+        self.sector_size = sector_size
+        self.size = target.size_bytes
+        self.reads = 0
+
+    def __call__(self, offset, length):
+        if offset < 0 or offset >= self.size:
+            return b""
+        start = offset // self.sector_size * self.sector_size
+        end = min(self.size, -(-(offset + length) // self.sector_size) * self.sector_size)
+        self.reads += 1
+        try:
+            data = self.target.read_at(start, end - start)
+        except OSError:
+            return b""
+        return data[offset - start:offset - start + length]
+
+
+# --- volume headers: each returns (signature, [Region]) or None ---
+
+def _ntfs(read, start, end, boot):
+    if boot[3:11] != b"NTFS    ":
+        return None
+    bps = _u16(boot, 11) or SECTOR_SIZE
+    regions = [Region(start, 16 * bps, "NTFS boot sectors")]
+    backup = start + _u64(boot, 0x28) * bps
+    if start < backup < end:
+        regions.append(Region(backup, bps, "NTFS backup boot sector"))
+    return "ntfs", regions
+
+
+def _exfat(read, start, end, boot):
+    if boot[3:11] != b"EXFAT   ":
+        return None
+    bps = 1 << (boot[108] or 9)
+    # Main and backup boot regions are 12 sectors each
+    return "exfat", [Region(start, 24 * bps, "exFAT boot regions")]
+
+
+def _bitlocker(read, start, end, boot):
+    if boot[3:11] != b"-FVE-FS-":
+        return None
+    regions = [Region(start, 16 * SECTOR_SIZE, "BitLocker boot sectors")]
+    for at in (0xB0, 0xB8, 0xC0):
+        offset = _u64(boot, at)
+        if offset and start + offset < end:
+            regions.append(Region(start + offset, BITLOCKER_METADATA, "BitLocker metadata block"))
+    return "bitlocker", regions
+
+
+def _fat(read, start, end, boot):
+    if boot[510:512] != b"\x55\xaa" or boot[0] not in (0xEB, 0xE9):
+        return None
+    bps = _u16(boot, 11)
+    if bps not in (512, 1024, 2048, 4096) or not boot[13] or not _u16(boot, 14):
+        return None
+    if boot[0x52:0x57] == b"FAT32":
+        backup = _u16(boot, 0x32)
+        sectors = backup + 2 if 0 < backup < 32 else 2      # boot, FSInfo and their backups
+        return "fat32", [Region(start, sectors * bps, "FAT32 boot sector, FSInfo and backups")]
+    if boot[0x36:0x39] == b"FAT":
+        return "fat", [Region(start, bps, "FAT boot sector")]
+    return None
+
+
+def _ext(read, start, end, boot):
+    sb = read(start + 1024, 1024)
+    if len(sb) < 1024 or _u16(sb, 56) != 0xEF53:
+        return None
+    block = 1024 << min(_u32(sb, 24), 6)
+    blocks = _u32(sb, 4)
+    if _u32(sb, 0x60) & 0x80:                    # 64bit
+        blocks |= _u32(sb, 0x150) << 32
+    first, per_group = _u32(sb, 20), _u32(sb, 32) or 1
+    groups = -(-(blocks - first) // per_group)
+    if _u32(sb, 0x5C) & 0x200:                   # sparse_super2: at most two backups
+        backups = [g for g in (_u32(sb, 0x24C), _u32(sb, 0x250)) if 0 < g < groups]
+    elif _u32(sb, 0x64) & 0x1:                   # sparse_super: groups 1 and powers of 3, 5, 7
+        backups = {1} if groups > 1 else set()
+        for base in (3, 5, 7):
+            g = base
+            while g < groups:
+                backups.add(g)
+                g *= base
+        backups = sorted(backups)
+    else:
+        backups = list(range(1, groups))
+    regions = [Region(start, max(2048, block), "ext superblock")]
+    for g in backups:
+        offset = start + (first + g * per_group) * block
+        if offset < end:
+            regions.append(Region(offset, block, f"ext backup superblock (group {g})"))
+    return "ext", regions
+
+
+def _luks(read, start, end, boot):
+    if boot[:6] != b"LUKS\xba\xbe":
+        return None
+    version = struct.unpack_from(">H", boot, 6)[0]
+    if version == 1:
+        # Header plus every key slot: everything before the encrypted payload
+        payload = struct.unpack_from(">I", boot, 0x68)[0] * SECTOR_SIZE
+        return "luks1", [Region(start, payload or 2 * 1024 * 1024, "LUKS1 header and key slots")]
+    hdr_size = struct.unpack_from(">Q", boot, 8)[0]
+    data = LUKS2_DEFAULT_DATA
+    try:
+        raw = read(start + 4096, hdr_size - 4096).split(b"\0", 1)[0]
+        data = min(int(s["offset"]) for s in json.loads(raw)["segments"].values())
+    except (ValueError, KeyError, TypeError):
+        pass
+    return "luks2", [Region(start, max(data, 2 * hdr_size), "LUKS2 headers and key slots")]
+
+
+VOLUME_PROBES = (_ntfs, _exfat, _bitlocker, _luks, _fat, _ext)
+
+
+def probe_volume(read, start, end):
+    """[(signature, [Region])] for the volume headers found at `start`"""
+    boot = read(start, PROBE_BYTES)
+    if len(boot) < 1024:
+        return []
+    return [hit for hit in (p(read, start, end, boot) for p in VOLUME_PROBES) if hit is not None]
+
+
+# --- partition tables ---
+
+def _mbr_entries(sector):
+    for i in range(4):
+        e = sector[446 + 16 * i:462 + 16 * i]
+        if e[4] and e[0] in (0x00, 0x80) and _u32(e, 12):
+            yield e[4], _u32(e, 8), _u32(e, 12)
+
+
+def _mbr(read, size, sector_size):
+    """(signatures, regions, volumes) of an MBR and its chain of extended boot records"""
+    boot = read(0, SECTOR_SIZE)
+    if len(boot) < SECTOR_SIZE or boot[510:512] != b"\x55\xaa" or any(p(read, 0, size, read(0, PROBE_BYTES))
+                                                                      for p in (_ntfs, _exfat, _bitlocker, _fat)):
+        return [], [], []           # no table, or a boot sector of a partitionless volume
+    signatures, regions, volumes = [], [], []
+    for kind, first, count in _mbr_entries(boot):
+        if kind == 0xEE:
+            signatures.append([0, "protective mbr"])
+            continue
+        if kind not in EXTENDED_TYPES:
+            volumes.append((first * sector_size, (first + count) * sector_size))
+            continue
+        ebr, seen = first, set()
+        while ebr and ebr not in seen and ebr * sector_size < size:
+            seen.add(ebr)
+            sector = read(ebr * sector_size, SECTOR_SIZE)
+            if sector[510:512] != b"\x55\xaa":
+                break
+            signatures.append([ebr * sector_size, "ebr"])
+            regions.append(Region(ebr * sector_size, sector_size, "extended boot record"))
+            following = None
+            for i, (k, rel, n) in enumerate(_mbr_entries(sector)):
+                if k in EXTENDED_TYPES:
+                    following = first + rel
+                elif i == 0:
+                    volumes.append(((ebr + rel) * sector_size, (ebr + rel + n) * sector_size))
+            ebr = following
+    if volumes or regions:
+        signatures.insert(0, [0, "mbr"])
+    return signatures, regions, volumes
+
+
+def _gpt(read, size, sector_size):
+    """(signatures, regions, volumes) of the primary and backup GPT, whichever survive"""
+    signatures, regions, volumes = [], [], []
+    candidates = [(lba, sector_size) for lba in (1, size // sector_size - 1)]
+    if sector_size == 512:
+        candidates += [(1, 4096), (size // 4096 - 1, 4096)]          # 4Kn layout seen through 512-byte sectors
+    for lba, lba_size in candidates:
+        header = read(lba * lba_size, 92)
+        if header[:8] != b"EFI PART":
+            continue
+        entries_lba, count, entry_size = _u64(header, 72), _u32(header, 80), _u32(header, 84)
+        signatures.append([lba * lba_size, "gpt"])
+        regions.append(Region(lba * lba_size, lba_size, "GPT header"))
+        table = count * entry_size
+        if not 0 < table <= 4 * 1024 * 1024:
+            continue
+        regions.append(Region(entries_lba * lba_size, table, "GPT partition entries"))
+        entries = read(entries_lba * lba_size, table)
+        for i in range(0, len(entries) - entry_size + 1, entry_size):
+            e = entries[i:i + entry_size]
+            if e[:16].strip(b"\0"):
+                volumes.append((_u64(e, 32) * lba_size, (_u64(e, 40) + 1) * lba_size))
+    return signatures, regions, volumes
+
+
+def find_metadata(target, sector_size=None):
+    """(signatures, regions, volume starts) of everything that identifies the disk's layout"""
+    sector_size = sector_size or getattr(target, "sector_size", SECTOR_SIZE)
+    read = _Reader(target, sector_size)
+    size = target.size_bytes
+    # The table areas are wiped whatever is found: a damaged table is still a table
+    regions = [Region(0, (2 + GPT_ENTRY_SECTORS) * sector_size, "MBR and primary GPT area"),
+               Region(size - (1 + GPT_ENTRY_SECTORS) * sector_size, (1 + GPT_ENTRY_SECTORS) * sector_size,
+                      "backup GPT area")]
+    signatures, volumes = [], set()
+    for table in (_mbr, _gpt):
+        sigs, regs, vols = table(read, size, sector_size)
+        signatures += sigs
+        regions += regs
+        volumes.update(vols)
+    volumes.add((0, size))              # a partitionless (superfloppy) volume or whole-disk LUKS
+    for start, end in sorted(volumes):
+        for signature, regs in probe_volume(read, start, min(end, size)):
+            signatures.append([start, signature])
+            regions += regs
+    return signatures, _merge(regions, size, sector_size), sorted({start for start, _ in volumes})
+
+
+def _merge(regions, size, sector_size):
+    """Clip to the disk, align out to whole sectors and merge overlapping regions"""
+    spans = []
+    for r in regions:
+        start = max(0, r.offset) // sector_size * sector_size
+        end = min(size, -(-(r.offset + r.length) // sector_size) * sector_size)
+        if end > start:
+            spans.append([start, end, r.what])
+    spans.sort()
+    merged = []
+    for start, end, what in spans:
+        if merged and start <= merged[-1].offset + merged[-1].length:
+            last = merged[-1]
+            last.length = max(last.length, end - last.offset)
+            if what not in last.what:
+                last.what += f", {what}"
+        else:
+            merged.append(Region(start, end - start, what))
+    return merged
+
+
+def scan_signatures(target, starts=(), sector_size=None):
+    """([offset, signature] still recognisable, probes made): tables, known starts and MiB boundaries"""
+    sector_size = sector_size or getattr(target, "sector_size", SECTOR_SIZE)
+    read = _Reader(target, sector_size)
+    size = target.size_bytes
+    found = []
+    for table in (_mbr, _gpt):
+        found += table(read, size, sector_size)[0]
+    offsets = set(starts) | {0}
+    offsets.update(range(0, min(size, SCAN_SPAN), SCAN_STEP))
+    offsets.update(range(max(0, size - SCAN_SPAN) // SCAN_STEP * SCAN_STEP, size, SCAN_STEP))
+    for start in sorted(offsets):
+        found += [[start, signature] for signature, _ in probe_volume(read, start, size)]
+    return found, read.reads
+
+
+class QuickWiper:
+    """Zero the metadata regions of `target`, then scan for leftover signatures"""
+
+    def __init__(self, target, should_stop=None, on_progress=None):
+        self.target = target
+        self.should_stop = should_stop
+        self.on_progress = on_progress
+        self.sector_size = getattr(target, "sector_size", SECTOR_SIZE)
+        self.report = QuickWipeReport(getattr(target, "path", str(target)), target.size_bytes)
+
+    def run(self):
+        start = time.perf_counter()
+        found, regions, starts = find_metadata(self.target, self.sector_size)
+        self.report.found = found
+        self.report.regions = regions
+        total = sum(r.length for r in regions) or 1
+        for r in regions:
+            if self.should_stop and self.should_stop():
+                break
+            try:
+                self.target.write_at(r.offset, bytes(r.length))
+                self.report.bytes_written += r.length
+            except OSError as e:
+                self.report.failed.append([r.offset, r.length, str(e)])
+            if self.on_progress:
+                self.on_progress(self.report.bytes_written, total)
+        try:
+            self.target.flush()
+        except OSError as e:
+            self.report.failed.append([0, 0, f"flush: {e}"])
+        scan = time.perf_counter()
+        self.report.remaining, self.report.probes = scan_signatures(self.target, starts, self.sector_size)
+        self.report.scan_seconds = time.perf_counter() - scan
+        self.report.seconds = time.perf_counter() - start
+        return self.report
+
+
+def main(argv=None):
+    from wipe_engine import FileTarget
+
+    parser = argparse.ArgumentParser(description="Zero partition tables and filesystem signatures only")
+    parser.add_argument("target", help="image file or raw device")
+    parser.add_argument("--scan-only", action="store_true", help="list what would be wiped, write nothing")
+    parser.add_argument("--confirm", default="", help="must be ERASE (unless --scan-only)")
+    args = parser.parse_args(argv)
+    if not args.scan_only and args.confirm.upper() != "ERASE":
+        parser.error("this destroys every partition table and filesystem on the target - pass --confirm ERASE")
+
+    # A scan must work on a device nobody may write to, and must not be able to
+    with FileTarget(args.target, readonly=args.scan_only) as target:
+        if args.scan_only:
+            found, regions, _ = find_metadata(target)
+            for offset, signature in found:
+                print(f"{signature:<14} @ {offset}")
+            for r in regions:
+                print(f"  would zero {r.length:>9} bytes @ {r.offset:<14} {r.what}")
+            return 0
+        report = QuickWiper(target).run()
+    for offset, signature in report.found:
+        print(f"found {signature:<14} @ {offset}")
+    print(f"{len(report.regions)} regions, {report.bytes_written} bytes zeroed in {report.seconds:.2f}s "
+          f"(scan {report.scan_seconds:.2f}s, {report.probes} probes)")
+    for offset, length, error in report.failed:
+        print(f"FAILED {length} bytes @ {offset}: {error}")
+    for offset, signature in report.remaining:
+        print(f"STILL RECOGNISABLE {signature} @ {offset}")
+    print("clean" if report.clean else "NOT clean")
+    return 0 if report.clean else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
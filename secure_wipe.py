@@ -10,7 +10,14 @@ import time
 import datetime
 import string
 from PyQt5 import QtCore
-from certificate import generate_certificate
+from certificate import generate_certificate, station_certificate_dir
+from drive_utils import as_record, find_disk_volume
+from job_profiler import JobProfiler, bundle_path
+from progress_events import (JobEvent, ProgressEvent, PhaseEvent, StatusEvent, ErrorEvent, StateEvent,
+                             CertificateEvent, SummaryEvent, VerificationEvent, ProgressTracker)
+from quick_wipe import QuickWiper
+from wipe_engine import FileTarget, MmapOverwriteEngine, OverwriteEngine
+from wipe_patterns import describe, get_standard, standard_for_passes
 
 def find_drive_letter_by_label(label="WIPED_DRIVE"):
     """Find drive letter by volume label"""
@@ -68,23 +75,285 @@ def refresh_explorer():
 class WipeWorker(QtCore.QObject):
     progress = QtCore.pyqtSignal(int)            # 0-100
     status = QtCore.pyqtSignal(str)
-    finished = QtCore.pyqtSignal(str)            # certificate path or error
+    finished = QtCore.pyqtSignal(str)            # certificate path (or queued record) or error
+    certificate = QtCore.pyqtSignal(str)         # certificate path or error, when generated by a CertificateQueue
 
-    def __init__(self, entry, level_passes=3, do_real=True):
+    def __init__(self, entry, level_passes=3, do_real=True, job_id=None, events=None, renderer=None,
+                 certificates=None, instruments=None, profile=None, standard=None, extent_size=None,
+                 start_offset=0, quick=False, mmap=False):
         super().__init__()
-        self.entry = entry
-        self.passes = level_passes
+        self.entry = as_record(entry)
+        # A wipe_patterns standard key; the old pass count picks the matching one
+        self.standard = get_standard(standard) if standard else standard_for_passes(level_passes)
+        self.passes = self.standard.pass_count
+        self.extent_size = extent_size   # bytes; set for extent-major order
+        self.start_offset = start_offset # checkpoint of an interrupted extent-major wipe to resume from
+        self.quick = quick       # metadata-only: zero partition tables and signatures, leave data blocks
+        self.mmap = mmap         # write through a memory map (image files only)
         self.do_real = do_real   # if False, only simulate
         self._stop = False
         self.errors = []
+        self.job_id = job_id or self.entry.id or self.entry.device
+        self.phase = "queued"
+        self.report = None       # wipe_engine.WipeReport once the overwrite has run
+        self.quick_report = None # quick_wipe.QuickWipeReport once a quick wipe has run
+        self.started = None
+        self.phase_times = {}    # phase -> wall seconds
+        self._phase_start = None
+        self.method = []         # steps that actually ran, in order - this is what the certificate states
+        self._last_percent = 0
+        self._tracker = None     # set while the overwrite engine reports byte-level progress
+        self.events = events     # optional progress_events.EventStream
+        self.renderer = renderer # optional certificate.CertificateRenderer shared by a batch
+        self.certificates = certificates  # optional certificate.CertificateQueue: finish without waiting for it
+        self.instruments = instruments    # optional instrumentation.Instruments: phase timers and I/O latency
+        self.profile = profile            # optional job_profiler.ProfileSettings: profile this job only
+        self.profile_dir = bundle_path(profile.directory, self.job_id) if profile is not None else None
+        if events is not None:
+            # Mirror the Qt signals as typed events; direct so no event loop is needed
+            self.status.connect(self._publish_status, QtCore.Qt.DirectConnection)
+            self.progress.connect(self._publish_progress, QtCore.Qt.DirectConnection)
+            self.finished.connect(self._publish_finished, QtCore.Qt.DirectConnection)
+            self.certificate.connect(self._publish_certificate, QtCore.Qt.DirectConnection)
 
     def stop(self):
         self._stop = True
 
+    def _set_phase(self, phase):
+        if phase != self.phase:
+            now = time.time()
+            self._close_phase(now)
+            self._phase_start = now
+            self.phase = phase
+            if self.events is not None:
+                self.events.publish(PhaseEvent(self.job_id, phase))
+
+    def _close_phase(self, now):
+        if self._phase_start is not None:
+            seconds = now - self._phase_start
+            self.phase_times[self.phase] = round(self.phase_times.get(self.phase, 0) + seconds, 3)
+            if self.instruments is not None:
+                self.instruments.add_phase(self.phase, seconds)
+
+    def _add_error(self, message):
+        self.errors.append(message)
+        if self.events is not None:
+            self.events.publish(ErrorEvent(self.job_id, self.phase, message))
+
+    def _publish_status(self, message):
+        self.events.publish(StatusEvent(self.job_id, self.phase, message))
+
+    def _publish_progress(self, percent):
+        if self._tracker is None:   # the overwrite publishes its own byte-level events
+            self.events.publish(ProgressEvent(self.job_id, self.phase, percent))
+
+    def _run_diskpart(self, idx, commands, timeout=600):
+        """Run a diskpart script against disk idx, reporting its output; True on success"""
+        script = f"select disk {idx}\n{commands}\nexit\n"
+        script_path = os.path.join(os.environ.get('TEMP', 'C:\\temp'), 'secure_wipe_script.txt')
+        try:
+            with open(script_path, "w") as f:
+                f.write(script)
+
+            self.status.emit(f"Running diskpart on disk {idx} (this may take a few minutes)...")
+            result = subprocess.run(["diskpart", "/s", script_path],
+                                   capture_output=True, text=True,
+                                   shell=True, timeout=timeout)
+
+            self.status.emit(f"Diskpart completed with return code: {result.returncode}")
+            if result.stdout:
+                stdout_lines = result.stdout.strip().split('\n')
+                for line in stdout_lines[-10:]:  # Show last 10 lines
+                    if line.strip():
+                        self.status.emit(f"Diskpart: {line.strip()}")
+            if result.stderr and result.stderr.strip():
+                self.status.emit(f"Diskpart warnings: {result.stderr.strip()}")
+
+            if result.returncode == 0:
+                self.status.emit("✅ Diskpart completed successfully")
+                return True
+            # Don't treat this as a fatal error - continue with other operations
+            self.status.emit(f"❌ Diskpart failed with code {result.returncode}")
+        except subprocess.TimeoutExpired:
+            self.status.emit(f"⚠️ Diskpart operation timed out after {timeout // 60} minutes")
+        except Exception as e:
+            self.status.emit(f"⚠️ Diskpart error: {e}")
+        finally:
+            try:
+                os.remove(script_path)
+            except Exception:
+                pass
+        return False
+
+    def _overwrite(self, advance):
+        """Overwrite the whole physical disk; unwritable sectors are skipped and reported"""
+        try:
+            target = FileTarget(self.entry.device, self.entry.size_bytes)
+        except OSError as e:
+            self._add_error(f"Cannot open {self.entry.device} for overwrite: {e}")
+            return
+        if not target.size_bytes:
+            target.close()
+            self._add_error(f"Unknown size for {self.entry.device} - cannot overwrite")
+            return
+        if target.stated_size and target.size_bytes != target.stated_size:
+            self.status.emit(f"Disk reports {target.size_bytes} bytes (inventory said {target.stated_size}) "
+                             f"- overwriting to the real end")
+        self._tracker = ProgressTracker(target.size_bytes * self.passes)
+
+        def on_progress(done, total):
+            advance(done / total)
+            if self.events is not None:
+                mbps, eta = self._tracker.update(done)
+                self.events.publish(ProgressEvent(self.job_id, self.phase, self._last_percent,
+                                                  done, total, mbps, eta))
+
+        patterns = self.standard.resolve()
+        engine_class = MmapOverwriteEngine if self.mmap else OverwriteEngine
+        try:
+            with target:
+                engine = engine_class(target, patterns=patterns, on_progress=on_progress,
+                                      should_stop=lambda: self._stop, verify=True,
+                                      instruments=self.instruments, extent_size=self.extent_size,
+                                      start_offset=self.start_offset)
+                self.report = engine.run()
+        except (ValueError, RuntimeError) as e:
+            # Engine refused the target or options (e.g. memory map on a disk or a sparse file)
+            self._add_error(f"Cannot start the overwrite: {e}")
+            return
+        except OSError as e:
+            self._add_error(f"Overwrite failed: {e}")
+            return
+        finally:
+            self._tracker = None
+        if self.report.cancelled:
+            if self.report.checkpoint:
+                self.status.emit(f"Every pass is written and verified below byte {self.report.checkpoint} "
+                                 f"- an extent-major wipe can resume there")
+            raise Exception("Operation cancelled")
+        metrics = self.report.metrics()
+        order = f", extent-major in {self.extent_size // (1024**2)} MB extents" if self.extent_size else ""
+        order += ", through a memory map" if self.mmap else ""
+        self.method.append(f"{self.standard.name} overwrite ({describe(patterns)}{order})")
+        self.status.emit(f"✅ Overwrite finished: {self.report.bytes_written // (1024**2)} MB written "
+                         f"in {self.report.seconds:.0f}s (avg {metrics['avg_mbps']} MB/s, min {metrics['min_mbps']} MB/s)")
+        self.method.append("SHA-256 read-back verify" + (" per extent" if self.extent_size else ""))
+        if self.events is not None:
+            self.events.publish(VerificationEvent(self.job_id, bool(self.report.verified), "sha256-readback",
+                                                  self.report.digest,
+                                                  f"{self.report.bytes_verified} bytes read back"))
+        if not self.report.verified:
+            self._add_error("Verification failed: data read back does not match what was written")
+        if self.report.bad_ranges:
+            self.status.emit(f"⚠️ {len(self.report.bad_ranges)} unwritable range(s), "
+                             f"{self.report.unwritable_bytes} bytes skipped - listed on the certificate")
+
+    def _quick_wipe(self, advance):
+        """Zero the partition tables and volume headers of the physical disk, then scan for leftovers"""
+        # Windows refuses raw writes into sectors of mounted volumes; offline the disk while writing
+        offline = self.entry.index is not None and self._run_diskpart(self.entry.index, "offline disk")
+        try:
+            with FileTarget(self.entry.device, self.entry.size_bytes) as target:
+                if not target.size_bytes:
+                    self._add_error(f"Unknown size for {self.entry.device} - cannot quick wipe")
+                    return
+                if target.stated_size and target.size_bytes != target.stated_size:
+                    # The backup GPT and trailing volume headers sit at the real end
+                    self.status.emit(f"Disk reports {target.size_bytes} bytes (inventory said {target.stated_size}) "
+                                     f"- looking for metadata up to the real end")
+                wiper = QuickWiper(target, should_stop=lambda: self._stop,
+                                   on_progress=lambda done, total: advance(done / total))
+                self.quick_report = wiper.run()
+        except OSError as e:
+            self._add_error(f"Quick wipe failed: {e}")
+            return
+        finally:
+            if offline:
+                self._run_diskpart(self.entry.index, "online disk")
+        if self._stop:
+            raise Exception("Operation cancelled")
+        report = self.quick_report
+        self.method.append("Metadata-only quick wipe (data blocks not overwritten)")
+        self.status.emit(f"✅ Quick wipe: {len(report.found)} signature(s) found, {len(report.regions)} region(s), "
+                         f"{report.bytes_written // 1024} KB zeroed in {report.seconds:.1f}s")
+        for offset, length, error in report.failed:
+            self._add_error(f"Could not zero {length} bytes at {offset}: {error}")
+        if report.remaining:
+            self.method.append(f"Signature scan: {len(report.remaining)} left")
+            self._add_error("Still recognisable after quick wipe: "
+                            + ", ".join(f"{what} @ {offset}" for offset, what in report.remaining))
+        else:
+            self.method.append("Signature scan clean")
+
+    def _publish_finished(self, result):
+        if str(result).startswith("ERROR"):
+            state = "cancelled" if self._stop else "failed"
+        else:
+            state = "done"
+        record = self.job_record()
+        self.events.publish(SummaryEvent(self.job_id, record["method"], record["phases"], record["metrics"]))
+        self.events.publish(StateEvent(self.job_id, state, str(result)))
+
+    def job_record(self):
+        """Identity, timings and what actually ran - for the certificate and its signed record"""
+        now = time.time()
+        phases = dict(self.phase_times)
+        if self._phase_start is not None:
+            phases[self.phase] = round(phases.get(self.phase, 0) + now - self._phase_start, 3)
+        report = self.quick_report if self.quick else self.report
+        return {"id": self.job_id, "standard": "Metadata-only quick wipe" if self.quick else self.standard.name,
+                "passes": 0 if self.quick else self.passes, "started": self.started, "finished": now,
+                "phases": phases, "method": " -> ".join(self.method) or None, "profile": self.profile_dir,
+                "metrics": report.metrics() if report is not None else None}
+
+    def _publish_certificate(self, result):
+        if str(result).startswith("ERROR"):
+            # The job has already finished; an error event still puts it on the job's record
+            self.events.publish(ErrorEvent(self.job_id, "certificate", str(result)))
+            self.events.publish(CertificateEvent(self.job_id, error=str(result)))
+        else:
+            self.events.publish(CertificateEvent(self.job_id, path=str(result)))
+
+    def _locate_wiped_volume(self):
+        """The new volume on this job's disk (by serial or disk index), None while missing or ambiguous"""
+        refresh_explorer()
+        return find_disk_volume(self.entry)
+
+    def _blank_after_wipe(self):
+        """A quick wipe of a whole disk is not re-partitioned: there is no volume to format or to hold the certificate"""
+        return self.quick and self.entry.kind in ("physical", "raw")
+
+    def _queue_certificate(self, job):
+        """Hand the certificate to the background queue and finish the job now"""
+        target_drive = self.entry.device if self.entry.kind == "logical" and ":" in self.entry.device else None
+        locate = self._locate_wiped_volume if self.entry.kind in ("physical", "raw") else None
+        fallback_dir = None
+        if self._blank_after_wipe():
+            locate, fallback_dir = None, station_certificate_dir()
+        # Finished goes out first so listeners see the job end before its certificate arrives
+        self.finished.emit(f"WIPED: {self.entry.label} - certificate queued")
+        self.certificates.submit(self.entry, self.report, job, target_drive, locate,
+                                 on_done=self.certificate.emit, on_status=self.status.emit,
+                                 fallback_dir=fallback_dir)
+
     def run(self):
+        if self.profile is None:
+            return self._run()
+        with JobProfiler(self.profile_dir, self.profile) as profiler:
+            self._run()
+        if profiler.error:
+            self.status.emit(f"⚠️ Profile incomplete ({profiler.error}): {self.profile_dir}")
+        else:
+            self.status.emit(f"📊 Profile written to {self.profile_dir}")
+
+    def _run(self):
+        self.started = time.time()
+        if self.events is not None:
+            e = self.entry
+            self.events.publish(JobEvent(self.job_id, e.label, e.device, e.model, e.serial, e.size_bytes, self.passes))
         try:
-            device = self.entry["device"]
-            display = self.entry.get("display", device)
+            device = self.entry.device
+            display = self.entry.label
             steps = [
                 ("Preparing target", 3),
                 ("Overwriting files with random data", 20),
@@ -97,25 +366,36 @@ class WipeWorker(QtCore.QObject):
             total = sum(weight for (_, weight) in steps)
             progress_acc = 0
 
-            def step_update(msg, weight):
+            def advance(fraction, weight):
+                """Progress inside a step driven by real I/O instead of a timer"""
+                value = int((progress_acc + weight * fraction) / total * 100)
+                if value != self._last_percent:
+                    self._last_percent = value
+                    self.progress.emit(value)
+
+            def step_update(msg, weight, phase=None):
                 nonlocal progress_acc
                 if self._stop:
                     raise Exception("Operation cancelled")
+                if phase:
+                    self._set_phase(phase)
                 self.status.emit(msg)
                 for i in range(weight):
                     progress_acc += 1
-                    self.progress.emit(int(progress_acc / total * 100))
+                    self._last_percent = int(progress_acc / total * 100)
+                    self.progress.emit(self._last_percent)
                     time.sleep(0.05)
 
-            step_update("Checking target accessibility...", steps[0][1])
+            step_update("Checking target accessibility...", steps[0][1], "prepare")
             accessible = os.path.exists(device) if not device.startswith("\\\\?\\") and ":" in device else True
 
             if not self.do_real:
-                step_update("Simulation: Overwriting files ...", steps[1][1])
-                step_update("Simulation: Deleting files ...", steps[2][1])
-                step_update("Simulation: Overwriting ...", steps[3][1])
-                step_update("Simulation: Creating junk archive ...", steps[4][1])
-                step_update("Simulation: Final format ...", steps[5][1])
+                step_update("Simulation: Overwriting files ...", steps[1][1], "overwrite")
+                step_update("Simulation: Deleting files ...", steps[2][1], "delete")
+                step_update("Simulation: Overwriting ...", steps[3][1], "wipe")
+                step_update("Simulation: Creating junk archive ...", steps[4][1], "junk")
+                step_update("Simulation: Final format ...", steps[5][1], "format")
+                self.method.append("Simulation only - no data written")
             else:
                 self.status.emit(f"REAL MODE: Starting destructive operations on {device}")
                 
@@ -125,97 +405,62 @@ class WipeWorker(QtCore.QObject):
                     is_admin = ctypes.windll.shell32.IsUserAnAdmin()
                     if not is_admin:
                         self.status.emit("WARNING: Not running as administrator - some operations may fail")
-                        self.errors.append("Not running as administrator")
+                        self._add_error("Not running as administrator")
                 except Exception:
                     pass
                 
                 # Skip file-level operations for protected drives - go straight to low-level format
-                step_update("Skipping file operations - using low-level format...", steps[1][1])
+                step_update("Skipping file operations - using low-level format...", steps[1][1], "overwrite")
                 self.status.emit("Protected/Live OS detected - using diskpart for complete drive wipe")
                     
                 # Skip file deletion - let diskpart handle everything
-                step_update("Preparing for complete drive wipe...", steps[2][1])
+                step_update("Preparing for complete drive wipe...", steps[2][1], "delete")
                 self.status.emit("Skipping individual file deletion - diskpart will wipe everything")
-                # Diskpart for physical/raw - Enhanced for protected drives
-                if self.entry["kind"] in ("physical", "raw"):
-                    step_update("Performing low-level disk wipe with diskpart...", steps[3][1])
-                    try:
-                        idx = self.entry.get("index")
-                        if idx is not None:
-                            # Enhanced diskpart script for protected/Live OS drives
-                            script = f"""select disk {idx}
-clean
-create partition primary
-active
-format fs=ntfs quick label="WIPED_DRIVE"
-assign
-exit
-"""
-                            script_path = os.path.join(os.environ.get('TEMP', 'C:\\temp'), 'secure_wipe_script.txt')
-                            with open(script_path, "w") as f:
-                                f.write(script)
-                            
-                            self.status.emit(f"Running diskpart on disk {idx} (this may take a few minutes)...")
-                            
-                            # Run diskpart with extended timeout for protected drives
-                            result = subprocess.run(["diskpart", "/s", script_path], 
-                                                   capture_output=True, text=True, 
-                                                   shell=True, timeout=600)  # 10 minute timeout
-                            
-                            try:
-                                os.remove(script_path)
-                            except Exception:
-                                pass
-                                
-                            self.status.emit(f"Diskpart completed with return code: {result.returncode}")
-                            
-                            if result.stdout:
-                                stdout_lines = result.stdout.strip().split('\n')
-                                for line in stdout_lines[-10:]:  # Show last 10 lines
-                                    if line.strip():
-                                        self.status.emit(f"Diskpart: {line.strip()}")
-                            
-                            if result.stderr and result.stderr.strip():
-                                self.status.emit(f"Diskpart warnings: {result.stderr.strip()}")
-                            
-                            if result.returncode == 0:
-                                self.status.emit("✅ Diskpart completed successfully - drive wiped and formatted")
-                            else:
-                                error_msg = f"Diskpart failed with code {result.returncode}"
-                                self.status.emit(f"❌ {error_msg}")
-                                # Don't treat this as a fatal error - continue with other operations
-                            
-                            # Give system time to register the changes
-                            self.status.emit("Waiting for system to recognize formatted drive...")
-                            time.sleep(3)
-                            refresh_explorer()
-                            self.status.emit("Refreshed Windows Explorer")
-                            
-                    except subprocess.TimeoutExpired:
-                        error_msg = "Diskpart operation timed out after 10 minutes"
-                        self.status.emit(f"⚠️ {error_msg}")
-                        # Don't treat timeout as fatal error
-                    except Exception as e:
-                        error_msg = f"Diskpart error: {e}"
-                        self.status.emit(f"⚠️ {error_msg}")
-                        # Continue with other operations
-                        
-                # Skip free space overwriting for protected drives
-                step_update("Skipping free space overwrite - drive already wiped by diskpart...", steps[3][1])
-                self.status.emit("Free space overwrite not needed after diskpart clean operation")
-                
+                if self.entry.kind in ("physical", "raw") and self.quick:
+                    if self._stop:
+                        raise Exception("Operation cancelled")
+                    self._set_phase("wipe")
+                    self.status.emit(f"Quick wipe of {device}: partition tables and filesystem signatures only...")
+                    self._quick_wipe(lambda fraction: advance(fraction, steps[3][1]))
+                    progress_acc += steps[3][1]
+                # Physical/raw: diskpart clean drops every partition so the raw disk can be overwritten.
+                # A quick wipe has already zeroed the partition tables and leaves the disk blank
+                if self.entry.kind in ("physical", "raw") and self.entry.index is not None and not self.quick:
+                    if self._run_diskpart(self.entry.index, "clean"):
+                        self.method.append("Partition table clean")
+                    else:
+                        # Mounted volumes stay locked, so parts of the overwrite below would not land
+                        self._add_error("diskpart clean failed - partitions were not removed")
+
+                if self.entry.kind in ("physical", "raw") and not self.quick:
+                    if self._stop:
+                        raise Exception("Operation cancelled")
+                    self._set_phase("wipe")
+                    self.status.emit(f"Overwriting {device}: {self.standard.name} ({self.passes} pass(es))...")
+                    self._overwrite(lambda fraction: advance(fraction, steps[3][1]))
+                    progress_acc += steps[3][1]
+                elif self.entry.kind not in ("physical", "raw"):
+                    # Skip free space overwriting for logical volumes - the quick format below replaces the filesystem
+                    step_update("Skipping raw overwrite for logical volume...", steps[3][1], "wipe")
+
                 # Create junk archive (skip for protected drives)
-                step_update("Skipping junk creation - not needed after diskpart clean...", steps[4][1])
+                step_update("Skipping junk creation - not needed after diskpart clean...", steps[4][1], "junk")
                 self.status.emit("Junk archive creation skipped for protected drives")
                 # Final format
-                step_update("Final formatting (quick)...", steps[5][1])
+                if self._blank_after_wipe():
+                    step_update("Skipping format - quick wipe leaves the disk blank...", steps[5][1], "format")
+                    self.method.append("Disk left blank (no partition table)")
+                else:
+                    step_update("Final formatting (quick)...", steps[5][1], "format")
                 try:
-                    if self.entry["kind"] in ("logical"):
-                        vol = self.entry["device"].rstrip("\\")
+                    if self.entry.kind in ("logical"):
+                        vol = self.entry.device.rstrip("\\")
                         # Use more robust formatting command
                         cmd = f'format {vol} /FS:NTFS /Q /V:WIPED_DRIVE /Y'
                         result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
                         self.status.emit(f"Format command result: {result.returncode}")
+                        if result.returncode == 0:
+                            self.method.append("NTFS quick format")
                         if result.stdout:
                             self.status.emit(f"Format output: {result.stdout.strip()}")
                         if result.stderr and result.stderr.strip():
@@ -226,31 +471,56 @@ exit
                         refresh_explorer()
                         self.status.emit("Refreshed Windows Explorer after logical format")
                         
-                    elif self.entry["kind"] in ("physical", "raw"):
-                        # Physical drives were already handled by diskpart above
-                        self.status.emit("Physical drive formatting completed via diskpart")
+                    elif self.entry.kind in ("physical", "raw") and self.entry.index is not None and not self.quick:
+                        if self._run_diskpart(self.entry.index, """create partition primary
+active
+format fs=ntfs quick label="WIPED_DRIVE"
+assign"""):
+                            self.method.append("NTFS quick format")
+                        if self.certificates is None:
+                            # Give system time to register the changes
+                            self.status.emit("Waiting for system to recognize formatted drive...")
+                            time.sleep(3)
+                            refresh_explorer()
+                            self.status.emit("Refreshed Windows Explorer")
                 except Exception as e:
                     self.status.emit(f"Format error: {e}")
-                    self.errors.append(str(e))
+                    self._add_error(str(e))
             # Certificate only if no errors - save to the formatted drive
-            step_update("Generating certificate...", steps[6][1])
-            if not self.errors:
+            step_update("Generating certificate...", steps[6][1], "certificate")
+            if not self.errors and self.certificates is not None:
+                # The volume may take a while to come back; the queue waits for it, not this job
+                self._queue_certificate(self.job_record())
+            elif not self.errors:
                 # Try to find the newly formatted drive
                 target_drive = None
-                if self.entry["kind"] in ("physical", "raw"):
+                fallback_dir = None
+                if self._blank_after_wipe():
+                    fallback_dir = station_certificate_dir()
+                    self.status.emit(f"Disk left blank, saving certificate to {fallback_dir}")
+                elif self.entry.kind in ("physical", "raw"):
                     # Wait a moment for drive to be recognized
                     time.sleep(2)
-                    target_drive = find_drive_letter_by_label("WIPED_DRIVE")
+                    target_drive = self._locate_wiped_volume()
                     if target_drive:
                         self.status.emit(f"Found formatted drive at: {target_drive}")
                     else:
-                        self.status.emit("Could not locate formatted drive, saving certificate to current directory")
-                elif self.entry["kind"] == "logical" and ":" in self.entry["device"]:
-                    target_drive = self.entry["device"]
+                        fallback_dir = station_certificate_dir()
+                        self.status.emit(f"Could not identify the formatted volume, saving certificate to {fallback_dir}")
+                elif self.entry.kind == "logical" and ":" in self.entry.device:
+                    target_drive = self.entry.device
                 
-                cert = generate_certificate(self.entry, target_drive)
+                job = self.job_record()
+                if self.renderer is not None:
+                    cert = self.renderer.submit(self.entry, target_drive, self.report, job=job,
+                                                fallback_dir=fallback_dir).result()
+                else:
+                    cert = generate_certificate(self.entry, target_drive, report=self.report, job=job,
+                                                fallback_dir=fallback_dir)
                 self.finished.emit(cert)
             else:
                 self.finished.emit(f"ERROR: Wipe completed with errors: {self.errors}")
         except Exception as e:
             self.finished.emit(f"ERROR: {str(e)}")
+        self._close_phase(time.time())
+        self._phase_start = None
@@ -0,0 +1,193 @@
+"""
+speed_probe.py
+Pre-wipe drive speed probe and duration estimator for Code Monk — Secure Formatter
+
+A probe reads a few short sequential samples spread across the target. When
+writing is allowed it writes each sample back unchanged, so the target keeps
+its contents while we still learn its write speed. From that we estimate how
+long a wipe level will take (passes plus verification).
+
+The target is opened unbuffered (O_DIRECT, or FILE_FLAG_NO_BUFFERING on
+Windows) and read into page-aligned buffers, so a sample the OS has cached
+does not pass for disk speed. Writes are only probed on disks with no volume
+(probe_allows_write); everywhere else the write speed is derived from the
+reads, and `write_basis` says so.
+"""
+import io
+import mmap
+import os
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+
+MB = 1024 * 1024
+SAMPLE_OFFSETS = (0.0, 0.25, 0.5, 0.75, 0.98)   # fractions of the target size
+SAMPLE_BYTES = 8 * MB
+ALIGN = MB                                      # raw devices need sector-aligned I/O
+WRITE_READ_RATIO = 0.8     # assumed write/read speed ratio when writes were not probed
+SLOW_FACTOR = 0.5          # flag targets slower than this fraction of their model's median
+
+
+@dataclass
+class ProbeResult:
+    path: str
+    size_bytes: int
+    read_mbps: float = None
+    write_mbps: float = None
+    samples: int = 0
+    seconds: float = 0.0
+    error: str = None
+    slow: bool = False         # set by the caller from flag_slow()
+    cached: bool = False       # the target could not be opened unbuffered; reads may come from the OS cache
+
+    @property
+    def effective_write_mbps(self):
+        if self.write_mbps:
+            return self.write_mbps
+        return self.read_mbps * WRITE_READ_RATIO if self.read_mbps else None
+
+    @property
+    def write_basis(self):
+        """Where effective_write_mbps comes from: "measured", "derived from reads" or None"""
+        if self.write_mbps:
+            return "measured"
+        return "derived from reads" if self.read_mbps else None
+
+
+def probe_path(entry):
+    """Path to open for a drive entry: the physical device, or the raw volume for a letter"""
+    if entry.kind == "logical":
+        return "\\\\.\\" + entry.device.rstrip("\\")
+    return entry.device
+
+
+def probe_allows_write(entry):
+    """Write-back is only probed on a disk with no volume: nothing mounted can write between our read and write"""
+    return entry.kind == "raw"
+
+
+def _open_unbuffered(path, writable):
+    """File descriptor that bypasses the OS cache, or None where that is not possible"""
+    if sys.platform == "win32":
+        import ctypes
+        import msvcrt
+        from ctypes import wintypes
+        GENERIC_READ, GENERIC_WRITE = 0x80000000, 0x40000000
+        FILE_SHARE_READ, FILE_SHARE_WRITE, OPEN_EXISTING = 1, 2, 3
+        FILE_FLAG_NO_BUFFERING, FILE_FLAG_WRITE_THROUGH = 0x20000000, 0x80000000
+        create = ctypes.windll.kernel32.CreateFileW
+        create.restype = wintypes.HANDLE
+        handle = create(path, GENERIC_READ | (GENERIC_WRITE if writable else 0), FILE_SHARE_READ | FILE_SHARE_WRITE,
+                        None, OPEN_EXISTING, FILE_FLAG_NO_BUFFERING | FILE_FLAG_WRITE_THROUGH, None)
+        if handle is None or handle == wintypes.HANDLE(-1).value:
+            return None
+        return msvcrt.open_osfhandle(handle, (os.O_RDWR if writable else os.O_RDONLY) | os.O_BINARY)
+    if not hasattr(os, "O_DIRECT"):
+        return None
+    try:
+        return os.open(path, (os.O_RDWR if writable else os.O_RDONLY) | os.O_DIRECT)
+    except OSError:
+        return None          # e.g. a filesystem without direct I/O; the caller opens it buffered
+
+
+def _open(path, writable):
+    """(file, cached): an unbuffered file object when possible, else a normal one"""
+    fd = _open_unbuffered(path, writable)
+    cached = fd is None
+    if cached:
+        fd = os.open(path, (os.O_RDWR if writable else os.O_RDONLY) | getattr(os, "O_BINARY", 0))
+    return io.FileIO(fd, "r+" if writable else "r"), cached
+
+
+def probe_target(path, size_bytes, allow_write=False, sample_bytes=SAMPLE_BYTES, offsets=SAMPLE_OFFSETS):
+    """Time sequential reads (and same-data writes when allowed) at several offsets"""
+    result = ProbeResult(path, size_bytes)
+    sample_bytes = max(ALIGN, sample_bytes // ALIGN * ALIGN)
+    start = time.perf_counter()
+    read_t = write_t = 0.0
+    read_n = write_n = 0
+    try:
+        f, result.cached = _open(path, allow_write)
+    except OSError as e:
+        if not allow_write:
+            result.error = str(e)
+            return result
+        # No write access (mounted volume, read-only media): fall back to reads only
+        allow_write = False
+        try:
+            f, result.cached = _open(path, False)
+        except OSError as e2:
+            result.error = str(e2)
+            return result
+    # Unbuffered I/O needs sector-aligned memory: an anonymous map is page-aligned
+    buf = mmap.mmap(-1, sample_bytes)
+    view = memoryview(buf)
+    try:
+        for frac in offsets:
+            offset = int(max(0, size_bytes - sample_bytes) * frac) // ALIGN * ALIGN
+            t0 = time.perf_counter()
+            f.seek(offset)
+            n = f.readinto(view) or 0
+            read_t += time.perf_counter() - t0
+            read_n += n
+            if allow_write and n:
+                try:
+                    t0 = time.perf_counter()
+                    f.seek(offset)
+                    f.write(view[:n])
+                    os.fsync(f.fileno())
+                    write_t += time.perf_counter() - t0
+                    write_n += n
+                except OSError:
+                    allow_write = False
+            result.samples += 1
+    except OSError as e:
+        result.error = str(e)
+    finally:
+        view.release()
+        buf.close()
+        f.close()
+    if read_t > 0 and read_n:
+        result.read_mbps = read_n / MB / read_t
+    if write_t > 0 and write_n:
+        result.write_mbps = write_n / MB / write_t
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def estimate_duration(size_bytes, passes, probe, verify=True):
+    """Seconds to overwrite `size_bytes` `passes` times, plus one verification read"""
+    write = probe.effective_write_mbps if probe else None
+    if not size_bytes or not write:
+        return None
+    size_mb = size_bytes / MB
+    seconds = passes * size_mb / write
+    if verify and probe.read_mbps:
+        seconds += size_mb / probe.read_mbps
+    return seconds
+
+
+def flag_slow(probes_by_model, factor=SLOW_FACTOR):
+    """Paths whose speed is far below the median of other drives of the same model"""
+    slow = []
+    for model, probes in probes_by_model.items():
+        speeds = [p.effective_write_mbps for p in probes if p.effective_write_mbps]
+        if len(speeds) < 2:
+            continue
+        median = statistics.median(speeds)
+        slow.extend(p.path for p in probes
+                    if p.effective_write_mbps and p.effective_write_mbps < factor * median)
+    return slow
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return "unknown"
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes = seconds // 60
+    if minutes < 60:
+        return f"{minutes}m"
+    return f"{minutes // 60}h {minutes % 60:02d}m"
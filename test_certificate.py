@@ -0,0 +1,121 @@
+"""
+test_certificate.py
+Batch certificate rendering: unique file names, shared template, small files
+"""
+import os
+import re
+import tempfile
+import zlib
+from certificate import (CertificateQueue, CertificateRenderer, CertificateTemplate, MAX_LISTED_PASSES,
+                         certificate_fields, generate_certificate, get_template)
+from certificate_record import build_record
+from drive_utils import DriveRecord
+from wipe_engine import FileTarget, OverwriteEngine
+from wipe_patterns import GUTMANN, describe
+
+
+def make_entry(i):
+    return DriveRecord(id=f"physical-{i}", kind="physical", device=f"\\\\.\\PhysicalDrive{i}",
+                       display=f"PhysicalDrive{i} - Test Disk (500 GB)", index=i)
+
+
+def test_names_do_not_collide_within_one_second():
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [generate_certificate(make_entry(i), tmp) for i in range(10)]
+        assert not [r for r in results if r.startswith("ERROR")]
+        files = os.listdir(tmp)
+        assert len(files) == 10 and all(0 < os.path.getsize(os.path.join(tmp, f)) < 64 * 1024 for f in files)
+        assert get_template() is get_template()    # static page prepared once, fields stamped per certificate
+
+
+def content_streams(path):
+    """Decoded content streams of a PDF written with page compression"""
+    with open(path, "rb") as f:
+        data = f.read()
+    streams = []
+    for raw in re.findall(rb"stream\r?\n(.*?)endstream", data, re.S):
+        try:
+            streams.append(zlib.decompress(raw))
+        except zlib.error:
+            pass                                        # the logo JPEG
+    return streams
+
+
+def test_static_layer_is_one_form_and_fields_are_on_the_page():
+    template = CertificateTemplate()
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(2):
+            path = os.path.join(tmp, f"{i}.pdf")
+            template.stamp(path, {"target": f"disk {i}", "method": "m", "digest": "ab" * 32})
+            streams = content_streams(path)
+            forms = [s for s in streams if b"(SECURE FORMAT CERTIFICATE) Tj" in s]
+            pages = [s for s in streams if f"(disk {i}) Tj".encode() in s]
+            assert len(forms) == 1 and b"(Digital Signature:) Tj" in forms[0] and b"(Target    : ) Tj" in forms[0]
+            assert len(pages) == 1 and re.search(rb"/[\w.]+ Do", pages[0]) and b"(SECURE FORMAT" not in pages[0]
+            assert b"Digest: " + b"ab" * 32 in pages[0]
+
+
+def test_batch_renders_in_pool_in_order():
+    renderer = CertificateRenderer(workers=2)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            results = renderer.render_batch([(make_entry(i), tmp, None) for i in range(6)])
+            assert len(results) == 6 and all(r.startswith(tmp) for r in results)
+            assert len(set(os.listdir(tmp))) == 6
+    finally:
+        renderer.shutdown()
+
+
+def test_queue_retries_placement_until_volume_appears():
+    with tempfile.TemporaryDirectory() as tmp:
+        attempts, done = [], []
+
+        def locate():
+            attempts.append(1)
+            return tmp if len(attempts) >= 3 else None    # volume shows up on the third look
+
+        queue = CertificateQueue(attempts=5, interval=0, sleep=lambda s: None)
+        result = queue.submit(make_entry(1), locate=locate, on_done=done.append).result()
+        queue.shutdown()
+        assert len(attempts) == 3 and result.startswith(tmp) and done == [result]
+        assert queue.pending == 0
+
+
+def test_unidentified_volume_falls_back_to_station_directory():
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["CODEMONK_STATION_DIR"] = tmp
+        try:
+            queue = CertificateQueue(attempts=2, interval=0, sleep=lambda s: None)
+            result = queue.submit(make_entry(1), locate=lambda: None).result()
+            queue.shutdown()
+        finally:
+            os.environ.pop("CODEMONK_STATION_DIR", None)
+        assert result.startswith(os.path.join(tmp, "certificates")) and "saved to station directory" in result
+
+
+def test_standard_is_recorded_and_long_standards_fit():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "disk.img")
+        with open(path, "wb") as f:
+            f.truncate(64 * 1024)
+        patterns = GUTMANN.resolve()
+        with FileTarget(path) as target:
+            report = OverwriteEngine(target, block_size=16 * 1024, verify=True, patterns=patterns).run()
+        job = {"id": "job-g", "standard": GUTMANN.name, "passes": GUTMANN.pass_count, "started": 1.0,
+               "finished": 2.0, "method": f"{GUTMANN.name} overwrite ({describe(patterns)})"}
+        fields = certificate_fields(make_entry(1), "here", report, job=job)
+        assert fields["standard"] == "Gutmann"
+        pass_lines = [line for line in fields["performance"] if line.startswith("Pass")]
+        assert len(pass_lines) == MAX_LISTED_PASSES and pass_lines[-1].startswith("Passes 8-35")
+        assert pass_lines[4].startswith("Pass 5 (0x55)")
+        assert build_record(make_entry(1), report, job)["standard"] == "Gutmann"
+
+
+if __name__ == "__main__":
+    test_names_do_not_collide_within_one_second()
+    test_static_layer_is_one_form_and_fields_are_on_the_page()
+    test_batch_renders_in_pool_in_order()
+    test_queue_retries_placement_until_volume_appears()
+    test_unidentified_volume_falls_back_to_station_directory()
+    test_standard_is_recorded_and_long_standards_fit()
+    print("Certificate tests passed")
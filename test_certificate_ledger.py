@@ -0,0 +1,98 @@
+"""
+test_certificate_ledger.py
+Certificate ledger: indexed lookups, append-only triggers and chain verification
+"""
+import os
+import sqlite3
+import tempfile
+from certificate_ledger import CertificateLedger, main
+from certificate_record import HmacSigner
+
+
+def make_record(i):
+    return {"job_id": f"job-{i}", "certificate": f"cert-{i}.pdf",
+            "target": {"serial": f"SN{i % 5:04d}", "model": "Disk A" if i % 2 else "Disk B",
+                       "device": f"\\\\.\\PhysicalDrive{i % 5}"}}
+
+
+def fill(path, count=50, signer=None):
+    ledger = CertificateLedger(path, station="station-1", signer=signer)
+    ledger.append_many([(make_record(i), "done" if i % 10 else "partial", None,
+                         f"2026-{1 + i % 12:02d}-15T10:00:00+00:00") for i in range(count)])
+    return ledger
+
+
+def test_lookup_by_serial_date_and_result():
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = fill(os.path.join(tmp, "ledger.db"))
+        rows = ledger.find(serial="SN0003", since="2026-04-01", until="2026-10-01")
+        assert rows and all(r["serial"] == "SN0003" and "2026-04" <= r["recorded"][:7] < "2026-10" for r in rows)
+        assert [r["seq"] for r in ledger.find(result="partial")] == [1, 11, 21, 31, 41]
+        assert ledger.find(station="station-1", limit=3)[-1]["seq"] == 3
+        ledger.close()
+
+
+def test_chain_detects_tampering():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ledger.db")
+        ledger = fill(path)
+        assert ledger.verify_chain(batch=7) == (True, 50, None)
+        try:
+            ledger.conn.execute("UPDATE ledger SET result = 'done' WHERE seq = 11")
+            assert False, "update should be rejected"
+        except sqlite3.DatabaseError as e:
+            assert "append-only" in str(e)
+        ledger.close()
+
+        # Someone with direct file access drops the triggers and rewrites history
+        conn = sqlite3.connect(path)
+        conn.execute("DROP TRIGGER ledger_no_update")
+        conn.execute("UPDATE ledger SET serial = 'SN9999' WHERE seq = 23")
+        conn.commit()
+        conn.close()
+        ledger = CertificateLedger(path)
+        assert ledger.verify_chain(batch=7) == (False, 22, 23)
+        ledger.close()
+
+
+def test_signed_head_detects_truncation():
+    signer = HmacSigner(os.urandom(32))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ledger.db")
+        fill(path, signer=signer).close()
+        ledger = CertificateLedger(path, signer=signer)
+        assert ledger.verify_chain(batch=7) == (True, 50, None)
+        ledger.close()
+        with open(path + ".head", "rb") as f:
+            head = f.read()
+
+        # The last rows go: the remaining chain is intact, the head still says 50
+        conn = sqlite3.connect(path)
+        conn.execute("DROP TRIGGER ledger_no_delete")
+        conn.execute("DELETE FROM ledger WHERE seq > 45")
+        conn.commit()
+        conn.close()
+        assert CertificateLedger(path).verify_chain() == (True, 45, None)
+        ledger = CertificateLedger(path, signer=signer)
+        assert ledger.verify_chain(batch=7) == (False, 45, 46) and "46-50" in ledger.problem
+        ledger.close()
+
+        # A head rewritten without the key does not help
+        with open(path + ".head", "wb") as f:
+            f.write(head.replace(b'"seq":50', b'"seq":45'))
+        ledger = CertificateLedger(path, signer=signer)
+        assert not ledger.verify_chain()[0] and "signature" in ledger.problem
+        ledger.close()
+
+        os.remove(path + ".head")
+        with open(os.path.join(tmp, "station.key"), "w") as f:
+            f.write(signer.key.hex())
+        assert main(["--db", path, "--key", os.path.join(tmp, "station.key"), "verify"]) == 1
+        assert main(["--db", os.path.join(tmp, "missing.db"), "verify"]) == 2
+
+
+if __name__ == "__main__":
+    test_lookup_by_serial_date_and_result()
+    test_chain_detects_tampering()
+    test_signed_head_detects_truncation()
+    print("Certificate ledger tests passed")
@@ -0,0 +1,121 @@
+"""
+test_certificate_record.py
+Signed certificate sidecars: signing, tamper detection and bulk verification
+"""
+import json
+import os
+import tempfile
+from certificate_record import (build_record, canonical_json, generate_key, load_key, main, sign_record,
+                                station_key_path, station_signer, verify_directory, verify_record, write_record)
+from drive_utils import DriveRecord
+from wipe_engine import WipeReport
+
+ENTRY = DriveRecord(id="physical-1", kind="physical", device="\\\\.\\PhysicalDrive1",
+                    display="PhysicalDrive1 - Test Disk (500 GB)", index=1, model="Test Disk",
+                    size_bytes=500 * 1024**3, serial="SN0001")
+
+
+def make_record(i=0):
+    report = WipeReport(ENTRY.device, ENTRY.size_bytes, 3, 4 * 1024 * 1024,
+                        bytes_written=3 * ENTRY.size_bytes, bad_ranges=[[512, 1024]])
+    job = {"id": f"job-{i}", "passes": 3, "started": 1760000000.0, "finished": 1760003600.5}
+    return build_record(ENTRY, report, job, digest="ab" * 32, certificate=f"cert-{i}.pdf")
+
+
+def test_sign_verify_and_tamper():
+    with tempfile.TemporaryDirectory() as tmp:
+        signer = generate_key(os.path.join(tmp, "station.key"))
+        signed = sign_record(make_record(), signer)
+        # Canonical form: round-tripping through JSON must not change the signed bytes
+        assert verify_record(json.loads(canonical_json(signed)), signer) == (True, "ok")
+
+        tampered = json.loads(canonical_json(signed))
+        tampered["target"]["serial"] = "SN9999"
+        assert verify_record(tampered, signer) == (False, "bad signature")
+
+        other = generate_key(os.path.join(tmp, "other.key"))
+        assert not verify_record(signed, other)[0]
+
+
+def test_key_file_is_complete_or_absent():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "station.key")
+        signer = generate_key(path)
+        try:
+            generate_key(path)
+            assert False, "an existing key must not be replaced"
+        except FileExistsError:
+            pass
+        assert os.listdir(tmp) == ["station.key"] and load_key(path).key == signer.key
+        for truncated in (b"", b"00ff\n"):
+            with open(path, "wb") as f:
+                f.write(truncated)
+            try:
+                load_key(path)
+                assert False, "a truncated key must not load"
+            except ValueError as e:
+                assert "truncated" in str(e)
+
+
+def test_verify_directory_in_parallel():
+    with tempfile.TemporaryDirectory() as tmp:
+        key_path = os.path.join(tmp, "station.key")
+        signer = generate_key(key_path)
+        records = os.path.join(tmp, "records")
+        os.makedirs(records)
+        for i in range(600):
+            write_record(os.path.join(records, f"cert-{i}.json"), sign_record(make_record(i), signer))
+        with open(os.path.join(records, "cert-7.json"), "rb") as f:
+            data = f.read()
+        with open(os.path.join(records, "cert-7.json"), "wb") as f:
+            f.write(data.replace(b"job-7", b"job-8"))    # tamper with one record
+        checked, failures = verify_directory(records, key_path, workers=2)
+        assert checked == 600
+        assert failures == [(os.path.join(records, "cert-7.json"), "bad signature")]
+
+
+def test_certificate_writes_verifiable_sidecar():
+    from certificate import generate_certificate
+    from certificate_ledger import station_ledger
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        station, certs = os.path.join(tmp, "station"), os.path.join(tmp, "certs")
+        os.makedirs(certs)
+        os.environ["CODEMONK_STATION_DIR"] = station
+        station_signer.cache_clear()
+        station_ledger.cache_clear()
+        try:
+            assert main(["verify", certs]) == 2 and not os.path.exists(station)   # verifying never makes a key
+            job = {"id": "job-1", "passes": 1, "started": 1760000000.0, "finished": 1760000060.0}
+            result = generate_certificate(ENTRY, certs, job=job)
+            pdf = result.split(" (")[0]
+            with open(os.path.splitext(pdf)[0] + ".json", "rb") as f:
+                record = json.loads(f.read())
+            assert record["certificate"] == os.path.basename(pdf) and record["seconds"] == 60.0
+            assert verify_record(record, station_signer()) == (True, "ok")
+            assert station_key_path() == os.path.join(station, "codemonk_signing.key")
+            [indexed] = station_ledger().find(serial="SN0001")
+            assert json.loads(indexed["record"]) == record and indexed["certificate"] == os.path.abspath(pdf)
+            assert station_ledger().path == os.path.join(station, "codemonk_ledger.db")
+            assert station_ledger().verify_chain() == (True, 1, None)
+
+            os.chdir(certs)     # another working directory still finds the same key
+            assert main(["verify", certs]) == 0
+            with open(pdf, "ab") as f:
+                f.write(b"% swapped")
+            assert verify_directory(certs, station_key_path())[1] == [
+                (os.path.splitext(pdf)[0] + ".json", "certificate PDF does not match its record")]
+        finally:
+            station_ledger().close()
+            station_ledger.cache_clear()
+            os.chdir(cwd)
+            os.environ.pop("CODEMONK_STATION_DIR", None)
+            station_signer.cache_clear()
+
+
+if __name__ == "__main__":
+    test_sign_verify_and_tamper()
+    test_key_file_is_complete_or_absent()
+    test_verify_directory_in_parallel()
+    test_certificate_writes_verifiable_sidecar()
+    print("Certificate record tests passed")
@@ -0,0 +1,208 @@
+"""
+test_drive_utils.py
+Drive inventory cache behaviour with a scripted scanner (no real drives needed)
+"""
+from drive_utils import DriveInventoryCache, DriveRecord, DriveWatcher, diff_inventory, drive_key, find_disk_volume
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_scanner(inventory):
+    calls = []
+
+    def scanner():
+        calls.append(1)
+        return [dict(e) for e in inventory], {}
+    return scanner, calls
+
+
+def _name(device):
+    return device.rstrip("\\").split("\\")[-1].upper() if device else None
+
+
+def make_device_scanner(inventory):
+    """Like scan_device: the disk behind a letter or PhysicalDriveN, and the volumes on it"""
+    calls = []
+
+    def device_scanner(device):
+        calls.append(device)
+        hits = [e for e in inventory if _name(e["device"]) == _name(device)]
+        disks = {_name(device)} | {_name(e.get("parent_physical")) for e in hits}
+        return [dict(e) for e in inventory
+                if _name(e["device"]) in disks or _name(e.get("parent_physical")) in disks]
+    return device_scanner, calls
+
+
+USB = {"id": "physical-3", "device": "\\\\.\\PHYSICALDRIVE3", "kind": "physical", "index": 3,
+       "serial": "USB123", "size_bytes": 32 * 1024**3}
+USB_VOL = {"id": "logical-E:\\", "device": "E:\\", "kind": "logical", "parent_physical": "PhysicalDrive3",
+           "serial": "USB123", "size_bytes": 32 * 1024**3}
+SYSTEM = {"id": "logical-C:\\", "device": "C:\\", "kind": "logical"}
+
+
+def test_ttl_and_hotplug_invalidation():
+    clock = FakeClock()
+    scanner, calls = make_scanner([USB, USB_VOL, SYSTEM])
+    device_scanner, device_calls = make_device_scanner([USB, USB_VOL, SYSTEM])
+    cache = DriveInventoryCache(ttl=10, scanner=scanner, clock=clock, device_scanner=device_scanner)
+
+    first = cache.get()
+    assert cache.get() is first and len(calls) == 1
+
+    # Removal drops the disk and its volume without a rescan
+    cache.on_hotplug("\\\\.\\PhysicalDrive3", arrived=False)
+    assert [e.id for e in cache.get()] == ["logical-C:\\"] and len(calls) == 1
+
+    # Arrival is picked up by the next query, which scans only that device
+    cache.on_hotplug("E:\\", arrived=True)
+    assert len(cache.get()) == 3 and len(calls) == 1 and device_calls == ["E:\\"]
+    assert cache.get() is cache.get() and device_calls == ["E:\\"]
+
+    # A device that is invalidated is rescanned on its own as well; no device means everything
+    cache.invalidate("\\\\.\\PhysicalDrive3")
+    assert len(cache.get()) == 3 and len(calls) == 1 and len(device_calls) == 2
+    cache.invalidate()
+    cache.get()
+    assert len(calls) == 2
+
+    clock.now = 11
+    cache.get()
+    assert len(calls) == 3
+
+
+def test_twin_disks_with_one_serial_stay_apart():
+    twin = dict(USB, id="physical-4", device="\\\\.\\PHYSICALDRIVE4", index=4)
+    inventory = [USB, SYSTEM]
+    scanner, calls = make_scanner(inventory)
+    device_scanner, _ = make_device_scanner([USB, twin, SYSTEM])
+    cache = DriveInventoryCache(ttl=60, scanner=scanner, device_scanner=device_scanner)
+    before = cache.get()
+
+    cache.on_hotplug("\\\\.\\PhysicalDrive4", arrived=True)
+    after = cache.get()
+    assert sorted(e.index for e in after if e.kind == "physical") == [3, 4] and len(calls) == 1
+    assert drive_key(after[0]) != drive_key(after[1])
+    delta = diff_inventory(before, after)
+    assert sorted(e.index for e in delta["added"]) == [3, 4] and [e.index for e in delta["removed"]] == [3]
+
+    # A full scan that sees both keeps both as well
+    inventory[:] = [USB, twin, SYSTEM]
+    assert len(cache.get(force=True)) == 3
+    assert not any(diff_inventory(after, cache.get()).values())
+
+
+def test_identity_survives_renumbering():
+    scanner_inventory = [USB, SYSTEM]
+    scanner, calls = make_scanner(scanner_inventory)
+    cache = DriveInventoryCache(ttl=0, scanner=scanner)
+    cache.get()
+    assert cache.lookup(drive_key(USB)).index == 3
+
+    # Same serial and size re-enumerated as PhysicalDrive5
+    scanner_inventory[0] = dict(USB, id="physical-5", device="\\\\.\\PHYSICALDRIVE5", index=5)
+    cache.get()
+    assert cache.lookup(drive_key(USB)).index == 5
+    assert len([e for e in cache.get() if e.kind == "physical"]) == 1
+
+
+def test_watcher_sends_only_deltas():
+    inventory = [SYSTEM]
+    fingerprint = {"C:\\"}
+    scanner, calls = make_scanner(inventory)
+    device_scanner, device_calls = make_device_scanner(inventory)
+    cache = DriveInventoryCache(ttl=60, scanner=scanner, device_scanner=device_scanner)
+    watcher = DriveWatcher(cache, fingerprint=lambda: frozenset(fingerprint), raw_fingerprint=None)
+    deltas = []
+    watcher.subscribe(deltas.append)
+
+    watcher.seed(cache.get())
+    assert not any(watcher.poll().values()) and len(calls) == 1   # nothing changed, no rescan
+
+    inventory[:] = [SYSTEM, USB, USB_VOL]
+    fingerprint.add("E:\\")
+    delta = watcher.poll()
+    assert [e.id for e in delta["added"]] == ["physical-3", "logical-E:\\"]
+    assert not delta["removed"] and not delta["changed"]
+    assert len(calls) == 1 and device_calls == ["E:\\"]     # only the new letter was scanned
+
+    inventory[:] = [SYSTEM, dict(USB, display="PhysicalDrive3 - renamed")]
+    fingerprint.remove("E:\\")
+    delta = watcher.poll()
+    assert [e.id for e in delta["removed"]] == ["logical-E:\\"] and not delta["changed"]
+    assert len(calls) == 1 and len(device_calls) == 1       # a removal needs no scan
+
+    watcher.refresh(full=True)                              # the Refresh button
+    delta = watcher.poll(force=True, full=True)
+    assert [e.id for e in delta["changed"]] == ["physical-3"] and len(calls) == 2
+    assert len(deltas) == 3
+
+
+def test_raw_disks_are_probed_at_a_low_rate():
+    blank = {"id": "raw-3", "device": "\\\\.\\PhysicalDrive3", "kind": "raw", "index": 3}
+    scanner, calls = make_scanner([SYSTEM])
+    device_scanner, device_calls = make_device_scanner([SYSTEM, blank])
+    cache = DriveInventoryCache(ttl=60, scanner=scanner, device_scanner=device_scanner)
+    clock, raw, probes = [0.0], ["\\\\.\\PhysicalDrive0"], []
+
+    def raw_fingerprint():
+        probes.append(clock[0])
+        return frozenset(raw)
+    watcher = DriveWatcher(cache, fingerprint=lambda: frozenset({"C:\\", "D:\\"}), raw_fingerprint=raw_fingerprint,
+                           raw_interval=30, clock=lambda: clock[0])
+    watcher.seed(cache.get())
+    for t in range(1, 30):
+        clock[0] = t
+        watcher.poll()
+    assert probes == [0.0] and len(calls) == 1        # 29 ticks, no PhysicalDrive opened
+
+    raw.append("\\\\.\\PhysicalDrive3")                # a blank disk with no drive letter
+    clock[0] = 30
+    delta = watcher.poll()
+    assert probes == [0.0, 30] and [e.id for e in delta["added"]] == ["raw-3"]
+    assert len(calls) == 1 and device_calls == ["\\\\.\\PhysicalDrive3"]
+
+
+def test_partial_results_reach_caller():
+    partials = []
+
+    def scanner(on_partial=None):
+        if on_partial:
+            on_partial([SYSTEM], "logical")
+        return [dict(SYSTEM), dict(USB)], {}
+
+    cache = DriveInventoryCache(ttl=10, scanner=scanner)
+    assert len(cache.get(on_partial=lambda entries, source: partials.append((len(entries), source)))) == 2
+    assert partials == [(1, "logical")]
+    # A cached answer runs no scan, so there is nothing partial to report
+    cache.get(on_partial=lambda entries, source: partials.append(source))
+    assert len(partials) == 1
+
+
+def test_wiped_volume_is_found_by_disk_not_label():
+    # Two disks just wiped, both volumes labelled WIPED_DRIVE; disk 4 was PhysicalDrive3 when queued
+    index = {"disks": {2: {"index": 2, "serial": "AAA"}, 4: {"index": 4, "serial": "USB123"},
+                       5: {"index": 5, "serial": "DUP"}, 6: {"index": 6, "serial": "DUP"}},
+             "volumes": {"E:": 2, "F:": 4, "G:": 5, "H:": 6}}
+    assert find_disk_volume(USB, index) == "F:\\"
+    assert find_disk_volume(DriveRecord(id="raw-2", kind="raw", device="x", display="x", index=2), index) == "E:\\"
+    # Same serial on two disks, or two volumes on the disk: ambiguous, so no guess
+    assert find_disk_volume(dict(USB, serial="DUP"), index) is None
+    assert find_disk_volume(USB, dict(index, volumes={"E:": 4, "F:": 4})) is None
+    assert find_disk_volume(USB, {"disks": {}, "volumes": {}}) is None
+
+
+if __name__ == "__main__":
+    test_ttl_and_hotplug_invalidation()
+    test_twin_disks_with_one_serial_stay_apart()
+    test_identity_survives_renumbering()
+    test_watcher_sends_only_deltas()
+    test_raw_disks_are_probed_at_a_low_rate()
+    test_partial_results_reach_caller()
+    test_wiped_volume_is_found_by_disk_not_label()
+    print("Drive utils tests passed")
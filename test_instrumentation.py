@@ -0,0 +1,77 @@
+"""
+test_instrumentation.py
+Metrics registry, Prometheus export and the instrumented overwrite engine
+"""
+import json
+import os
+import tempfile
+from instrumentation import Histogram, Instruments, InstrumentedTarget
+from wipe_engine import FileTarget, OverwriteEngine, MB
+
+
+def test_histogram_and_prometheus_text():
+    hist = Histogram(buckets=(0.001, 0.01))
+    for value in (0.0005, 0.001, 0.005, 2.0):
+        hist.observe(value)
+    snap = hist.snapshot()
+    assert snap["count"] == 4 and snap["buckets"] == [[0.001, 2], [0.01, 3], [float("inf"), 4]]
+    assert hist.quantile(0.5) == 0.001 and hist.quantile(1.0) == float("inf")
+
+    inst = Instruments()
+    inst.inc("codemonk_io_bytes_total", 4096, op="write")
+    inst.inc("codemonk_io_bytes_total", 4096, op="write")
+    inst.gauge("codemonk_event_backlog", lambda: 3)
+    inst.observe("codemonk_io_seconds", 0.002, op="write")
+    text = inst.prometheus()
+    assert "# TYPE codemonk_io_seconds histogram" in text
+    assert 'codemonk_io_bytes_total{op="write"} 8192' in text
+    assert "codemonk_event_backlog 3" in text
+    assert 'codemonk_io_seconds_bucket{op="write",le="0.0025"} 1' in text
+    assert 'codemonk_io_seconds_bucket{op="write",le="+Inf"} 1' in text
+    assert 'codemonk_io_seconds_count{op="write"} 1' in text
+
+
+def test_engine_metrics_on_and_off():
+    size = 4 * MB
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "disk.img")
+        with open(path, "wb") as f:
+            f.write(b"\0" * size)
+
+        with FileTarget(path) as target:
+            engine = OverwriteEngine(target, passes=1, block_size=MB)
+            assert engine.target is target       # off: nothing is wrapped
+            engine.run()
+
+        inst = Instruments()
+        with FileTarget(path) as target:
+            engine = OverwriteEngine(target, passes=2, block_size=MB, verify=True, instruments=inst)
+            assert isinstance(engine.target, InstrumentedTarget)
+            report = engine.run()
+        assert report.verified
+
+        snap = inst.snapshot()
+        counters = {(c["name"], tuple(c["labels"].values())): c["value"] for c in snap["counters"]}
+        hists = {(h["name"], tuple(h["labels"].values())): h["count"] for h in snap["histograms"]}
+        assert counters[("codemonk_io_bytes_total", ("write",))] == 2 * size
+        assert counters[("codemonk_io_bytes_total", ("read",))] == size
+        assert counters[("codemonk_engine_phases_total", ("write_pass",))] == 2
+        assert counters[("codemonk_engine_phases_total", ("readback_verify",))] == 1
+        assert not any(name == "codemonk_phases_total" for name, _ in counters)   # worker phases only
+        assert hists[("codemonk_io_seconds", ("write",))] == 8
+        assert hists[("codemonk_io_seconds", ("flush",))] == 2
+        assert hists[("codemonk_fill_seconds", ())] == 8
+
+        # Files are replaced whole, in either format
+        prom = inst.write(os.path.join(tmp, "codemonk.prom"))
+        with open(prom) as f:
+            assert "codemonk_io_seconds_bucket" in f.read()
+        with open(inst.write(os.path.join(tmp, "codemonk.json"))) as f:
+            assert json.load(f)["histograms"]
+        assert sorted(os.listdir(tmp)) == ["codemonk.json", "codemonk.prom", "disk.img"]
+
+
+if __name__ == "__main__":
+    test_histogram_and_prometheus_text()
+    test_engine_metrics_on_and_off()
+    print("Instrumentation tests passed")
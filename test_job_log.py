@@ -0,0 +1,65 @@
+"""
+test_job_log.py
+Structured job log: records, progress thinning, rotation and queries
+"""
+import gzip
+import os
+import tempfile
+from job_log import JobLog, iter_records, log_files
+from progress_events import ErrorEvent, JobEvent, ProgressEvent, StateEvent, SummaryEvent
+
+
+def publish_job(log, job_id, start, target="PhysicalDrive3 - Test Disk"):
+    log(JobEvent(job_id, target, "\\\\.\\PhysicalDrive3", "Test Disk", "SN3", 10 * 1024**3, 1, time=start))
+    for i in range(100):
+        # Ten progress events a second for ten seconds
+        log(ProgressEvent(job_id, "wipe", i, i * 1024**2, 100 * 1024**2, 123.456, 42.0, time=start + i / 10))
+    log(ErrorEvent(job_id, "wipe", "1 unwritable range", time=start + 10))
+    log(ProgressEvent(job_id, "wipe", 100, 100 * 1024**2, 100 * 1024**2, 120.0, 0.0, time=start + 10))
+    log(SummaryEvent(job_id, "1-pass random overwrite", {"wipe": 10.0}, {"avg_mbps": 120.0}, time=start + 10))
+    log(StateEvent(job_id, "done", "cert.pdf", time=start + 10))
+
+
+def test_records_and_progress_thinning():
+    with tempfile.TemporaryDirectory() as tmp:
+        log = JobLog(tmp, station="bay", progress_interval=5.0).start()
+        publish_job(log, "job1", 1000.0)
+        publish_job(log, "job2", 2000.0, target="PhysicalDrive4 - Other")
+        log.close()
+        assert log.dropped == 0
+
+        records = list(iter_records(tmp, job="job1"))
+        kinds = [r["type"] for r in records]
+        assert kinds[0] == "job" and kinds[-2:] == ["summary", "state"]
+        # 0 s, 5 s and the final 100% are kept out of 101 progress events
+        assert [r["percent"] for r in records if r["type"] == "progress"] == [0, 50, 100]
+        assert all(r["target"] == "PhysicalDrive3 - Test Disk" and r["station"] == "bay" for r in records)
+        assert records[-2]["metrics"] == {"avg_mbps": 120.0}
+
+        errors = list(iter_records(tmp, types=["error"], target="PhysicalDrive4"))
+        assert [r["job_id"] for r in errors] == ["job2"]
+        assert [r["job_id"] for r in iter_records(tmp, types=["state"], since=1500)] == ["job2"]
+
+
+def test_rotation_compresses_old_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        log = JobLog(tmp, station="bay", max_bytes=2000, keep=3, progress_interval=0).start()
+        for n in range(8):
+            publish_job(log, f"job{n}", 1000.0 * n)
+            log.close()          # flushes; the next start() appends to the same live file
+            log.start()
+        log.close()
+
+        compressed = log_files(tmp, "bay", compressed_only=True)
+        assert len(compressed) == 3
+        with gzip.open(compressed[-1], "rt") as f:
+            assert f.readline().startswith("{")
+        assert os.path.exists(os.path.join(tmp, "codemonk_jobs_bay.jsonl"))
+        # Older jobs were rotated away; the newest one is whole
+        assert [r["type"] for r in iter_records(tmp, job="job7")][-1] == "state"
+
+
+if __name__ == "__main__":
+    test_records_and_progress_thinning()
+    test_rotation_compresses_old_files()
+    print("Job log tests passed")
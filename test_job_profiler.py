@@ -0,0 +1,79 @@
+"""
+test_job_profiler.py
+Per-job profiler: report bundle, and overlapping jobs sharing tracemalloc
+"""
+import json
+import os
+import tempfile
+import threading
+import tracemalloc
+from job_profiler import JobProfiler, ProfileSettings
+
+
+def test_overlapping_jobs_share_tracemalloc():
+    with tempfile.TemporaryDirectory() as tmp:
+        a_in, b_in, b_done = threading.Event(), threading.Event(), threading.Event()
+        profilers = {}
+
+        def job(name, entered, until):
+            out = os.path.join(tmp, name)
+            with JobProfiler(out, ProfileSettings(out, tracemalloc_frames=5)) as profiler:
+                profilers[name] = profiler
+                entered.set()
+                until.wait(5)
+                sum(range(10000))
+
+        # a enters, b enters, a leaves while b is still running, then b leaves
+        a = threading.Thread(target=job, args=("a", a_in, b_in))
+        a.start()
+        a_in.wait(5)
+        b = threading.Thread(target=job, args=("b", b_in, b_done))
+        b.start()
+        a.join(5)
+        assert tracemalloc.is_tracing()         # b still needs it
+        b_done.set()
+        b.join(5)
+
+        assert not tracemalloc.is_tracing()
+        # cProfile is one per process: the job that came second gets stack samples instead
+        assert profilers["a"].error is None and "stack samples only" in profilers["b"].error
+        for name, cprofile in (("a", True), ("b", False)):
+            with open(os.path.join(tmp, name, "summary.json")) as f:
+                summary = json.load(f)
+            assert summary["tracemalloc"] is True and summary["cprofile"] is cprofile
+            assert os.path.exists(os.path.join(tmp, name, "tracemalloc.txt"))
+            assert os.path.exists(os.path.join(tmp, name, "profile.pstats")) is cprofile
+            assert os.path.exists(os.path.join(tmp, name, "stacks.folded")) is not cprofile
+
+
+def test_profiler_failure_does_not_fail_the_job():
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "job")
+        with JobProfiler(out, ProfileSettings(out, tracemalloc_frames=5)) as profiler:
+            tracemalloc.stop()                  # someone else switches it off mid-job
+        assert "tracemalloc" in profiler.error and not tracemalloc.is_tracing()
+        with open(os.path.join(out, "summary.json")) as f:
+            assert json.load(f)["tracemalloc"] is False
+
+
+def test_profiler_that_cannot_start_leaves_nothing_behind():
+    with tempfile.TemporaryDirectory() as tmp:
+        blocked = os.path.join(tmp, "file")
+        open(blocked, "w").close()
+        out = os.path.join(blocked, "job")      # cannot be created
+        ran = []
+        with JobProfiler(out, ProfileSettings(out, tracemalloc_frames=5, sample_interval=0.001)) as profiler:
+            ran.append(1)
+        assert ran and "could not start" in profiler.error and profiler.summary is None
+        assert not tracemalloc.is_tracing() and not [t for t in threading.enumerate() if t.name == "stack-sampler"]
+        out = os.path.join(tmp, "next")
+        with JobProfiler(out, ProfileSettings(out)) as profiler:
+            pass
+        assert profiler.error is None and profiler.summary["cprofile"] is True
+
+
+if __name__ == "__main__":
+    test_overlapping_jobs_share_tracemalloc()
+    test_profiler_failure_does_not_fail_the_job()
+    test_profiler_that_cannot_start_leaves_nothing_behind()
+    print("Job profiler tests passed")
@@ -0,0 +1,177 @@
+"""
+test_job_server.py
+Exercises the local job server against the fake backend (no real drives needed)
+"""
+import asyncio
+import json
+import os
+import tempfile
+from drive_utils import DriveRecord
+from instrumentation import Instruments
+from job_server import FakeBackend, JobManager, JobServer
+
+
+async def request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, data = raw.partition(b"\r\n\r\n")
+    return int(head.split()[1]), data
+
+
+def final_state(events):
+    # The stream ends on a terminal state event, or on the snapshot if the job had already ended
+    last = events[-1]
+    return last["job"]["state"] if last["type"] == "snapshot" else last["state"]
+
+
+async def with_server(scenario, max_workers=4, instruments=None, profile_dir=".", **backend_args):
+    loop = asyncio.get_running_loop()
+    manager = JobManager(FakeBackend(**backend_args), loop, max_workers=max_workers, instruments=instruments)
+    server = await JobServer(manager, port=0, profile_dir=profile_dir).start()
+    try:
+        return await scenario(server.port)
+    finally:
+        await server.stop()
+        manager.shutdown()
+
+
+def test_inventory_submit_and_stream():
+    async def scenario(port):
+        code, data = await request(port, "GET", "/drives")
+        assert code == 200
+        drives = json.loads(data)
+        assert len(drives) == 4
+
+        code, data = await request(port, "POST", "/jobs", {"drive": drives[0]["id"], "passes": 1})
+        assert code == 400  # missing ERASE confirmation
+
+        code, data = await request(port, "POST", "/jobs", {"drive": drives[1]["id"], "standard": "bogus",
+                                                            "confirm": "ERASE"})
+        assert code == 400
+
+        code, data = await request(port, "POST", "/jobs", {"drive": drives[2]["id"], "quick": True, "extent_mb": 64,
+                                                            "confirm": "ERASE"})
+        assert code == 400  # a quick wipe has no extents
+
+        code, data = await request(port, "POST", "/jobs", {"drive": drives[3]["id"], "quick": True,
+                                                            "confirm": "ERASE"})
+        assert code == 201 and json.loads(data)["quick"] is True and json.loads(data)["estimate_s"] is None
+
+        code, data = await request(port, "POST", "/jobs", {"drive": drives[0]["id"], "passes": 1, "confirm": "ERASE",
+                                                            "mmap": "yes"})
+        assert code == 400
+
+        code, data = await request(port, "POST", "/jobs", {"drive": drives[1]["id"], "passes": 1, "confirm": "ERASE",
+                                                            "extent_mb": 1, "resume_from": 1024 * 1024})
+        assert code == 400  # 1 MB extents run as one 4 MB block, so 1 MB is never a checkpoint
+
+        code, data = await request(port, "POST", "/jobs", {"drive": drives[0]["id"], "passes": 1, "confirm": "ERASE",
+                                                            "extent_mb": 256, "mmap": True})
+        assert code == 201
+        job = json.loads(data)
+        assert job["standard"] == "nist-800-88-clear" and job["passes"] == 1
+        assert job["extent_size"] == 256 * 1024 * 1024 and job["mmap"] is True
+
+        code, data = await request(port, "GET", f"/jobs/{job['id']}/events")
+        events = [json.loads(line) for line in data.decode().splitlines()]
+        assert events[-1]["type"] == "state" and events[-1]["state"] == "done"
+        progress = [e for e in events if e["type"] == "progress"]
+        assert progress and progress[-1]["percent"] == 100
+        assert progress[-1]["bytes_done"] == progress[-1]["bytes_total"]
+
+        code, data = await request(port, "GET", f"/jobs/{job['id']}")
+        assert json.loads(data)["progress"] == 100
+    asyncio.run(with_server(scenario, steps=50, step_delay=0.02))
+
+
+def test_cancel_and_concurrent_clients():
+    async def scenario(port):
+        code, data = await request(port, "POST", "/jobs", {"drive": "physical-1", "passes": 3, "confirm": "ERASE"})
+        job = json.loads(data)
+        code, _ = await request(port, "POST", "/jobs", {"drive": "physical-1", "passes": 3, "confirm": "ERASE"})
+        assert code == 400  # drive already busy
+
+        # Many clients polling while the job runs must not stall the loop
+        results = await asyncio.gather(*[request(port, "GET", "/jobs") for _ in range(50)])
+        assert all(code == 200 for code, _ in results)
+
+        code, data = await request(port, "DELETE", f"/jobs/{job['id']}")
+        assert code == 200
+        code, data = await request(port, "GET", f"/jobs/{job['id']}/events")
+        events = [json.loads(line) for line in data.decode().splitlines()]
+        assert final_state(events) == "cancelled"
+
+        code, _ = await request(port, "GET", "/jobs/nope")
+        assert code == 404
+    asyncio.run(with_server(scenario, steps=200, step_delay=0.01))
+
+
+def test_longest_estimated_job_starts_first():
+    drives = [DriveRecord(id=f"physical-{i}", kind="physical", device=f"disk{i}", display=f"Disk {i}",
+                          index=i, size_bytes=size * 1024**3)
+              for i, size in enumerate((10, 20, 2000))]
+
+    async def scenario(port):
+        ids = []
+        for drive in ("physical-0", "physical-1", "physical-2"):
+            code, data = await request(port, "POST", "/jobs", {"drive": drive, "passes": 1, "confirm": "ERASE"})
+            ids.append(json.loads(data)["id"])
+        assert json.loads(data)["estimate_s"] > 0 and json.loads(data)["estimate_basis"] == "simulated"
+        await request(port, "GET", f"/jobs/{ids[1]}/events")
+        jobs = {j["id"]: j for j in json.loads((await request(port, "GET", "/jobs"))[1])}
+        # One worker: the first job runs at once, then the 2000 GB drive overtakes the 20 GB one
+        assert jobs[ids[2]]["started"] < jobs[ids[1]]["started"]
+    asyncio.run(with_server(scenario, max_workers=1, drives=drives, steps=5, step_delay=0.02))
+
+
+def test_metrics_endpoints():
+    async def scenario(port):
+        await request(port, "POST", "/jobs", {"drive": "physical-0", "passes": 1, "confirm": "ERASE"})
+        code, data = await request(port, "GET", "/metrics")
+        assert code == 200
+        jobs = [line for line in data.decode().splitlines() if line.startswith("codemonk_jobs{")]
+        assert sum(int(line.split()[-1]) for line in jobs) == 1    # queued or already running
+        code, data = await request(port, "GET", "/metrics.json")
+        gauges = {g["name"] for g in json.loads(data)["gauges"]}
+        assert {"codemonk_event_backlog", "codemonk_events_dropped_total", "codemonk_jobs"} <= gauges
+    asyncio.run(with_server(scenario, instruments=Instruments(), steps=100, step_delay=0.01))
+
+    async def metrics_off(port):
+        assert (await request(port, "GET", "/metrics"))[0] == 404
+    asyncio.run(with_server(metrics_off))
+
+
+def test_profile_one_job_of_a_batch():
+    async def scenario(port):
+        plain = json.loads((await request(port, "POST", "/jobs", {"drive": "physical-0", "passes": 1, "confirm": "ERASE"}))[1])
+        code, data = await request(port, "POST", "/jobs", {"drive": "physical-1", "passes": 1, "confirm": "ERASE",
+                                                           "profile": {"sample_ms": 2}})
+        profiled = json.loads(data)
+        for job in (plain, profiled):
+            await request(port, "GET", f"/jobs/{job['id']}/events")
+        jobs = {j["id"]: j for j in json.loads((await request(port, "GET", "/jobs"))[1])}
+        assert jobs[plain["id"]]["profile"] is None
+        return jobs[profiled["id"]]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        job = asyncio.run(with_server(scenario, profile_dir=tmp, steps=20, step_delay=0.01))
+        assert job["state"] == "done" and os.path.dirname(job["profile"]) == tmp
+        assert os.listdir(tmp) == [os.path.basename(job["profile"])]
+        assert {"profile.pstats", "profile.txt", "summary.json", "stacks.folded"} <= set(os.listdir(job["profile"]))
+        with open(os.path.join(job["profile"], "summary.json")) as f:
+            summary = json.load(f)
+        # The simulated wipe mostly sleeps
+        assert summary["time_by_category"]["sleeping"]["share"] > 0.5 and summary["stack_samples"] > 0
+
+
+if __name__ == "__main__":
+    test_inventory_submit_and_stream()
+    test_cancel_and_concurrent_clients()
+    test_longest_estimated_job_starts_first()
+    test_metrics_endpoints()
+    test_profile_one_job_of_a_batch()
+    print("Job server tests passed")
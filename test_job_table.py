@@ -0,0 +1,44 @@
+"""
+test_job_table.py
+Job dashboard: events coalesce per job and the model updates once per frame
+"""
+from job_table import COLUMNS, SPARK_COLUMN, JobFeed, JobTableModel
+from progress_events import ErrorEvent, EventStream, PhaseEvent, ProgressEvent, StateEvent
+
+
+def test_feed_coalesces_into_one_change_per_job():
+    feed = JobFeed()
+    stream = EventStream(min_interval=0)
+    stream.subscribe(feed)
+    for j in range(3):
+        feed.add_job(f"job{j}", f"PhysicalDrive{j}")
+        stream.publish(PhaseEvent(f"job{j}", "wipe"))
+    for i in range(1, 301):
+        for j in range(3):
+            stream.publish(ProgressEvent(f"job{j}", "wipe", i // 3, i * 1024, 300 * 1024, 100.0 + i, 300 - i))
+    stream.publish(ErrorEvent("job1", "wipe", "Data error (cyclic redundancy check)"))
+    stream.publish(StateEvent("job2", "done"))
+
+    model = JobTableModel()
+    changes = feed.take_changes()
+    assert sorted(r.job_id for r in changes) == ["job0", "job1", "job2"]
+    model.apply(changes)
+    assert model.rowCount() == 3 and model.columnCount() == len(COLUMNS)
+    assert feed.take_changes() == []
+
+    rows = {model.data(model.index(i, 0)): i for i in range(3)}
+    r1, r2 = rows["PhysicalDrive1"], rows["PhysicalDrive2"]
+    assert model.data(model.index(r1, 4)) == "400.0" and model.data(model.index(r1, 6)) == "1"
+    assert model.data(model.index(r2, 1)) == "done" and model.data(model.index(r2, 3)) == "100%"
+    assert len(model.data(model.index(r1, SPARK_COLUMN), 256)) == 60     # Qt.UserRole, capped history
+
+    updated = []
+    model.dataChanged.connect(lambda a, b: updated.append(a.row()))
+    stream.publish(ProgressEvent("job0", "wipe", 50, None, None, 90.0, 10))
+    model.apply(feed.take_changes())
+    assert updated == [rows["PhysicalDrive0"]] and model.rowCount() == 3
+
+
+if __name__ == "__main__":
+    test_feed_coalesces_into_one_change_per_job()
+    print("Job table tests passed")
@@ -0,0 +1,44 @@
+"""
+test_log_view.py
+Log buffer: bounded ring, per-frame coalescing and background spill of old lines
+"""
+import os
+import tempfile
+import threading
+from log_view import LogBuffer, SpillWriter
+
+
+def test_ring_is_bounded_and_spills_oldest():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "activity.log")
+        spill = SpillWriter(path)
+        buf = LogBuffer(capacity=100, spill=spill)
+        writers = [threading.Thread(target=lambda k=k: [buf.append(f"{k}-{i}") for i in range(1000)])
+                   for k in range(4)]
+        for t in writers:
+            t.start()
+        for t in writers:
+            t.join()
+        assert len(buf.lines()) == 100
+        spill.write(buf.lines())
+        spill.close()
+        with open(path, encoding="utf-8") as f:
+            history = f.read().splitlines()
+        assert len(history) == 4000 and set(history) == {f"{k}-{i}" for k in range(4) for i in range(1000)}
+
+
+def test_drain_coalesces_and_caps_a_frame():
+    buf = LogBuffer(capacity=10)
+    for i in range(3):
+        buf.append(f"line {i}")
+    assert buf.drain() == ["line 0", "line 1", "line 2"] and buf.drain() == []
+    for i in range(25):
+        buf.append(f"burst {i}")
+    frame = buf.drain()
+    assert frame == [f"burst {i}" for i in range(15, 25)] and buf.dropped == 15
+
+
+if __name__ == "__main__":
+    test_ring_is_bounded_and_spills_oldest()
+    test_drain_coalesces_and_caps_a_frame()
+    print("Log view tests passed")
@@ -0,0 +1,89 @@
+"""
+test_progress_events.py
+Checks per-job coalescing and NDJSON output of the structured event stream
+"""
+import io
+import json
+import threading
+import time
+from progress_events import ErrorEvent, EventStream, NDJSONWriter, ProgressEvent, StateEvent, StatusEvent
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_progress_is_coalesced_per_job():
+    clock = FakeClock()
+    stream = EventStream(min_interval=0.5, clock=clock)
+    got = []
+    stream.subscribe(got.append)
+
+    # 24 jobs reporting 1000 times each within one interval
+    for step in range(1000):
+        for job in range(24):
+            stream.publish(ProgressEvent(f"job{job}", "wipe", step // 10, step, 1000))
+    assert len(got) == 24            # first event per job only
+
+    clock.now = 0.6
+    stream.flush()
+    assert len(got) == 48            # then one coalesced event per job
+    assert all(e.bytes_done == 999 for e in got[24:])
+
+    stream.publish(ProgressEvent("job0", "wipe", 100, 1000, 1000))
+    stream.publish(StateEvent("job0", "done"))
+    assert [e.type for e in got[-2:]] == ["progress", "state"]   # pending progress precedes the state
+
+
+def test_ndjson_writer():
+    buf = io.StringIO()
+    stream = EventStream(min_interval=0)
+    stream.subscribe(NDJSONWriter(buf))
+    stream.publish(ProgressEvent("a", "wipe", 50, 5, 10, 12.5, 0.4))
+    stream.publish(StateEvent("a", "done", "cert.pdf"))
+    lines = [json.loads(line) for line in buf.getvalue().splitlines()]
+    assert lines[0]["type"] == "progress" and lines[0]["mbps"] == 12.5
+    assert lines[1] == {"job_id": "a", "state": "done", "result": "cert.pdf", "time": lines[1]["time"], "type": "state"}
+
+
+def test_slow_subscriber_does_not_hold_up_publishers():
+    stream = EventStream(min_interval=0).start()
+    release = threading.Event()
+    got, seen = [], []
+    stream.subscribe(lambda e: (release.wait(5), got.append(e)))   # a stalled pipe
+    stream.subscribe(seen.append, direct=True)
+    start = time.perf_counter()
+    for i in range(50):
+        stream.publish(StateEvent(f"job{i}", "running"))
+    assert time.perf_counter() - start < 1.0 and len(seen) == 50
+    release.set()
+    stream.stop()
+    assert [e.job_id for e in got] == [f"job{i}" for i in range(50)]
+
+
+def test_full_queue_drops_status_but_never_errors_or_final_state():
+    stream = EventStream(min_interval=0, queue_size=5).start()
+    release = threading.Event()
+    got = []
+    stream.subscribe(lambda e: (release.wait(5), got.append(e)))   # a stalled pipe
+    for i in range(20):
+        stream.publish(StatusEvent("job", "wipe", f"status {i}"))
+    stream.publish(ErrorEvent("job", "wipe", "write failed", fatal=True))
+    stream.publish(StateEvent("job", "failed", "ERROR: write failed"))
+    assert stream.dropped >= 14
+    release.set()
+    stream.stop()
+    assert [e.type for e in got[-2:]] == ["error", "state"] and got[-1].state == "failed"
+    assert len(got) + stream.dropped == 22
+
+
+if __name__ == "__main__":
+    test_progress_is_coalesced_per_job()
+    test_ndjson_writer()
+    test_slow_subscriber_does_not_hold_up_publishers()
+    test_full_queue_drops_status_but_never_errors_or_final_state()
+    print("Progress event tests passed")
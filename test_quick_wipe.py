@@ -0,0 +1,275 @@
+"""
+test_quick_wipe.py
+Metadata quick wipe on image files holding real partition tables and filesystems
+"""
+import contextlib
+import io
+import json
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import uuid
+import zlib
+from certificate import performance_lines
+from quick_wipe import QuickWiper, find_metadata, main
+from wipe_engine import FileTarget
+
+MiB = 1024 * 1024
+LINUX_DATA = uuid.UUID("0FC63DAF-8483-4772-8E79-3D69D8477DE4").bytes_le
+
+
+def put(path, offset, data):
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        f.write(data)
+
+
+def get(path, offset, length):
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(length)
+
+
+def blank(path, size):
+    with open(path, "wb") as f:
+        f.truncate(size)
+
+
+def mbr(entries, code=b""):
+    sector = bytearray(512)
+    sector[:len(code)] = code
+    for i, (kind, first, count) in enumerate(entries):
+        struct.pack_into("<B3sB3sII", sector, 446 + 16 * i, 0, b"\xfe\xff\xff", kind, b"\xfe\xff\xff", first, count)
+    sector[510:512] = b"\x55\xaa"
+    return bytes(sector)
+
+
+def write_gpt(path, size, parts):
+    sectors = size // 512
+    entries = bytearray(128 * 128)
+    for i, (start, end) in enumerate(parts):
+        struct.pack_into("<16s16sQQQ", entries, i * 128, LINUX_DATA, uuid.uuid4().bytes_le,
+                         start // 512, end // 512 - 1, 0)
+    disk_guid = uuid.uuid4().bytes_le
+
+    def header(my_lba, alternate, entries_lba):
+        h = bytearray(92)
+        struct.pack_into("<8sIIIIQQQQ16sQIII", h, 0, b"EFI PART", 0x10000, 92, 0, 0, my_lba, alternate,
+                         34, sectors - 34, disk_guid, entries_lba, 128, 128, zlib.crc32(entries))
+        struct.pack_into("<I", h, 16, zlib.crc32(h))
+        return bytes(h)
+
+    put(path, 0, mbr([(0xEE, 1, sectors - 1)]))
+    put(path, 512, header(1, sectors - 1, 2))
+    put(path, 1024, entries)
+    put(path, (sectors - 33) * 512, entries)
+    put(path, (sectors - 1) * 512, header(sectors - 1, 1, sectors - 33))
+
+
+def fat32_boot(total_sectors):
+    b = bytearray(512)
+    b[0:11] = b"\xeb\x58\x90MSWIN4.1"
+    struct.pack_into("<HBHBHHBHHHII", b, 11, 512, 8, 32, 2, 0, 0, 0xF8, 0, 63, 255, 0, total_sectors)
+    struct.pack_into("<IHHIHH", b, 36, 128, 0, 0, 2, 1, 6)
+    b[66] = 0x29
+    b[71:82] = b"NO NAME    "
+    b[82:90] = b"FAT32   "
+    b[510:512] = b"\x55\xaa"
+    return bytes(b)
+
+
+def fat16_boot(total_sectors):
+    b = bytearray(512)
+    b[0:11] = b"\xeb\x3c\x90MSDOS5.0"
+    struct.pack_into("<HBHBHHBH", b, 11, 512, 4, 1, 2, 512, total_sectors, 0xF8, 16)
+    b[0x26] = 0x29
+    b[0x36:0x3E] = b"FAT16   "
+    b[510:512] = b"\x55\xaa"
+    return bytes(b)
+
+
+def ntfs_boot(total_sectors):
+    b = bytearray(512)
+    b[0:11] = b"\xeb\x52\x90NTFS    "
+    struct.pack_into("<HB", b, 11, 512, 8)
+    b[21] = 0xF8
+    struct.pack_into("<QQQ", b, 0x28, total_sectors, 4, 8)
+    b[510:512] = b"\x55\xaa"
+    return bytes(b)
+
+
+def bitlocker_boot(metadata_offsets):
+    b = bytearray(512)
+    b[0:11] = b"\xeb\x58\x90-FVE-FS-"
+    struct.pack_into("<HB", b, 11, 512, 8)
+    struct.pack_into("<QQQ", b, 0xB0, *metadata_offsets)
+    b[510:512] = b"\x55\xaa"
+    return bytes(b)
+
+
+def luks1_header(payload_sectors):
+    h = bytearray(592)
+    h[0:6] = b"LUKS\xba\xbe"
+    struct.pack_into(">H32s32s32sII", h, 6, 1, b"aes", b"xts-plain64", b"sha256", payload_sectors, 64)
+    return bytes(h)
+
+
+def luks2_header(data_offset):
+    h = bytearray(16384)
+    h[0:6] = b"LUKS\xba\xbe"
+    struct.pack_into(">HQ", h, 6, 2, 16384)
+    config = {"segments": {"0": {"type": "crypt", "offset": str(data_offset), "size": "dynamic"}}, "keyslots": {}}
+    text = json.dumps(config).encode()
+    h[4096:4096 + len(text)] = text
+    return bytes(h)
+
+
+def blkid(path, offset=None):
+    args = ["blkid", "-p", "-o", "export"] + (["-O", str(offset)] if offset is not None else []) + [path]
+    return subprocess.run(args, capture_output=True, text=True).stdout
+
+
+def test_gpt_disk_with_real_filesystems():
+    size = 64 * MiB
+    parts = {"ext": (1 * MiB, 25 * MiB), "fat32": (25 * MiB, 33 * MiB), "ntfs": (33 * MiB, 41 * MiB),
+             "luks1": (41 * MiB, 45 * MiB), "bitlocker": (45 * MiB, 53 * MiB)}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "disk.img")
+        blank(path, size)
+        write_gpt(path, size, list(parts.values()))
+        start, end = parts["ext"]
+        has_mkfs = shutil.which("mkfs.ext4") is not None
+        if has_mkfs:
+            # 1 KB blocks, 1024 blocks per group: sparse_super backups at groups 1, 3, 5, 7, 9
+            subprocess.run(["mkfs.ext4", "-q", "-F", "-b", "1024", "-g", "1024", "-E", f"offset={start}",
+                            path, str((end - start) // 1024)], check=True, capture_output=True)
+            backups = [start + (1 + g * 1024) * 1024 for g in (1, 3, 5, 7, 9)]
+            assert all(get(path, b + 56, 2) == b"\x53\xef" for b in backups)
+        start, end = parts["fat32"]
+        put(path, start, fat32_boot((end - start) // 512))
+        put(path, start + 512, b"RRaA" + bytes(480) + b"rrAa")
+        put(path, start + 6 * 512, fat32_boot((end - start) // 512))
+        start, end = parts["ntfs"]
+        put(path, start, ntfs_boot((end - start) // 512 - 1))
+        put(path, end - 512, ntfs_boot((end - start) // 512 - 1))
+        start, end = parts["luks1"]
+        put(path, start, luks1_header(4096))
+        put(path, start + MiB, os.urandom(4096))                     # key slot material
+        start, end = parts["bitlocker"]
+        put(path, start, bitlocker_boot((MiB, 2 * MiB, 3 * MiB)))
+        for n in (1, 2, 3):
+            put(path, start + n * MiB, b"-FVE-FS-" + os.urandom(1024))
+        marker = os.urandom(4096)
+        put(path, 21 * MiB + 100 * 1024, marker)                       # file data inside the ext volume
+        if has_mkfs and shutil.which("blkid"):
+            assert 'PTTYPE="gpt"' in blkid(path).replace("PTTYPE=gpt", 'PTTYPE="gpt"')
+            assert "ext4" in blkid(path, parts["ext"][0])
+
+        with FileTarget(path) as target:
+            report = QuickWiper(target).run()
+
+        found = [signature for _, signature in report.found]
+        assert found.count("gpt") == 2 and "protective mbr" in found
+        assert {"fat32", "ntfs", "luks1", "bitlocker"} <= set(found) and ("ext" in found) == has_mkfs
+        assert report.clean, report.remaining
+        assert report.bytes_written < 4 * MiB and get(path, 21 * MiB + 100 * 1024, 4096) == marker
+        assert get(path, 0, 34 * 512) == bytes(34 * 512) and get(path, size - 33 * 512, 33 * 512) == bytes(33 * 512)
+        if has_mkfs:
+            assert not any(get(path, b + 56, 2) == b"\x53\xef" for b in backups)
+        assert get(path, parts["fat32"][0] + 6 * 512, 512) == bytes(512)
+        assert get(path, parts["ntfs"][1] - 512, 512) == bytes(512)
+        assert get(path, parts["luks1"][0] + MiB, 4096) == bytes(4096)
+        assert all(get(path, parts["bitlocker"][0] + n * MiB, 8) == bytes(8) for n in (1, 2, 3))
+        if shutil.which("blkid"):
+            assert not blkid(path).strip()
+            assert not any(blkid(path, start).strip() for start, _ in parts.values())
+
+
+def test_backup_gpt_beyond_stated_size_is_zeroed():
+    # WMI's Size is cylinder-rounded below the real capacity; the backup GPT lives in the tail it leaves out
+    size = 16 * MiB
+    stated = size - 3 * MiB
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "disk.img")
+        blank(path, size)
+        write_gpt(path, size, [(1 * MiB, 12 * MiB)])
+        with FileTarget(path, stated) as target:
+            assert target.stated_size == stated and target.size_bytes == size
+            report = QuickWiper(target).run()
+        assert [s for _, s in report.found].count("gpt") == 2 and report.clean, report.remaining
+        assert get(path, size - 33 * 512, 33 * 512) == bytes(33 * 512)
+        if shutil.which("blkid"):
+            assert not blkid(path).strip()
+
+
+def test_mbr_disk_with_extended_partition():
+    size = 16 * MiB
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "disk.img")
+        blank(path, size)
+        # Primary FAT16 at 1 MiB, extended 5-15 MiB with two logical volumes (FAT16 and NTFS)
+        put(path, 0, mbr([(0x06, 2048, 8192), (0x05, 10240, 20480)], code=b"\xfa\x33\xc0"))
+        put(path, 1 * MiB, fat16_boot(8192))
+        put(path, 5 * MiB, mbr([(0x06, 2048, 4096), (0x05, 8192, 12288)]))
+        put(path, 6 * MiB, fat16_boot(4096))
+        put(path, 9 * MiB, mbr([(0x07, 2048, 10240)]))
+        put(path, 10 * MiB, ntfs_boot(10239))
+        put(path, 15 * MiB - 512, ntfs_boot(10239))
+
+        with FileTarget(path) as target:
+            found, regions, starts = find_metadata(target)
+            assert [s for _, s in found].count("ebr") == 2 and [s for _, s in found].count("fat") == 2
+            assert [1 * MiB, 6 * MiB, 10 * MiB] == [s for s in starts if s]
+            report = QuickWiper(target).run()
+        assert report.clean and report.bytes_written < MiB
+        assert get(path, 5 * MiB, 512) == bytes(512) and get(path, 15 * MiB - 512, 512) == bytes(512)
+
+
+def test_partitionless_luks2_loses_its_key_slots():
+    size = 20 * MiB
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "disk.img")
+        blank(path, size)
+        put(path, 0, luks2_header(16 * MiB))
+        put(path, 16384, b"SKUL\xba\xbe")
+        put(path, 8 * MiB, os.urandom(4096))            # key slot area
+        payload = os.urandom(4096)
+        put(path, 17 * MiB, payload)
+        with FileTarget(path) as target:
+            report = QuickWiper(target).run()
+        assert [s for _, s in report.found] == ["luks2"] and report.clean
+        assert get(path, 8 * MiB, 4096) == bytes(4096) and get(path, 17 * MiB, 4096) == payload
+    lines = performance_lines(job={"metrics": report.metrics()})
+    assert "data blocks NOT overwritten" in lines[0] and lines[1] == "Signatures found: luks2" and lines[2].endswith("clean")
+
+
+def test_scan_only_opens_the_target_read_only():
+    size = 16 * MiB
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "disk.img")
+        blank(path, size)
+        put(path, 0, mbr([(0x07, 2048, 8192)]))
+        put(path, 1 * MiB, ntfs_boot(8191))
+        before = get(path, 0, 2 * MiB)
+        with FileTarget(path, readonly=True) as target:
+            try:
+                target.write_at(0, bytes(512))
+            except OSError:
+                pass
+            else:
+                raise AssertionError("read-only target accepted a write")
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            assert main([path, "--scan-only"]) == 0
+        assert "would zero" in out.getvalue() and get(path, 0, 2 * MiB) == before
+
+
+if __name__ == "__main__":
+    test_gpt_disk_with_real_filesystems()
+    test_backup_gpt_beyond_stated_size_is_zeroed()
+    test_mbr_disk_with_extended_partition()
+    test_partitionless_luks2_loses_its_key_slots()
+    test_scan_only_opens_the_target_read_only()
+    print("Quick wipe tests passed")
@@ -0,0 +1,61 @@
+"""
+test_speed_probe.py
+Speed probe on a scratch file, duration estimates and slow-drive flagging
+"""
+import os
+import tempfile
+from drive_utils import DriveRecord
+from speed_probe import MB, ProbeResult, estimate_duration, flag_slow, probe_allows_write, probe_target
+
+
+def test_probe_keeps_contents():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "target.img")
+        data = os.urandom(16 * MB)
+        with open(path, "wb") as f:
+            f.write(data)
+        result = probe_target(path, len(data), allow_write=True, sample_bytes=2 * MB)
+        assert result.error is None and result.samples == 5
+        assert result.read_mbps > 0 and result.write_mbps > 0 and result.write_basis == "measured"
+        with open(path, "rb") as f:
+            assert f.read() == data
+
+
+def test_reads_bypass_the_cache_and_say_what_write_speed_is_based_on():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "target.img")
+        with open(path, "wb") as f:
+            f.write(os.urandom(4 * MB))
+        try:
+            os.close(os.open(path, os.O_RDONLY | os.O_DIRECT))
+            direct = True
+        except (AttributeError, OSError):
+            direct = False                  # no direct I/O on this filesystem
+        result = probe_target(path, 4 * MB, sample_bytes=MB)
+        assert result.error is None and result.samples == 5 and result.write_mbps is None
+        assert result.write_basis == "derived from reads" and result.effective_write_mbps < result.read_mbps
+        if direct:
+            assert result.cached is False
+    assert ProbeResult("gone", 0).write_basis is None
+    assert [probe_allows_write(DriveRecord(id=k, kind=k, device="d", display="d")) for k in
+            ("raw", "physical", "logical")] == [True, False, False]
+
+
+def test_estimate_and_flag_slow():
+    probe = ProbeResult("disk", 100 * MB, read_mbps=100.0, write_mbps=50.0)
+    # 3 passes at 50 MB/s plus one verification read at 100 MB/s
+    assert estimate_duration(100 * MB, 3, probe) == 7.0
+    assert estimate_duration(100 * MB, 3, probe, verify=False) == 6.0
+    assert estimate_duration(100 * MB, 1, ProbeResult("x", 0)) is None
+
+    fleet = {"ACME 1TB": [ProbeResult(f"d{i}", 0, write_mbps=200.0) for i in range(3)]
+             + [ProbeResult("tired", 0, write_mbps=40.0)],
+             "Other": [ProbeResult("lonely", 0, write_mbps=5.0)]}
+    assert flag_slow(fleet) == ["tired"]
+
+
+if __name__ == "__main__":
+    test_probe_keeps_contents()
+    test_reads_bypass_the_cache_and_say_what_write_speed_is_based_on()
+    test_estimate_and_flag_slow()
+    print("Speed probe tests passed")
@@ -0,0 +1,219 @@
+"""
+test_wipe_engine.py
+Overwrite engine against a fault-injecting file backend
+"""
+import os
+import tempfile
+from wipe_engine import FileTarget, MmapOverwriteEngine, OverwriteEngine, SECTOR_SIZE, MB
+from wipe_patterns import DOD_3, GUTMANN, describe, get_standard, standard_for_passes
+
+
+class FaultyTarget(FileTarget):
+    """FileTarget whose writes fail when they touch any of the given bad sectors"""
+
+    def __init__(self, path, bad_sectors):
+        super().__init__(path)
+        self.bad_sectors = set(bad_sectors)
+        self.failed_writes = 0
+
+    def write_at(self, offset, data):
+        first, last = offset // SECTOR_SIZE, (offset + len(data) - 1) // SECTOR_SIZE
+        if any(first <= s <= last for s in self.bad_sectors):
+            self.failed_writes += 1
+            raise OSError(23, "Data error (cyclic redundancy check)")
+        return super().write_at(offset, data)
+
+
+class LossyTarget(FileTarget):
+    """FileTarget that reports success but silently drops one block's data"""
+
+    def write_at(self, offset, data):
+        if offset == MB:
+            return len(data)
+        return super().write_at(offset, data)
+
+
+def make_image(tmp, size):
+    path = os.path.join(tmp, "disk.img")
+    with open(path, "wb") as f:
+        f.write(b"\xAA" * size)
+    return path
+
+
+def test_bad_sectors_are_bisected_and_reported():
+    size = 8 * MB
+    bad = [100, 101, 102, 5000, 16383]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_image(tmp, size)
+        with FaultyTarget(path, bad) as target:
+            report = OverwriteEngine(target, passes=2, block_size=MB).run()
+
+        assert report.bad_ranges == [[100 * 512, 103 * 512], [5000 * 512, 5001 * 512], [16383 * 512, 16384 * 512]]
+        assert report.unwritable_bytes == len(bad) * SECTOR_SIZE
+        assert report.bytes_written == 2 * (size - len(bad) * SECTOR_SIZE)
+        assert not report.cancelled
+
+        with open(path, "rb") as f:
+            data = f.read()
+        for s in bad:
+            assert data[s * 512:(s + 1) * 512] == b"\xAA" * 512    # never written
+        assert data[99 * 512:100 * 512] != b"\xAA" * 512           # neighbours were
+
+
+def test_cancel_stops_between_blocks():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_image(tmp, 4 * MB)
+        seen = []
+        with FileTarget(path) as target:
+            engine = OverwriteEngine(target, passes=3, block_size=MB,
+                                     on_progress=lambda done, total: seen.append(done),
+                                     should_stop=lambda: len(seen) >= 2)
+            report = engine.run()
+        assert report.cancelled and seen == [MB, 2 * MB]
+
+
+def test_overwrite_reaches_real_end_when_inventory_size_is_short():
+    size = 4 * MB
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_image(tmp, size)
+        # WMI's geometry-derived Win32_DiskDrive.Size is short of the real capacity
+        with FileTarget(path, size - 64 * 1024) as target:
+            assert target.size_bytes == size
+            report = OverwriteEngine(target, patterns=[b"\x00"], verify=True).run()
+        assert report.bytes_written == size and report.verified
+        with open(path, "rb") as f:
+            f.seek(size - SECTOR_SIZE)
+            assert f.read() == bytes(SECTOR_SIZE)
+
+
+def test_sector_that_recovers_on_the_final_pass_is_verified():
+    size = 4 * MB
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_image(tmp, size)
+        with FaultyTarget(path, [7]) as target:
+            def heal(done, total):
+                if done >= size:
+                    target.bad_sectors.clear()      # remapped after the first pass
+            report = OverwriteEngine(target, passes=2, block_size=MB, verify=True, on_progress=heal).run()
+        assert report.bad_ranges == [[7 * SECTOR_SIZE, 8 * SECTOR_SIZE]]
+        assert report.verified is True and report.bytes_verified == size
+
+
+def test_verify_reads_back_final_pass():
+    size = 4 * MB
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_image(tmp, size)
+        with FaultyTarget(path, [7, 4000]) as target:
+            report = OverwriteEngine(target, passes=2, block_size=MB, verify=True).run()
+        metrics = report.metrics()
+        assert report.verified is True and len(report.digest) == 64
+        assert report.bytes_verified == size - 2 * SECTOR_SIZE
+        assert [p["pass"] for p in metrics["passes"]] == [1, 2]
+        assert all(p["bytes_written"] == size - 2 * SECTOR_SIZE and p["min_mbps"] for p in metrics["passes"])
+        assert metrics["skipped_ranges"] == 2 and metrics["block_size"] == MB
+
+        with LossyTarget(path) as target:
+            report = OverwriteEngine(target, passes=1, block_size=MB, verify=True).run()
+        assert report.verified is False
+
+
+def test_mmap_engine_overwrites_image_in_windows():
+    size = 5 * MB + 4096          # not a whole number of windows
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_image(tmp, size)
+        with FileTarget(path) as target:
+            engine = MmapOverwriteEngine(target, passes=2, block_size=MB, window_size=2 * MB,
+                                         sync_bytes=MB, verify=True)
+            report = engine.run()
+        assert report.verified is True and report.bytes_verified == size
+        assert [p["bytes_written"] for p in report.metrics()["passes"]] == [size, size]
+        with open(path, "rb") as f:
+            data = f.read()
+        assert len(data) == size and data.count(b"\xAA" * 64) < 4
+
+        stops = iter([False, False, True])
+        with FileTarget(path) as target:
+            report = MmapOverwriteEngine(target, block_size=MB, window_size=2 * MB,
+                                         should_stop=lambda: next(stops, True)).run()
+        assert report.cancelled and report.bytes_written == 2 * MB
+
+
+def test_mmap_engine_preallocates_sparse_image():
+    size = 4 * MB
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sparse.img")
+        with open(path, "wb") as f:
+            f.truncate(size)
+        with FileTarget(path) as target:
+            engine = MmapOverwriteEngine(target, block_size=MB, window_size=2 * MB, verify=True)
+            if hasattr(os.stat(path), "st_blocks"):
+                assert os.stat(path).st_blocks * 512 >= size     # no hole left to fault on
+            assert engine.run().verified is True
+
+
+def test_fixed_patterns_stay_in_phase_across_blocks():
+    size = 3 * MB + 512           # neither the size nor the 1 MB block is a multiple of 3
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_image(tmp, size)
+        for engine_class in (OverwriteEngine, MmapOverwriteEngine):
+            with FileTarget(path) as target:
+                report = engine_class(target, block_size=MB, verify=True,
+                                      patterns=[None, b"\x55\x55\x55", b"\x92\x49\x24"]).run()
+            assert report.verified is True and report.passes == 3
+            assert [p["pattern"] for p in report.metrics()["passes"]] == ["random", "0x55", "0x924924"]
+            with open(path, "rb") as f:
+                assert f.read() == (b"\x92\x49\x24" * (size // 3 + 1))[:size]
+
+
+def test_standards():
+    patterns = DOD_3.resolve(urandom=lambda n: b"\x3a")
+    assert patterns == [b"\x3a", b"\xc5", None] and describe(patterns) == "0x3A, 0xC5, random"
+    assert GUTMANN.pass_count == 35 and describe(GUTMANN.resolve()) == "35 passes: 8 random, 27 fixed patterns"
+    assert standard_for_passes(3) is DOD_3 and get_standard("gutmann") is GUTMANN
+    assert [p for p in standard_for_passes(1).resolve()] == [b"\x00"]
+
+
+def test_extent_major_checkpoints_and_verifies_each_extent():
+    size = 4 * MB + 4096
+    patterns = [b"\x11", b"\x22", b"\x33"]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_image(tmp, size)
+        with FaultyTarget(path, [7]) as target:
+            pass_major = OverwriteEngine(target, block_size=MB, verify=True, patterns=patterns).run()
+        with FaultyTarget(path, [7]) as target:
+            report = OverwriteEngine(target, block_size=MB, verify=True, patterns=patterns, extent_size=2 * MB).run()
+        assert report.verified is True and report.digest == pass_major.digest
+        assert report.checkpoint == size and report.bad_ranges == [[7 * SECTOR_SIZE, 8 * SECTOR_SIZE]]
+        assert [p["bytes_written"] for p in report.metrics()["passes"]] == [size - SECTOR_SIZE] * 3
+
+        # Interrupted in the second extent: resume from the checkpoint
+        blocks = iter(range(100))
+        with FileTarget(path) as target:
+            report = OverwriteEngine(target, block_size=MB, verify=True, patterns=[None, b"\x44"],
+                                     extent_size=2 * MB, should_stop=lambda: next(blocks) == 6).run()
+        assert report.cancelled and report.checkpoint == 2 * MB
+        with FileTarget(path) as target:
+            report = OverwriteEngine(target, block_size=MB, verify=True, patterns=[None, b"\x44"],
+                                     extent_size=2 * MB, start_offset=report.checkpoint).run()
+        assert report.verified is True and report.bytes_verified == size - 2 * MB
+        with open(path, "rb") as f:
+            assert f.read() == b"\x44" * size
+
+        with LossyTarget(path) as target:
+            report = OverwriteEngine(target, block_size=MB, verify=True, extent_size=2 * MB).run()
+        assert report.verified is False and report.mismatched_ranges == [[0, 2 * MB]]
+        assert report.checkpoint == 0       # the first extent failed: nothing may be skipped on resume
+
+
+if __name__ == "__main__":
+    test_bad_sectors_are_bisected_and_reported()
+    test_cancel_stops_between_blocks()
+    test_overwrite_reaches_real_end_when_inventory_size_is_short()
+    test_sector_that_recovers_on_the_final_pass_is_verified()
+    test_verify_reads_back_final_pass()
+    test_mmap_engine_overwrites_image_in_windows()
+    test_mmap_engine_preallocates_sparse_image()
+    test_fixed_patterns_stay_in_phase_across_blocks()
+    test_standards()
+    test_extent_major_checkpoints_and_verifies_each_extent()
+    print("Wipe engine tests passed")
@@ -11,6 +11,16 @@ APP_TITLE = "Code Monk — Secure Formatter"
 COMPANY_NAME = "Code Monk"
 LOGO_FILE = "CODE MONK LOGO.png"
 CERT_DIR = "."
+DRIVE_CACHE_TTL = 30  # seconds a drive inventory scan is reused before rescanning
+DRIVE_WATCH_INTERVAL = 1.0  # seconds between hotplug fingerprint checks (drive letters)
+DRIVE_RAW_WATCH_INTERVAL = 30.0  # seconds between opening PhysicalDriveN to spot disks with no letter
+LOG_VIEW_LINES = 2000  # activity log lines kept on screen
+LOG_FRAME_MS = 50  # activity log refresh interval
+LOG_SPILL_FILE = "codemonk_activity.log"  # older activity log lines
+JOB_LOG_DIR = "logs"  # structured, rotating job logs of this station
+METRICS_FILE = None  # e.g. "codemonk.prom": instrument wipes and export metrics there (None = off)
+STATION_DIR_ENV = "CODEMONK_STATION_DIR"  # overrides where the station key and ledger live
+WIPE_EXTENT_MB = 0  # e.g. 256: all passes per extent, verified as it goes (0 = one pass over the disk at a time)
 
 def is_admin():
     """Check if running with administrator privileges"""
@@ -19,6 +29,16 @@ def is_admin():
     except Exception:
         return False
 
+def station_dir():
+    """Where the station's signing key and ledger live, whatever the working directory or exe location"""
+    path = os.environ.get(STATION_DIR_ENV)
+    if not path:
+        if os.name == "nt":
+            path = os.path.join(os.environ.get("PROGRAMDATA", "C:\\ProgramData"), "CodeMonk")
+        else:
+            path = os.path.join(os.path.expanduser("~"), ".codemonk")
+    return path
+
 def resource_path(rel):
     """Relative path that works both as script or PyInstaller bundle"""
     if getattr(sys, "frozen", False):
@@ -0,0 +1,571 @@
+"""
+wipe_engine.py
+Block overwrite engine for Code Monk — Secure Formatter
+
+Overwrites a raw disk or an image file in large blocks. A block whose write
+fails is retried, then bisected down to sector size so only the sectors that
+really cannot be written are skipped; they are recorded as unwritable ranges
+and the rest of the disk continues at full block size. With verify=True the
+final pass is hashed as it is written and read back to prove it landed.
+With extent_size set the order is extent-major: every pass is applied to one
+extent (flushed after each pass so the drive cache cannot merge them), the
+extent is verified, and report.checkpoint moves past it; everything below the
+checkpoint is finished, so an interrupted wipe can resume from that offset.
+An extent that fails its read-back stops the checkpoint at its start.
+Given an instrumentation.Instruments, every I/O call, data fill and pass is
+timed; without one the loop runs uninstrumented.
+
+MmapOverwriteEngine is for image files (VM disks, dd images): it maps a
+window of the file at a time, fills the mapped pages with NumPy and syncs
+them with msync every `sync_bytes`, so there is no write() per block and the
+window size bounds how much of the file is mapped (and resident) at once.
+"""
+import contextlib
+import hashlib
+import mmap
+import os
+import stat
+import threading
+import time
+from dataclasses import dataclass, field
+from instrumentation import instrument_target
+from wipe_patterns import expand, pattern_label
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MB = 1024 * 1024
+SECTOR_SIZE = 512
+DEFAULT_BLOCK_SIZE = 4 * MB
+EXTENT_SIZE = 256 * MB     # suggested extent for extent-major order
+WRITE_RETRIES = 1          # extra attempts on a failed write before bisecting
+RATE_WINDOW = 0.5          # seconds of I/O per sample for the minimum MB/s
+MMAP_WINDOW = 256 * MB     # mapped at once by MmapOverwriteEngine
+MMAP_SYNC_BYTES = 64 * MB  # dirty mapped bytes between msync calls
+IOCTL_DISK_GET_LENGTH_INFO = 0x0007405C
+
+
+class WipeCancelled(Exception):
+    pass
+
+
+def device_length(fd):
+    """Real length of an open disk or file in bytes, or None if it cannot be read.
+
+    Windows disks are asked with IOCTL_DISK_GET_LENGTH_INFO (seeking to the end
+    of a raw disk handle does not work there); anything else is seeked to its end.
+    """
+    if os.name == "nt":
+        try:
+            import ctypes
+            import msvcrt
+            from ctypes import wintypes
+            length, returned = ctypes.c_longlong(0), wintypes.DWORD(0)
+            if ctypes.windll.kernel32.DeviceIoControl(
+                    wintypes.HANDLE(msvcrt.get_osfhandle(fd)), IOCTL_DISK_GET_LENGTH_INFO, None, 0,
+                    ctypes.byref(length), ctypes.sizeof(length), ctypes.byref(returned), None):
+                return length.value
+        except (ImportError, AttributeError, OSError):
+            pass
+    try:
+        return os.lseek(fd, 0, os.SEEK_END) or None
+    except OSError:
+        return None
+
+
+def extent_bytes(extent_size, block_size=DEFAULT_BLOCK_SIZE):
+    """The extent size the engine really uses: whole blocks, at least one.
+
+    Checkpoints are multiples of this, not of the requested size.
+    """
+    return max(block_size, extent_size // block_size * block_size)
+
+
+def ensure_allocated(fd):
+    """True when the whole file has disk blocks behind it, preallocating a sparse one where possible.
+
+    Writing a hole through a memory map allocates it on page fault; if the disk is
+    full then, the process gets SIGBUS (an in-page error on Windows), not an OSError.
+    """
+    st = os.fstat(fd)
+    blocks = getattr(st, "st_blocks", None)     # not reported on Windows
+    if blocks is None or blocks * 512 >= st.st_size:
+        return True
+    if not hasattr(os, "posix_fallocate"):
+        return False
+    try:
+        os.posix_fallocate(fd, 0, st.st_size)
+    except OSError:
+        return False
+    return os.fstat(fd).st_blocks * 512 >= st.st_size
+
+
+class FileTarget:
+    """A block device or image file opened for positional I/O.
+
+    `size_bytes` is what the inventory says (WMI Win32_DiskDrive.Size is
+    computed from the geometry and falls short of the real end); the length
+    the device itself reports wins whenever it can be read. readonly=True
+    opens it for scanning only; write_at() then fails.
+    """
+
+    def __init__(self, path, size_bytes=None, sector_size=SECTOR_SIZE, readonly=False):
+        self.path = path
+        self.sector_size = sector_size
+        self.readonly = readonly
+        self.fd = os.open(path, (os.O_RDONLY if readonly else os.O_RDWR) | getattr(os, "O_BINARY", 0))
+        self._lock = threading.Lock()
+        self.stated_size = size_bytes
+        self.size_bytes = device_length(self.fd) or size_bytes or 0
+
+    def write_at(self, offset, data):
+        if hasattr(os, "pwrite"):
+            written = os.pwrite(self.fd, data, offset)
+        else:
+            with self._lock:
+                os.lseek(self.fd, offset, os.SEEK_SET)
+                written = os.write(self.fd, data)
+        if written != len(data):
+            raise OSError(f"Short write at offset {offset}: {written} of {len(data)} bytes")
+        return written
+
+    def read_at(self, offset, length):
+        if hasattr(os, "pread"):
+            return os.pread(self.fd, length, offset)
+        with self._lock:
+            os.lseek(self.fd, offset, os.SEEK_SET)
+            return os.read(self.fd, length)
+
+    def flush(self):
+        os.fsync(self.fd)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@dataclass
+class WipeReport:
+    target: str
+    size_bytes: int
+    passes: int
+    block_size: int
+    bytes_written: int = 0
+    retries: int = 0
+    bad_ranges: list = field(default_factory=list)    # [start, end) byte ranges never written
+    cancelled: bool = False
+    seconds: float = 0.0
+    concurrency: int = 1
+    pass_stats: list = field(default_factory=list)    # one dict per completed pass
+    bytes_verified: int = 0
+    verify_seconds: float = 0.0
+    digest: str = None         # SHA-256 of the final pass as written (verify=True)
+    verified: bool = None      # read-back digest matched
+    extent_size: int = None    # set for extent-major order
+    checkpoint: int = None     # extent-major: every pass written (and verified) below this offset
+    mismatched_ranges: list = field(default_factory=list)   # extent-major: extents whose read-back differed
+
+    @property
+    def unwritable_bytes(self):
+        return sum(end - start for start, end in self.bad_ranges)
+
+    def metrics(self):
+        """Plain dict of what the engine actually did, for certificates and job records"""
+        rates = [p["avg_mbps"] for p in self.pass_stats if p["avg_mbps"]]
+        lows = [p["min_mbps"] for p in self.pass_stats if p["min_mbps"]]
+        return {
+            "block_size": self.block_size,
+            "concurrency": self.concurrency,
+            "passes": self.pass_stats,
+            "bytes_written": self.bytes_written,
+            "bytes_verified": self.bytes_verified,
+            "verify_seconds": round(self.verify_seconds, 3),
+            "verified": self.verified,
+            "digest": self.digest,
+            "avg_mbps": round(sum(rates) / len(rates), 1) if rates else None,
+            "min_mbps": min(lows) if lows else None,
+            "retries": self.retries,
+            "skipped_ranges": len(self.bad_ranges),
+            "unwritable_bytes": self.unwritable_bytes,
+            "seconds": round(self.seconds, 3),
+            "extent_size": self.extent_size,
+            "checkpoint": self.checkpoint,
+            "mismatched_ranges": self.mismatched_ranges,
+        }
+
+    def add_bad(self, start, length):
+        self.bad_ranges.append([start, start + length])
+
+    def normalize(self):
+        """Sort and merge the ranges (the same bad sectors fail on every pass)"""
+        self.bad_ranges = merge_ranges(self.bad_ranges)
+        return self
+
+
+def merge_ranges(ranges):
+    """Sorted, merged copy of [start, end) ranges"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+class RateMeter:
+    """Average and minimum MB/s of one pass, sampled over RATE_WINDOW slices"""
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.start = self._mark = clock()
+        self._bytes = 0
+        self.total = 0
+        self.min_mbps = None
+        self._idle = 0.0          # paused time, left out of the pass duration
+        self._paused = None
+
+    def pause(self):
+        self._paused = self.clock()
+
+    def resume(self):
+        idle = self.clock() - self._paused
+        self._idle += idle
+        self._mark += idle
+        self._paused = None
+
+    def add(self, nbytes):
+        self.total += nbytes
+        self._bytes += nbytes
+        now = self.clock()
+        if now - self._mark >= RATE_WINDOW:
+            rate = self._bytes / MB / (now - self._mark)
+            self.min_mbps = rate if self.min_mbps is None else min(self.min_mbps, rate)
+            self._mark, self._bytes = now, 0
+
+    def stats(self, number):
+        seconds = (self._paused or self.clock()) - self.start - self._idle
+        avg = self.total / MB / seconds if seconds > 0 else None
+        low = self.min_mbps if self.min_mbps is not None else avg   # pass shorter than one window
+        return {"pass": number, "bytes_written": self.total, "seconds": round(seconds, 3),
+                "avg_mbps": round(avg, 1) if avg else None, "min_mbps": round(low, 1) if low else None}
+
+
+def numpy_random(seed=None):
+    """fill(length) -> random bytes from a NumPy PCG64 generator seeded from os.urandom.
+
+    Several times faster than os.urandom; the seed is unpredictable, which is
+    all an overwrite needs.
+    """
+    if np is None:
+        raise RuntimeError("NumPy random fill needs the 'numpy' package")
+    bitgen = np.random.PCG64(seed if seed is not None else int.from_bytes(os.urandom(16), "little"))
+
+    def fill(length):
+        words = bitgen.random_raw((length + 7) // 8)
+        return memoryview(words).cast("B")[:length]
+    return fill
+
+
+class OverwriteEngine:
+    """Overwrite `target` with random data `passes` times.
+
+    `patterns` (see wipe_patterns) replaces `passes` with one entry per pass:
+    None for random data or the bytes to repeat. `extent_size` switches to
+    extent-major order, starting at `start_offset` (a checkpoint). on_progress(bytes_done,
+    bytes_total) is called after every block, where the totals cover all
+    passes (and the verification read); should_stop() is polled between
+    blocks. fill(length) makes each random block (os.urandom unless given).
+    """
+
+    def __init__(self, target, passes=1, block_size=DEFAULT_BLOCK_SIZE, retries=WRITE_RETRIES,
+                 on_progress=None, should_stop=None, verify=False, instruments=None, fill=None,
+                 patterns=None, extent_size=None, start_offset=0):
+        self.target = instrument_target(target, instruments)
+        self.instruments = instruments
+        fill = fill or os.urandom
+        # Bound once so the block loop has no "is instrumentation on" test
+        self._fill = fill if instruments is None else instruments.timed(fill, "codemonk_fill_seconds")
+        self.patterns = list(patterns) if patterns is not None else [None] * passes
+        self.passes = passes = len(self.patterns)
+        self.verify = verify
+        self.sector_size = getattr(target, "sector_size", SECTOR_SIZE)
+        self.block_size = max(self.sector_size, block_size // self.sector_size * self.sector_size)
+        self.retries = retries
+        self.on_progress = on_progress
+        self.should_stop = should_stop
+        self.report = WipeReport(getattr(target, "path", str(target)), target.size_bytes, passes, self.block_size)
+        self.extent_size = None
+        if extent_size:
+            self.extent_size = self.report.extent_size = extent_bytes(extent_size, self.block_size)
+        if start_offset and (not self.extent_size or start_offset % self.extent_size):
+            raise ValueError("start_offset must be an extent-major checkpoint")
+        self.start_offset = start_offset
+
+    def run(self):
+        size = self.target.size_bytes
+        total = (size - self.start_offset) * (self.passes + (1 if self.verify else 0))
+        self._done = 0
+        self._total = total
+        self._hash = None
+        self._final_bad = []    # what the hashed (final) pass could not write; earlier passes' gaps get read back
+        start = time.perf_counter()
+        try:
+            if self.extent_size:
+                self._run_extents(size)
+            else:
+                self._run_passes(size)
+        except WipeCancelled:
+            self.report.cancelled = True
+        self.report.seconds = time.perf_counter() - start
+        return self.report.normalize()
+
+    def _run_passes(self, size):
+        """Each pass over the whole target, then one read-back of the final pass"""
+        for number, pattern in enumerate(self.patterns, 1):
+            if self.verify and number == self.passes:
+                self._hash = hashlib.sha256()
+            self._data = self._random_data if pattern is None else self._pattern_data(pattern)
+            self._meter = RateMeter()
+            with self._phase("write_pass"):
+                self._write_pass(size)
+            stats = self._meter.stats(number)
+            stats["pattern"] = pattern_label(pattern)
+            self.report.pass_stats.append(stats)
+        if self._hash is not None:
+            self.report.digest = self._hash.hexdigest()
+            with self._phase("readback_verify"):
+                self._verify(size)
+
+    def _run_extents(self, size):
+        """All passes over one extent, flush, verify it, then the next extent"""
+        expanded = {}
+        sources = []
+        for pattern in self.patterns:       # fixed patterns expanded once for the whole run
+            if pattern is None:
+                sources.append(self._random_data)
+            else:
+                key = pattern_label(pattern)
+                sources.append(expanded.setdefault(key, self._pattern_data(pattern)))
+        meters = [RateMeter() for _ in self.patterns]
+        for meter in meters:
+            meter.pause()
+        whole = hashlib.sha256() if self.verify else None
+        self.report.checkpoint = self.start_offset
+        for start in range(self.start_offset, size, self.extent_size):
+            end = min(start + self.extent_size, size)
+            extent = hashlib.sha256() if self.verify else None
+            for number, (data, meter) in enumerate(zip(sources, meters), 1):
+                self._data, self._meter = data, meter
+                if extent is not None and number == self.passes:
+                    self._hash = _HashTee(whole, extent)
+                meter.resume()
+                with self._phase("write_pass"):
+                    try:
+                        self._write_span(start, end)
+                        self.target.flush()
+                    finally:
+                        meter.pause()
+            self._hash = None
+            if extent is not None:
+                with self._phase("readback_verify"):
+                    self._verify_extent(start, end, extent.hexdigest())
+            if not self.report.mismatched_ranges:
+                # Everything below the first failed extent is still proven; nothing after it counts
+                self.report.checkpoint = end
+        for number, (pattern, meter) in enumerate(zip(self.patterns, meters), 1):
+            stats = meter.stats(number)
+            stats["pattern"] = pattern_label(pattern)
+            self.report.pass_stats.append(stats)
+        if whole is not None:
+            self.report.digest = whole.hexdigest()
+            if self.report.verified is None:
+                self.report.verified = True
+
+    def _verify_extent(self, start, end, expected):
+        began = time.perf_counter()
+        if self._readback(start, end) != expected:
+            self.report.verified = False
+            self.report.mismatched_ranges.append([start, end])
+        self.report.verify_seconds += time.perf_counter() - began
+
+    def _write_pass(self, size):
+        self._write_span(0, size)
+        self.target.flush()
+
+    def _write_span(self, start, end):
+        offset = start
+        while offset < end:
+            self._check_stop()
+            length = min(self.block_size, end - offset)
+            self._write_range(offset, self._data(offset, length))
+            offset += length
+            self._advance(length)
+
+    def _random_data(self, offset, length):
+        return memoryview(self._fill(length))
+
+    def _pattern_data(self, pattern):
+        """data(offset, length) slicing one pre-expanded buffer: no per-block work"""
+        buf, period = expand(pattern, self.block_size)
+
+        def data(offset, length):
+            start = offset % period
+            return buf[start:start + length]
+        return data
+
+    def _phase(self, name):
+        return self.instruments.phase(name, "engine") if self.instruments is not None else contextlib.nullcontext()
+
+    def _check_stop(self):
+        if self.should_stop and self.should_stop():
+            raise WipeCancelled("Operation cancelled")
+
+    def _advance(self, length):
+        self._done += length
+        if self.on_progress:
+            self.on_progress(self._done, self._total)
+
+    def _verify(self, size):
+        """Read back everything the final pass wrote and compare digests"""
+        start = time.perf_counter()
+        digest = self._readback(0, size)
+        if self.report.verified is None:
+            self.report.verified = digest == self.report.digest
+        self.report.verify_seconds = time.perf_counter() - start
+
+    def _readback(self, start, end):
+        """SHA-256 of [start, end) as read back, skipping what the final pass could not write; None if part of it is unreadable"""
+        digest = hashlib.sha256()
+        bad = [[max(s, start), min(e, end)] for s, e in merge_ranges(self._final_bad) if s < end and e > start]
+        offset = start
+        for bad_start, bad_end in bad + [[end, end]]:
+            while offset < bad_start:
+                self._check_stop()
+                length = min(self.block_size, bad_start - offset)
+                try:
+                    data = self.target.read_at(offset, length)
+                except OSError:
+                    data = b""
+                if len(data) != length:
+                    return None        # an unreadable stretch cannot match
+                digest.update(data)
+                self.report.bytes_verified += length
+                offset += length
+                self._advance(length)
+            self._advance(bad_end - max(offset, bad_start))
+            offset = bad_end
+        return digest.hexdigest()
+
+    def _write_range(self, offset, data):
+        """Write data at offset; on failure bisect down to sectors and record the bad ones"""
+        for attempt in range(self.retries + 1):
+            try:
+                self.target.write_at(offset, data)
+                self.report.bytes_written += len(data)
+                self._meter.add(len(data))
+                if self._hash is not None:
+                    self._hash.update(data)
+                return
+            except OSError:
+                if attempt < self.retries:
+                    self.report.retries += 1
+        if len(data) <= self.sector_size:
+            self.report.add_bad(offset, len(data))
+            if self._hash is not None:
+                self._final_bad.append([offset, offset + len(data)])
+            return
+        half = max(self.sector_size, len(data) // 2 // self.sector_size * self.sector_size)
+        self._write_range(offset, data[:half])
+        self._write_range(offset + half, data[half:])
+
+
+class _HashTee:
+    """Feeds the final pass of an extent to the whole-disk and the per-extent digest"""
+
+    def __init__(self, *hashes):
+        self.hashes = hashes
+
+    def update(self, data):
+        for h in self.hashes:
+            h.update(data)
+
+
+class MmapOverwriteEngine(OverwriteEngine):
+    """OverwriteEngine for regular files that writes through a memory map.
+
+    Each pass maps `window_size` bytes of the file at a time and fills the
+    mapped pages block by block; dirty pages are written back with msync every
+    `sync_bytes` and at the end of each window. Random data comes from NumPy
+    unless `fill` is given. A failing write to a mapped page is not an OSError the
+    engine could bisect, so this mode refuses block devices, and sparse files it
+    cannot preallocate.
+    """
+
+    def __init__(self, target, passes=1, block_size=DEFAULT_BLOCK_SIZE, window_size=MMAP_WINDOW,
+                 sync_bytes=MMAP_SYNC_BYTES, fill=None, **kwargs):
+        if np is None and fill is None:
+            raise RuntimeError("Memory-mapped wipes need the 'numpy' package")
+        if not stat.S_ISREG(os.fstat(target.fd).st_mode):
+            raise ValueError(f"{getattr(target, 'path', target)} is not a regular file - use OverwriteEngine")
+        if not ensure_allocated(target.fd):
+            raise ValueError(f"{getattr(target, 'path', target)} is sparse and could not be preallocated "
+                             f"- use OverwriteEngine")
+        super().__init__(target, passes, block_size, fill=fill or numpy_random(), **kwargs)
+        # msync and mmap offsets must be page/allocation aligned
+        grain = mmap.ALLOCATIONGRANULARITY
+        self.block_size = max(grain, self.block_size // grain * grain)
+        if self.extent_size:
+            self.extent_size = self.report.extent_size = extent_bytes(self.extent_size, self.block_size)
+        self.window_size = max(self.block_size, window_size // self.block_size * self.block_size)
+        self.sync_bytes = max(self.block_size, sync_bytes // self.block_size * self.block_size)
+        self._msync = mmap.mmap.flush
+        if self.instruments is not None:
+            self._msync = self.instruments.timed(mmap.mmap.flush, "codemonk_io_seconds", op="msync")
+
+    def _write_span(self, start, end):
+        fd = self.target.fd
+        for window in range(start, end, self.window_size):
+            length = min(self.window_size, end - window)
+            mm = mmap.mmap(fd, length, access=mmap.ACCESS_WRITE, offset=window)
+            try:
+                self._fill_window(mm, window, length)
+            finally:
+                mm.close()
+
+    def _fill_window(self, mm, start, length):
+        synced = 0
+        with memoryview(mm) as view:
+            pages = np.frombuffer(view, dtype=np.uint8) if np is not None else None
+            try:
+                for pos in range(0, length, self.block_size):
+                    self._check_stop()
+                    n = min(self.block_size, length - pos)
+                    data = self._data(start + pos, n)
+                    if pages is not None:
+                        pages[pos:pos + n] = np.frombuffer(data, dtype=np.uint8)
+                    else:
+                        view[pos:pos + n] = data
+                    if self._hash is not None:
+                        self._hash.update(view[pos:pos + n])
+                    self.report.bytes_written += n
+                    self._meter.add(n)
+                    self._advance(n)
+                    if pos + n - synced >= self.sync_bytes:
+                        self._msync(mm, synced, pos + n - synced)
+                        synced = pos + n
+            finally:
+                del pages     # the map cannot close while NumPy still holds its buffer
+        if synced < length:
+            self._msync(mm, synced, length - synced)
+        if self.instruments is not None:
+            self.instruments.inc("codemonk_io_bytes_total", length, op="mmap_write")
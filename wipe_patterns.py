@@ -0,0 +1,108 @@
+"""
+wipe_patterns.py
+Overwrite standards and their pass patterns for Code Monk — Secure Formatter
+
+A standard is a sequence of passes, each RANDOM data or a fixed byte pattern
+repeated over the whole disk. CHAR is one byte value picked at random for the
+job and COMPLEMENT the bitwise complement of the pass before (DoD 5220.22-M);
+resolve() turns them into concrete patterns. The engine expands each fixed
+pattern once into a block-sized buffer and slices it per block, so only the
+random passes cost CPU.
+"""
+import os
+from dataclasses import dataclass
+
+RANDOM = None
+CHAR = "char"
+COMPLEMENT = "complement"
+MAX_DESCRIBED_PASSES = 7   # longer sequences are summarised in the method line
+
+
+@dataclass(frozen=True)
+class WipeStandard:
+    key: str
+    name: str
+    passes: tuple
+    summary: str = ""
+
+    @property
+    def pass_count(self):
+        return len(self.passes)
+
+    def resolve(self, urandom=os.urandom):
+        """Concrete per-pass patterns: None for random data, else the bytes to repeat"""
+        patterns = []
+        for p in self.passes:
+            if p == CHAR:
+                p = urandom(1)
+            elif p == COMPLEMENT:
+                p = bytes(b ^ 0xFF for b in patterns[-1])
+            patterns.append(p)
+        return patterns
+
+
+# Gutmann passes 5-31: the fixed patterns aimed at MFM/RLL encodings
+GUTMANN_FIXED = tuple(bytes.fromhex(h) for h in (
+    "55", "aa", "924924", "492492", "249249",
+    "00", "11", "22", "33", "44", "55", "66", "77", "88", "99", "aa", "bb", "cc", "dd", "ee", "ff",
+    "924924", "492492", "249249", "6db6db", "b6db6d", "db6db6",
+))
+
+NIST_CLEAR = WipeStandard("nist-800-88-clear", "NIST SP 800-88 Clear", (b"\x00",),
+                          "Fast, zeros with read-back verify")
+DOD_3 = WipeStandard("dod-5220.22-m", "DoD 5220.22-M", (CHAR, COMPLEMENT, RANDOM),
+                     "Recommended balance")
+DOD_7 = WipeStandard("dod-5220.22-m-ece", "DoD 5220.22-M ECE", (CHAR, COMPLEMENT, RANDOM, RANDOM,
+                                                                CHAR, COMPLEMENT, RANDOM),
+                     "Maximum security, slower")
+GUTMANN = WipeStandard("gutmann", "Gutmann", (RANDOM,) * 4 + GUTMANN_FIXED + (RANDOM,) * 4,
+                       "Legacy drives only, very slow")
+
+STANDARDS = (NIST_CLEAR, DOD_3, DOD_7, GUTMANN)
+DEFAULT_STANDARD = DOD_3.key
+
+
+def get_standard(key):
+    for standard in STANDARDS:
+        if standard.key == key:
+            return standard
+    raise ValueError(f"Unknown wipe standard '{key}' - one of {', '.join(s.key for s in STANDARDS)}")
+
+
+def standard_for_passes(passes):
+    """The standard behind the old 1/3/7 pass levels (and Gutmann's 35)"""
+    for standard in STANDARDS:
+        if standard.pass_count == passes:
+            return standard
+    raise ValueError(f"No wipe standard with {passes} passes")
+
+
+def period(pattern):
+    """Length of the shortest repeating unit of `pattern` (1 for 55 55 55)"""
+    n = len(pattern)
+    for p in range(1, n):
+        if n % p == 0 and pattern[:p] * (n // p) == pattern:
+            return p
+    return n
+
+
+def expand(pattern, length):
+    """(buffer, period): `pattern` repeated over `length` bytes plus one period.
+
+    buffer[offset % period:][:n] is then the pattern as it lies on disk at
+    `offset`, for any n <= length, without copying.
+    """
+    unit = pattern[:period(pattern)]
+    return memoryview(unit * (length // len(unit) + 2)), len(unit)
+
+
+def pattern_label(pattern):
+    return "random" if pattern is None else "0x" + pattern[:period(pattern)].hex().upper()
+
+
+def describe(patterns):
+    """Method text for the passes that ran: '0x3A, 0xC5, random' or a count for long sequences"""
+    if len(patterns) <= MAX_DESCRIBED_PASSES:
+        return ", ".join(pattern_label(p) for p in patterns)
+    random_passes = sum(p is None for p in patterns)
+    return f"{len(patterns)} passes: {random_passes} random, {len(patterns) - random_passes} fixed patterns"